@@ -2,21 +2,27 @@ import asyncio
 from contextlib import asynccontextmanager
 from functools import partial
 
-import redis.asyncio as redis
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 from tiacore_lib.config import ConfigName, get_settings
 from tiacore_lib.rabbit.event_consumer import EventConsumer
-from tiacore_lib.rabbit.handlers import handle_user_event
 from tortoise import Tortoise
 
+from app.cache.circuit_breaker import ResilientRedisBackend
+from app.cache.invalidation import InvalidationListener
+from app.cache.redis_client import create_redis, set_redis
 from app.config import TestConfig, _load_settings
+from app.database.query_timing import QueryStatsMiddleware, configure_query_timing
+from app.database.router import ReplicaReadMiddleware, configure_replica
+from app.exceptions.catch_middleware import CatchAllExceptionsMiddleware
+from app.handlers.outbox_publisher import OutboxPublisher, RabbitBroker
+from app.handlers.user_events import handle_user_event_with_cache
 from app.routes import register_routes
+from app.utils.change_log import on_commit
+from metrics.http_metrics import HttpMetricsMiddleware
 from metrics.logger import setup_logger
-
-# from metrics.tracer import init_tracer
+from metrics.tracer import init_tracer
 
 
 def provide_settings(config_name: ConfigName):
@@ -36,10 +42,13 @@ def create_app(config_name: ConfigName) -> FastAPI:
 
             await Tortoise.init(config=TORTOISE_ORM)
             Tortoise.init_models(["app.database.models"], "models")
-            redis_url = settings.REDIS_URL
-            redis_client = redis.from_url(redis_url)
+            redis_client = create_redis(settings)
+            set_redis(redis_client)
+            app.state.redis = redis_client
             print("🔥 Redis инициализируется")
-            FastAPICache.init(RedisBackend(redis_client), prefix="fastapi-cache")
+            FastAPICache.init(
+                ResilientRedisBackend(redis_client), prefix="fastapi-cache"
+            )
             consumer = EventConsumer(
                 rabbit_url=settings.AUTH_BROKER_URL,
                 queue_name="reference-service",
@@ -47,29 +56,71 @@ def create_app(config_name: ConfigName) -> FastAPI:
             )
             task = asyncio.create_task(
                 consumer.connect_and_consume(
-                    partial(handle_user_event, settings=settings)
+                    partial(handle_user_event_with_cache, settings=settings)
                 )
             )
             app.state.rabbit_task = task
 
+            broker = RabbitBroker(
+                settings.AUTH_BROKER_URL, settings.REFERENCE_EVENTS_EXCHANGE
+            )
+            publisher = OutboxPublisher(
+                broker,
+                batch_size=settings.OUTBOX_BATCH_SIZE,
+                poll_interval=settings.OUTBOX_POLL_INTERVAL,
+            )
+            on_commit(publisher.wake)
+            app.state.outbox_broker = broker
+            app.state.outbox_task = asyncio.create_task(publisher.run())
+
+            # Отдельное соединение LISTEN для сброса локальных кэшей
+            listener = InvalidationListener.from_db_url(settings.db_url)
+            app.state.invalidation_listener = listener
+            if listener is not None:
+                app.state.invalidation_task = asyncio.create_task(listener.run())
+
+            app.state.replica_monitor_task = None
+            monitor = configure_replica(settings)
+            if monitor is not None:
+                app.state.replica_monitor_task = asyncio.create_task(monitor.run())
+
         yield
 
+        if type(settings) is not TestConfig:
+            app.state.outbox_task.cancel()
+            await app.state.outbox_broker.close()
+            if app.state.invalidation_listener is not None:
+                app.state.invalidation_task.cancel()
+                await app.state.invalidation_listener.close()
+            if app.state.replica_monitor_task is not None:
+                app.state.replica_monitor_task.cancel()
+            await app.state.redis.aclose()
+
         await Tortoise.close_connections()
 
     app = FastAPI(title="reference", redirect_slashes=False, lifespan=lifespan)
     app.dependency_overrides[get_settings] = provide_settings(config_name)
-    setup_logger()
-
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=["*"],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
-
-    # if config_name == "Production":
-    #     init_tracer(app)
+    setup_logger(settings)
+    configure_query_timing(settings)
+
+    app.add_middleware(ReplicaReadMiddleware)
+    app.add_middleware(QueryStatsMiddleware, debug=settings.DB_QUERY_DEBUG)
+    # Пустой список — сервис только за шлюзом, CORS не нужен
+    if settings.CORS_ALLOW_ORIGINS:
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=settings.CORS_ALLOW_ORIGINS,
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+    # id запроса и 500 вместо исключения — внутри метрик, чтобы они видели 500
+    app.add_middleware(CatchAllExceptionsMiddleware)
+    # Последним — внешний слой: время запроса включает все middleware
+    app.add_middleware(HttpMetricsMiddleware)
+
+    if settings.TRACING_ENABLED:
+        init_tracer(app, settings, environment=ConfigName(config_name).value)
 
     register_routes(app)
 
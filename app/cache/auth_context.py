@@ -0,0 +1,82 @@
+import hashlib
+import time
+from typing import Optional
+
+from jose import jwt
+from jose.exceptions import JOSEError
+
+from app.cache.invalidation import on_bus_reset, on_user_invalidated
+from app.cache.local import TTLCache
+
+AUTH_CONTEXT_TTL_SECONDS = 60
+AUTH_CONTEXT_MAX_ENTRIES = 10_000
+
+
+def token_hash(authorization: str) -> str:
+    return hashlib.sha256(authorization.encode()).hexdigest()
+
+
+def _token_ttl(authorization: str, default: float) -> Optional[float]:
+    """TTL записи не превышает оставшийся срок жизни JWT."""
+    token = authorization.removeprefix("Bearer ").strip()
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JOSEError:
+        return default
+    if exp is None:
+        return default
+    remaining = float(exp) - time.time()
+    if remaining <= 0:
+        return None
+    return min(default, remaining)
+
+
+class AuthContextCache:
+    """
+    Контексты пользователей по хешу токена (и области проверки) в памяти процесса.
+    Сбрасываются по TTL и по событиям user.* из брокера, которые через шину
+    сброса кэшей доходят до всех процессов.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = AUTH_CONTEXT_MAX_ENTRIES,
+        ttl: float = AUTH_CONTEXT_TTL_SECONDS,
+    ):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, scope: str, authorization: str) -> Optional[dict]:
+        entry = self._entries.get((scope, token_hash(authorization)))
+        return None if entry is None else dict(entry[1])
+
+    def set(self, scope: str, authorization: str, context: dict):
+        ttl = _token_ttl(authorization, self._entries.ttl)
+        if ttl is None:
+            return
+        user_id = str(context.get("user_id"))
+        self._entries.set(
+            (scope, token_hash(authorization)), (user_id, dict(context)), ttl=ttl
+        )
+
+    def invalidate_user(self, user_id):
+        user_id = str(user_id)
+        for key, (cached_user_id, _) in list(self._entries.items()):
+            if cached_user_id == user_id:
+                self._entries.pop(key)
+
+    def invalidate(self, user_id: Optional[str]):
+        """Сброс контекстов пользователя; None — всех."""
+        if user_id is None:
+            self.clear()
+        else:
+            self.invalidate_user(user_id)
+
+    def clear(self):
+        self._entries.clear()
+
+
+auth_context_cache = AuthContextCache()
+
+on_user_invalidated(auth_context_cache.invalidate)
+# За время переподключения слушателя уведомления могли потеряться
+on_bus_reset(auth_context_cache.clear)
@@ -0,0 +1,180 @@
+import asyncio
+import time
+from typing import Optional, Tuple
+
+from fastapi_cache.backends.redis import RedisBackend
+from loguru import logger
+from redis.exceptions import (
+    ConnectionError as RedisConnectionError,
+    RedisError,
+    TimeoutError as RedisTimeoutError,
+)
+
+from metrics.cache_metrics import redis_circuit_open, redis_circuit_rejections
+from metrics.tracer import record_span
+
+COMMAND_TIMEOUT_SECONDS = 0.25
+FAILURE_THRESHOLD = 5
+PROBE_INTERVAL_SECONDS = 1.0
+
+# Команды, которые приложение и FastAPICache выполняют через общий клиент
+GUARDED_COMMANDS = frozenset(
+    {"get", "set", "mget", "incr", "delete", "ttl", "expire", "exists", "eval"}
+)
+
+
+class CircuitOpenError(RedisConnectionError):
+    """Redis признан недоступным: команда не отправлялась."""
+
+
+class RedisCircuitBreaker:
+    """
+    Размыкается после FAILURE_THRESHOLD подряд ошибок соединения или таймаутов.
+    В разомкнутом состоянии команды сразу падают с CircuitOpenError, а
+    восстановление проверяет фоновый PING, а не пользовательские запросы.
+    """
+
+    def __init__(
+        self,
+        client,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        probe_interval: float = PROBE_INTERVAL_SECONDS,
+        probe_timeout: float = COMMAND_TIMEOUT_SECONDS,
+    ):
+        self.client = client
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.failures = 0
+        self._probe: Optional[asyncio.Task] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._probe is not None
+
+    def check(self):
+        if self.is_open:
+            redis_circuit_rejections.inc()
+            raise CircuitOpenError("Redis недоступен, предохранитель разомкнут")
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold and not self.is_open:
+            logger.warning(f"Redis: {self.failures} ошибок подряд, размыкаем")
+            redis_circuit_open.set(1)
+            self._probe = asyncio.create_task(self._probe_until_healthy())
+
+    async def _probe_until_healthy(self):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                await asyncio.wait_for(self.client.ping(), self.probe_timeout)
+            except (RedisError, OSError, asyncio.TimeoutError):
+                continue
+            break
+        logger.info("Redis снова отвечает, замыкаем предохранитель")
+        self.failures = 0
+        self._probe = None
+        redis_circuit_open.set(0)
+
+    async def close(self):
+        if self._probe is not None:
+            self._probe.cancel()
+            self._probe = None
+            redis_circuit_open.set(0)
+
+
+class GuardedRedis:
+    """
+    Обёртка клиента Redis: каждая команда ограничена коротким таймаутом и
+    проходит через предохранитель. Ошибки остаются RedisError, поэтому
+    вызывающий код откатывается к L1 или базе как при обычном сбое Redis.
+    """
+
+    def __init__(
+        self,
+        client,
+        timeout: float = COMMAND_TIMEOUT_SECONDS,
+        breaker: Optional[RedisCircuitBreaker] = None,
+    ):
+        self.client = client
+        self.timeout = timeout
+        self.breaker = breaker or RedisCircuitBreaker(client, probe_timeout=timeout)
+
+    async def guard(self, command, *args, **kwargs):
+        self.breaker.check()
+        try:
+            result = await asyncio.wait_for(command(*args, **kwargs), self.timeout)
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            raise RedisTimeoutError(f"Redis не ответил за {self.timeout} с")
+        except (RedisConnectionError, RedisTimeoutError, OSError):
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if name not in GUARDED_COMMANDS:
+            return attr
+
+        async def command(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await self.guard(attr, *args, **kwargs)
+            except Exception as e:
+                self._trace(name, started, e)
+                raise
+            self._trace(name, started)
+            return result
+
+        return command
+
+    @staticmethod
+    def _trace(name: str, started: float, error=None):
+        elapsed = time.perf_counter() - started
+        attributes = {"db.system": "redis", "db.operation": name}
+        record_span(f"redis {name}", elapsed, attributes, error)
+
+    async def aclose(self):
+        await self.breaker.close()
+        await self.client.aclose()
+
+
+class ResilientRedisBackend(RedisBackend):
+    """Бэкенд FastAPICache, для которого недоступный Redis — просто промах."""
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        async def read():
+            async with self.redis.pipeline(transaction=True) as pipe:
+                return await pipe.ttl(key).get(key).execute()
+
+        try:
+            return await self.redis.guard(read)
+        except RedisError as e:
+            logger.debug(f"FastAPICache без Redis: {e}")
+            return 0, None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await super().get(key)
+        except RedisError as e:
+            logger.debug(f"FastAPICache без Redis: {e}")
+            return None
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None):
+        try:
+            await super().set(key, value, expire)
+        except RedisError as e:
+            logger.debug(f"FastAPICache без Redis: {e}")
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None):
+        try:
+            return await super().clear(namespace, key)
+        except RedisError as e:
+            logger.warning(f"Не удалось очистить FastAPICache: {e}")
+            return 0
@@ -0,0 +1,36 @@
+from typing import Any
+
+import orjson
+
+try:
+    import zstandard
+except ImportError:  # сжатие необязательно: без пакета храним как есть
+    zstandard = None
+
+# Значения меньше порога не сжимаем: выигрыш не окупает время
+COMPRESS_MIN_BYTES = 1024
+
+_RAW = b"j"
+_ZSTD = b"z"
+
+_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+
+def encode(value: Any) -> bytes:
+    """orjson (UUID и datetime поддерживаются), крупные значения — zstd."""
+    raw = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    if _compressor is not None and len(raw) >= COMPRESS_MIN_BYTES:
+        return _ZSTD + _compressor.compress(raw)
+    return _RAW + raw
+
+
+def decode(data: bytes) -> Any:
+    marker, payload = data[:1], data[1:]
+    if marker == _ZSTD:
+        if _decompressor is None:
+            raise ValueError("Значение сжато zstd, но пакет zstandard не установлен")
+        payload = _decompressor.decompress(payload)
+    elif marker != _RAW:
+        raise ValueError("Неизвестный формат значения кэша")
+    return orjson.loads(payload)
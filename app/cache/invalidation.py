@@ -0,0 +1,167 @@
+import asyncio
+from typing import Callable, List, Optional
+from uuid import UUID
+
+import asyncpg
+from loguru import logger
+from tortoise import Tortoise
+from tortoise.backends.base.config_generator import expand_db_url
+
+from app.database.engine import PRIMARY
+from app.utils.change_log import INVALIDATION_CHANNEL, Change, decode_changes
+
+# Канал сброса контекстов авторизации: id пользователя, пустая строка — всех
+USER_INVALIDATION_CHANNEL = "reference_user_invalidation"
+
+RemoteChangesHook = Callable[[List[Change]], None]
+ResetHook = Callable[[], None]
+UserHook = Callable[[Optional[str]], None]
+
+_change_hooks: List[RemoteChangesHook] = []
+_reset_hooks: List[ResetHook] = []
+_user_hooks: List[UserHook] = []
+
+RECONNECT_DELAY_SECONDS = 1.0
+HEALTHCHECK_INTERVAL_SECONDS = 30
+HEALTHCHECK_TIMEOUT_SECONDS = 5
+
+
+def on_remote_changes(hook: RemoteChangesHook) -> RemoteChangesHook:
+    """
+    Регистрирует обработчик изменений, закоммиченных любым процессом
+    (включая текущий). Вызывается синхронно: только сброс локальных записей.
+    """
+    _change_hooks.append(hook)
+    return hook
+
+
+def on_bus_reset(hook: ResetHook) -> ResetHook:
+    """Регистрирует полный сброс кэша: при переподключении слушателя
+    и при пачках изменений, не поместившихся в NOTIFY."""
+    _reset_hooks.append(hook)
+    return hook
+
+
+def on_user_invalidated(hook: UserHook) -> UserHook:
+    """Регистрирует сброс данных пользователя (None — всех пользователей)."""
+    _user_hooks.append(hook)
+    return hook
+
+
+def dispatch(changes: Optional[List[Change]]):
+    hooks = _reset_hooks if changes is None else _change_hooks
+    for hook in hooks:
+        try:
+            hook() if changes is None else hook(changes)
+        except Exception as e:
+            logger.exception(f"Ошибка обработчика сброса кэша {hook.__name__}: {e}")
+
+
+def dispatch_user(user_id: Optional[str]):
+    for hook in _user_hooks:
+        try:
+            hook(user_id)
+        except Exception as e:
+            logger.exception(f"Ошибка обработчика сброса кэша {hook.__name__}: {e}")
+
+
+async def broadcast_user_invalidation(user_id: Optional[UUID]):
+    """
+    Сбрасывает данные пользователя (None — всех) во всех процессах: событие
+    user.* из общей очереди получает только один воркер. Текущий процесс
+    сбрасывает сразу, остальные — по NOTIFY через свой слушатель.
+    """
+    user_id = None if user_id is None else str(user_id)
+    dispatch_user(user_id)
+    connection = Tortoise.get_connection(PRIMARY)
+    if connection.capabilities.dialect != "postgres":
+        return
+    try:
+        await connection.execute_query(
+            "SELECT pg_notify($1, $2)", [USER_INVALIDATION_CHANNEL, user_id or ""]
+        )
+    except Exception as e:
+        logger.warning(f"Не удалось разослать сброс контекстов пользователя: {e}")
+
+
+class InvalidationListener:
+    """
+    Держит отдельное от пула соединение с LISTEN на канал сброса кэшей.
+    После обрыва переподключается и сбрасывает локальные кэши целиком:
+    уведомления за время простоя потеряны.
+    """
+
+    def __init__(
+        self, credentials: dict, reconnect_delay: float = RECONNECT_DELAY_SECONDS
+    ):
+        self.credentials = credentials
+        self.reconnect_delay = reconnect_delay
+        self.connected = asyncio.Event()
+        self._connection: Optional[asyncpg.Connection] = None
+
+    @classmethod
+    def from_db_url(cls, db_url: str) -> Optional["InvalidationListener"]:
+        config = expand_db_url(db_url)
+        if config["engine"] != "tortoise.backends.asyncpg":
+            logger.info("Шина сброса кэшей работает только с Postgres, пропускаем")
+            return None
+        credentials = config["credentials"]
+        return cls(
+            {
+                key: credentials[key]
+                for key in ("host", "port", "user", "password", "database")
+                if key in credentials
+            }
+        )
+
+    async def run(self):
+        while True:
+            lost = asyncio.Event()
+            try:
+                self._connection = await asyncpg.connect(**self.credentials)
+                self._connection.add_termination_listener(lambda _: lost.set())
+                await self._connection.add_listener(INVALIDATION_CHANNEL, self._notify)
+                await self._connection.add_listener(
+                    USER_INVALIDATION_CHANNEL, self._notify_user
+                )
+                dispatch(None)
+                self.connected.set()
+                logger.info("Слушатель сброса кэшей подключён")
+                await self._watch(lost)
+                logger.warning("Соединение слушателя сброса кэшей потеряно")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Ошибка слушателя сброса кэшей: {e}")
+            finally:
+                self.connected.clear()
+                if self._connection is not None and not self._connection.is_closed():
+                    self._connection.terminate()
+                self._connection = None
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _watch(self, lost: asyncio.Event):
+        # Обрыв сети без закрытия сокета termination listener не заметит
+        while not lost.is_set():
+            try:
+                await asyncio.wait_for(lost.wait(), HEALTHCHECK_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                await asyncio.wait_for(
+                    self._connection.fetchval("SELECT 1"), HEALTHCHECK_TIMEOUT_SECONDS
+                )
+
+    def _notify(self, connection, pid, channel, payload):
+        try:
+            changes = decode_changes(payload)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Некорректное уведомление сброса кэша: {e}")
+            changes = None
+        dispatch(changes)
+
+    def _notify_user(self, connection, pid, channel, payload):
+        dispatch_user(payload or None)
+
+    async def close(self):
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+        self._connection = None
@@ -0,0 +1,103 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, Optional, Tuple
+
+
+class TTLCache:
+    """Ограниченный по числу записей LRU-кэш в памяти процесса с TTL записей."""
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        now = time.monotonic()
+        for key, (expires_at, value) in list(self._data.items()):
+            if expires_at > now:
+                yield key, value
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ByteLRUCache:
+    """
+    LRU-кэш байтовых значений с ограничением по суммарному размеру и TTL.
+    on_evict вызывается при вытеснении записи из-за нехватки места.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: float = 60.0,
+        on_evict: Optional[Callable[[], None]] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.size = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, bytes]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self.pop(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: bytes, ttl: Optional[float] = None):
+        self.pop(key)
+        if len(value) > self.max_bytes:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._data.popitem(last=False)
+            self.size -= len(evicted)
+            if self.on_evict is not None:
+                self.on_evict()
+
+    def pop(self, key: Hashable) -> Optional[bytes]:
+        item = self._data.pop(key, None)
+        if item is None:
+            return None
+        self.size -= len(item[1])
+        return item[1]
+
+    def clear(self):
+        self._data.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
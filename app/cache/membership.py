@@ -0,0 +1,170 @@
+import json
+import time
+from typing import List, NamedTuple, Optional
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from app.cache.invalidation import on_bus_reset, on_remote_changes
+from app.cache.local import TTLCache
+from app.cache.redis_client import get_redis
+from app.database.repository import company_relations
+from app.utils.change_entities import ENTITY_COMPANY_RELATION
+from app.utils.change_log import Change, changed_company_ids, on_commit
+
+# Как часто сверять локальную копию с версией в Redis
+MEMBERSHIP_VERSION_CHECK_SECONDS = 5
+MEMBERSHIP_SNAPSHOT_TTL_SECONDS = 24 * 3600
+MEMBERSHIP_MAX_COMPANIES = 5_000
+
+
+class CompanyMembership(NamedTuple):
+    version: int
+    legal_entity_ids: frozenset
+    relation_ids: frozenset
+    checked_at: float
+
+
+def _version_key(company_id: str) -> str:
+    return f"reference:membership:{company_id}:version"
+
+
+def _snapshot_key(company_id: str, version: int) -> str:
+    return f"reference:membership:{company_id}:{version}"
+
+
+class MembershipIndex:
+    """
+    Индекс юрлиц и связей компании для проверок прав.
+    Локальная копия в памяти процесса, снимок в Redis под номером версии;
+    версия увеличивается при создании/удалении связей компании.
+    """
+
+    def __init__(self, maxsize: int = MEMBERSHIP_MAX_COMPANIES):
+        self._local = TTLCache(maxsize=maxsize, ttl=MEMBERSHIP_SNAPSHOT_TTL_SECONDS)
+
+    async def has_legal_entity(self, company_id, legal_entity_id) -> bool:
+        if company_id is None:
+            return False
+        membership = await self._get(str(company_id))
+        return str(legal_entity_id) in membership.legal_entity_ids
+
+    async def has_relation(self, company_id, relation_id) -> bool:
+        if company_id is None:
+            return False
+        membership = await self._get(str(company_id))
+        return str(relation_id) in membership.relation_ids
+
+    def forget(self, company_id):
+        """Сбрасывает только локальную копию (изменение пришло из другого процесса)."""
+        self._local.pop(str(company_id))
+
+    async def invalidate(self, company_id):
+        company_id = str(company_id)
+        self.forget(company_id)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.incr(_version_key(company_id))
+        except RedisError as e:
+            logger.warning(f"Не удалось сбросить индекс компании {company_id}: {e}")
+
+    def clear(self):
+        self._local.clear()
+
+    async def _get(self, company_id: str) -> CompanyMembership:
+        now = time.monotonic()
+        membership: Optional[CompanyMembership] = self._local.get(company_id)
+        if (
+            membership
+            and now - membership.checked_at < MEMBERSHIP_VERSION_CHECK_SECONDS
+        ):
+            return membership
+
+        redis = get_redis()
+        version = await self._redis_version(redis, company_id)
+        if membership and version is not None and membership.version == version:
+            membership = membership._replace(checked_at=now)
+            self._local.set(company_id, membership)
+            return membership
+
+        membership = await self._load_snapshot(redis, company_id, version, now)
+        if membership is None:
+            membership = await self._load_from_db(company_id, version or 0, now)
+            await self._store_snapshot(redis, company_id, membership)
+        self._local.set(company_id, membership)
+        return membership
+
+    async def _redis_version(self, redis, company_id: str) -> Optional[int]:
+        if redis is None:
+            return None
+        try:
+            return int(await redis.get(_version_key(company_id)) or 0)
+        except RedisError as e:
+            logger.warning(f"Redis недоступен для индекса компаний: {e}")
+            return None
+
+    async def _load_snapshot(self, redis, company_id, version, now):
+        if redis is None or version is None:
+            return None
+        try:
+            raw = await redis.get(_snapshot_key(company_id, version))
+        except RedisError:
+            return None
+        if raw is None:
+            return None
+        snapshot = json.loads(raw)
+        return CompanyMembership(
+            version=version,
+            legal_entity_ids=frozenset(snapshot["legal_entity_ids"]),
+            relation_ids=frozenset(snapshot["relation_ids"]),
+            checked_at=now,
+        )
+
+    async def _load_from_db(self, company_id, version, now) -> CompanyMembership:
+        rows = await company_relations(company_id)
+        return CompanyMembership(
+            version=version,
+            legal_entity_ids=frozenset(
+                str(legal_entity_id) for _, legal_entity_id in rows
+            ),
+            relation_ids=frozenset(str(relation_id) for relation_id, _ in rows),
+            checked_at=now,
+        )
+
+    async def _store_snapshot(self, redis, company_id, membership: CompanyMembership):
+        if redis is None:
+            return
+        snapshot = json.dumps(
+            {
+                "legal_entity_ids": sorted(membership.legal_entity_ids),
+                "relation_ids": sorted(membership.relation_ids),
+            }
+        )
+        try:
+            await redis.set(
+                _snapshot_key(company_id, membership.version),
+                snapshot,
+                ex=MEMBERSHIP_SNAPSHOT_TTL_SECONDS,
+            )
+        except RedisError:
+            pass
+
+
+membership_index = MembershipIndex()
+
+
+@on_commit
+async def invalidate_membership(changes: List[Change]):
+    for company_id in changed_company_ids(changes, [ENTITY_COMPANY_RELATION]):
+        await membership_index.invalidate(company_id)
+
+
+@on_remote_changes
+def forget_membership(changes: List[Change]):
+    for company_id in changed_company_ids(changes, [ENTITY_COMPANY_RELATION]):
+        membership_index.forget(company_id)
+
+
+on_bus_reset(membership_index.clear)
@@ -0,0 +1,199 @@
+import hashlib
+import time
+from typing import Dict, Iterable, List, Optional
+
+from loguru import logger
+from redis.exceptions import RedisError
+from tortoise.queryset import CountQuery, ValuesListQuery, ValuesQuery
+from tortoise.signals import post_delete, post_save
+
+from app.cache.invalidation import on_bus_reset, on_remote_changes
+from app.cache.redis_client import get_redis
+from app.cache.two_tier import TwoTierCache
+from app.database.models import (
+    CashRegister,
+    City,
+    EntityCompanyRelation,
+    LegalEntity,
+    LegalEntityType,
+    Warehouse,
+)
+from app.utils.change_entities import (
+    CASH_REGISTER,
+    CITY,
+    ENTITY_COMPANY_RELATION,
+    LEGAL_ENTITY,
+    WAREHOUSE,
+)
+from app.utils.change_log import Change, on_commit
+
+QUERY_CACHE_TTL_SECONDS = 300
+# Как часто перечитывать версии таблиц из Redis (записи мимо tracked_transaction)
+VERSION_CHECK_SECONDS = 5
+# После уведомления о чужой записи не кэшируем, пока писатель не увеличит версию
+REMOTE_WRITE_GRACE_SECONDS = 1
+
+CACHEABLE_QUERIES = (ValuesQuery, ValuesListQuery, CountQuery)
+
+ENTITY_TABLES = {
+    WAREHOUSE: Warehouse._meta.db_table,
+    CASH_REGISTER: CashRegister._meta.db_table,
+    CITY: City._meta.db_table,
+    LEGAL_ENTITY: LegalEntity._meta.db_table,
+    ENTITY_COMPANY_RELATION: EntityCompanyRelation._meta.db_table,
+}
+
+
+def _version_key(table: str) -> str:
+    return f"query:version:{table}"
+
+
+def query_tables(queryset, depends_on: Iterable = ()) -> List[str]:
+    """Таблицы запроса: основная, присоединённые JOIN и явно указанные модели."""
+    # Tortoise заполняет _joined_tables только при сборке запроса
+    queryset.sql()
+    return _compiled_query_tables(queryset, depends_on)
+
+
+def _compiled_query_tables(queryset, depends_on: Iterable) -> List[str]:
+    tables = {queryset.model._meta.db_table}
+    tables.update(table._table_name for table in queryset._joined_tables)
+    tables.update(model._meta.db_table for model in depends_on)
+    return sorted(tables)
+
+
+class QueryCache:
+    """
+    Кэш результатов запросов Tortoise: ключ — скомпилированный SQL
+    с параметрами и версии участвующих таблиц. Версия таблицы растёт
+    при любой записи через модели, поэтому старые ключи просто перестают
+    использоваться и истекают по TTL.
+    """
+
+    def __init__(self, ttl: float = QUERY_CACHE_TTL_SECONDS):
+        self.cache = TwoTierCache("query", ttl=ttl)
+        self._versions: Dict[str, tuple] = {}
+        self._unstable_until: Dict[str, float] = {}
+
+    async def fetch(self, queryset, depends_on: Iterable = ()):
+        """
+        Выполняет values()/values_list()/count() через кэш.
+        Подзапросы в фильтрах не видны по SQL — их модели передаются в depends_on.
+        """
+        if not isinstance(queryset, CACHEABLE_QUERIES):
+            raise TypeError("Кэшируются только values(), values_list() и count()")
+
+        sql = queryset.sql(params_inline=True)
+        tables = _compiled_query_tables(queryset, depends_on)
+        versions = await self._get_versions(tables)
+        if versions is None:
+            return await queryset
+
+        key = hashlib.sha256(f"{versions}\n{sql}".encode()).hexdigest()
+        return await self.cache.get_or_set(key, lambda: self._execute(queryset))
+
+    async def _execute(self, queryset):
+        # sql() уже выбрал соединение; промах кэша читает из основной базы
+        queryset._db = None
+        return await queryset
+
+    async def _get_versions(self, tables: List[str]) -> Optional[str]:
+        now = time.monotonic()
+        if any(self._unstable_until.get(table, 0) > now for table in tables):
+            return None
+
+        stale = [
+            table
+            for table in tables
+            if now - self._versions.get(table, (0, float("-inf")))[1]
+            > VERSION_CHECK_SECONDS
+        ]
+        if stale:
+            redis = get_redis()
+            if redis is None:
+                for table in stale:
+                    self._versions[table] = (self._versions.get(table, (0,))[0], now)
+            else:
+                try:
+                    values = await redis.mget([_version_key(t) for t in stale])
+                except RedisError as e:
+                    logger.warning(f"Redis недоступен для версий таблиц: {e}")
+                    return None
+                for table, value in zip(stale, values):
+                    self._versions[table] = (int(value or 0), now)
+
+        return ",".join(f"{table}:{self._versions[table][0]}" for table in tables)
+
+    async def bump(self, tables: Iterable[str]):
+        """Запись в этом процессе: новая версия таблицы сразу видна всем."""
+        redis = get_redis()
+        now = time.monotonic()
+        for table in tables:
+            if redis is None:
+                self._versions[table] = (self._versions.get(table, (0,))[0] + 1, now)
+                continue
+            try:
+                self._versions[table] = (await redis.incr(_version_key(table)), now)
+            except RedisError as e:
+                logger.warning(f"Не удалось увеличить версию таблицы {table}: {e}")
+                self._versions.pop(table, None)
+                self._unstable_until[table] = now + VERSION_CHECK_SECONDS
+
+    def remote_write(self, tables: Iterable[str]):
+        """Запись в другом процессе: перечитать версию после её увеличения."""
+        now = time.monotonic()
+        for table in tables:
+            if get_redis() is None:
+                self._versions[table] = (self._versions.get(table, (0,))[0] + 1, now)
+            else:
+                self._versions.pop(table, None)
+                self._unstable_until[table] = now + REMOTE_WRITE_GRACE_SECONDS
+
+    def reset(self):
+        self._versions.clear()
+        self._unstable_until.clear()
+        self.cache.clear_local()
+
+
+query_cache = QueryCache()
+
+
+def _changed_tables(changes: List[Change]) -> set:
+    return {
+        ENTITY_TABLES[change.entity]
+        for change in changes
+        if change.entity in ENTITY_TABLES
+    }
+
+
+@on_commit
+async def bump_committed_tables(changes: List[Change]):
+    await query_cache.bump(_changed_tables(changes))
+
+
+@on_remote_changes
+def mark_remote_tables(changes: List[Change]):
+    query_cache.remote_write(_changed_tables(changes))
+
+
+on_bus_reset(query_cache.reset)
+
+CACHED_MODELS = (
+    LegalEntityType,
+    City,
+    Warehouse,
+    CashRegister,
+    LegalEntity,
+    EntityCompanyRelation,
+)
+
+
+# Записи мимо tracked_transaction (скрипты, фикстуры) тоже увеличивают версию
+@post_save(*CACHED_MODELS)
+async def bump_on_save(sender, instance, created, using_db, update_fields):
+    await query_cache.bump([sender._meta.db_table])
+
+
+@post_delete(*CACHED_MODELS)
+async def bump_on_delete(sender, instance, using_db):
+    await query_cache.bump([sender._meta.db_table])
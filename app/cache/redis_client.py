@@ -0,0 +1,42 @@
+from typing import Optional
+
+from redis.asyncio import BlockingConnectionPool, Redis
+
+from app.cache.circuit_breaker import GuardedRedis, RedisCircuitBreaker
+
+_redis: Optional[Redis] = None
+
+
+def set_redis(client: Optional[Redis]):
+    global _redis
+    _redis = client
+
+
+def get_redis() -> Optional[Redis]:
+    """Общий клиент Redis процесса; None, если Redis не подключён (тесты)."""
+    return _redis
+
+
+def create_redis(settings) -> GuardedRedis:
+    """
+    Клиент с ограниченным пулом: при исчерпании соединений запрос ждёт
+    REDIS_POOL_TIMEOUT, а не открывает новые соединения без предела.
+    Команды ограничены REDIS_COMMAND_TIMEOUT и идут через предохранитель.
+    """
+    pool = BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        health_check_interval=30,
+        retry_on_timeout=True,
+    )
+    client = Redis(connection_pool=pool)
+    breaker = RedisCircuitBreaker(
+        client,
+        failure_threshold=settings.REDIS_BREAKER_FAILURES,
+        probe_interval=settings.REDIS_BREAKER_PROBE_INTERVAL,
+        probe_timeout=settings.REDIS_COMMAND_TIMEOUT,
+    )
+    return GuardedRedis(client, timeout=settings.REDIS_COMMAND_TIMEOUT, breaker=breaker)
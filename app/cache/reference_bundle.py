@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import json
+from typing import List, NamedTuple, Optional
+
+from loguru import logger
+from redis.exceptions import RedisError
+from tiacore_lib.pydantic_models.entity_type_models import LegalEntityTypeSchema
+from tiacore_lib.pydantic_models.legal_entity_models import LegalEntitySchema
+
+from app.cache.invalidation import on_bus_reset, on_remote_changes
+from app.cache.local import TTLCache
+from app.cache.redis_client import get_redis
+from app.database.models import CashRegister, LegalEntity, LegalEntityType, Warehouse
+from app.database.router import primary_reads
+from app.pydantic_models.cash_register_models import CashRegisterSchema
+from app.pydantic_models.warehouse_models import WarehouseSchema
+from app.utils.change_entities import (
+    CASH_REGISTER,
+    ENTITY_COMPANY_RELATION,
+    LEGAL_ENTITY,
+    WAREHOUSE,
+)
+from app.utils.change_log import Change, changed_company_ids, on_commit
+from app.utils.change_payloads import LEGAL_ENTITY_FIELDS, STAFF_FIELDS
+from app.utils.singleflight import SingleFlight
+
+# Меняется при изменении формата пакета — старые снимки в Redis не читаются
+BUNDLE_FORMAT = 1
+BUNDLE_SNAPSHOT_TTL_SECONDS = 24 * 3600
+# Без Redis другие процессы не узнают об изменениях, держим копию недолго
+BUNDLE_LOCAL_TTL_WITHOUT_REDIS = 5
+BUNDLE_MAX_COMPANIES = 1_000
+
+BUNDLE_ENTITIES = {WAREHOUSE, CASH_REGISTER, LEGAL_ENTITY, ENTITY_COMPANY_RELATION}
+
+
+class ReferenceBundle(NamedTuple):
+    version: Optional[int]
+    etag: str
+    body: bytes
+
+
+def _version_key(company_id: str) -> str:
+    return f"reference:bundle:{company_id}:version"
+
+
+def _snapshot_key(company_id: str, version: int) -> str:
+    return f"reference:bundle:{BUNDLE_FORMAT}:{company_id}:{version}"
+
+
+def _dump(schema, rows) -> list:
+    return [schema(**row).model_dump(mode="json", by_alias=True) for row in rows]
+
+
+async def build_bundle(company_id: str) -> dict:
+    """Справочники компании для первичной загрузки клиента."""
+
+    def related(relation_type):
+        return (
+            LegalEntity.filter(
+                entity_company_relations__company_id=company_id,
+                entity_company_relations__relation_type=relation_type,
+            )
+            .distinct()
+            .order_by("short_name", "id")
+            .values(*LEGAL_ENTITY_FIELDS)
+        )
+
+    entity_types, warehouses, cash_registers, buyers, sellers = await asyncio.gather(
+        LegalEntityType.all().order_by("id").values("id", "name"),
+        Warehouse.filter(company_id=company_id)
+        .order_by("name", "id")
+        .values(*STAFF_FIELDS),
+        CashRegister.filter(company_id=company_id)
+        .order_by("name", "id")
+        .values(*STAFF_FIELDS),
+        related("buyer"),
+        related("seller"),
+    )
+    return {
+        "company_id": company_id,
+        "legal_entity_types": _dump(LegalEntityTypeSchema, entity_types),
+        "warehouses": _dump(WarehouseSchema, warehouses),
+        "cash_registers": _dump(CashRegisterSchema, cash_registers),
+        "buyers": _dump(LegalEntitySchema, buyers),
+        "sellers": _dump(LegalEntitySchema, sellers),
+    }
+
+
+def encode_bundle(content: dict, version: Optional[int]) -> ReferenceBundle:
+    raw = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    etag = hashlib.sha256(raw.encode()).hexdigest()
+    body = json.dumps(
+        {"hash": etag, **content}, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+    return ReferenceBundle(version=version, etag=etag, body=body)
+
+
+class ReferenceBundleCache:
+    """
+    Готовые пакеты справочников по компаниям: копия в памяти процесса и
+    снимок в Redis под номером версии. Версия увеличивается после коммита
+    изменений складов, касс, юрлиц и связей компании.
+    """
+
+    def __init__(self, maxsize: int = BUNDLE_MAX_COMPANIES):
+        self._local = TTLCache(maxsize=maxsize, ttl=BUNDLE_SNAPSHOT_TTL_SECONDS)
+        self._builds = SingleFlight()
+
+    async def get(self, company_id) -> ReferenceBundle:
+        company_id = str(company_id)
+        redis = get_redis()
+        version = await self._redis_version(redis, company_id)
+
+        bundle: Optional[ReferenceBundle] = self._local.get(company_id)
+        if bundle and (version is None or bundle.version == version):
+            return bundle
+
+        bundle = await self._load_snapshot(redis, company_id, version)
+        if bundle is None:
+            # Сборку после сброса выполняет один запрос, остальные ждут её
+            bundle = await self._builds.do(
+                (company_id, version), lambda: self._build(redis, company_id, version)
+            )
+
+        ttl = BUNDLE_LOCAL_TTL_WITHOUT_REDIS if version is None else None
+        self._local.set(company_id, bundle, ttl=ttl)
+        return bundle
+
+    def forget(self, company_id):
+        """Сбрасывает только локальную копию (изменение пришло из другого процесса)."""
+        self._local.pop(str(company_id))
+
+    async def invalidate(self, company_id):
+        company_id = str(company_id)
+        self.forget(company_id)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.incr(_version_key(company_id))
+        except RedisError as e:
+            logger.warning(f"Не удалось сбросить пакет справочников {company_id}: {e}")
+
+    def clear(self):
+        self._local.clear()
+
+    async def _build(self, redis, company_id, version) -> ReferenceBundle:
+        with primary_reads():
+            bundle = encode_bundle(await build_bundle(company_id), version)
+        if redis is not None and version is not None:
+            try:
+                await redis.set(
+                    _snapshot_key(company_id, version),
+                    bundle.etag.encode() + b"\n" + bundle.body,
+                    ex=BUNDLE_SNAPSHOT_TTL_SECONDS,
+                )
+            except RedisError:
+                pass
+        return bundle
+
+    async def _redis_version(self, redis, company_id: str) -> Optional[int]:
+        if redis is None:
+            return None
+        try:
+            return int(await redis.get(_version_key(company_id)) or 0)
+        except RedisError as e:
+            logger.warning(f"Redis недоступен для пакета справочников: {e}")
+            return None
+
+    async def _load_snapshot(self, redis, company_id, version):
+        if redis is None or version is None:
+            return None
+        try:
+            raw = await redis.get(_snapshot_key(company_id, version))
+        except RedisError:
+            return None
+        if raw is None:
+            return None
+        etag, body = raw.split(b"\n", 1)
+        return ReferenceBundle(version=version, etag=etag.decode(), body=body)
+
+
+reference_bundle_cache = ReferenceBundleCache()
+
+
+@on_commit
+async def invalidate_reference_bundles(changes: List[Change]):
+    for company_id in changed_company_ids(changes, BUNDLE_ENTITIES):
+        await reference_bundle_cache.invalidate(company_id)
+
+
+@on_remote_changes
+def forget_reference_bundles(changes: List[Change]):
+    for company_id in changed_company_ids(changes, BUNDLE_ENTITIES):
+        reference_bundle_cache.forget(company_id)
+
+
+on_bus_reset(reference_bundle_cache.clear)
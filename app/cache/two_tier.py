@@ -0,0 +1,138 @@
+import time
+from typing import Any, Awaitable, Callable, Optional
+from weakref import WeakSet
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from app.cache import codec
+from app.cache.invalidation import on_bus_reset
+from app.cache.local import ByteLRUCache
+from app.cache.redis_client import get_redis
+from app.database.router import primary_reads
+from app.utils.singleflight import SingleFlight
+from metrics.cache_metrics import cache_evictions, cache_latency, cache_requests
+
+L1_MAX_BYTES = 16 * 1024 * 1024
+# Локальная копия живёт меньше общей: другие процессы могли изменить данные
+L1_MAX_TTL_SECONDS = 30
+
+_caches: "WeakSet[TwoTierCache]" = WeakSet()
+
+
+class TwoTierCache:
+    """
+    Кэш пространства имён: L1 в памяти процесса (ограничен по байтам)
+    перед общим L2 в Redis. Значения хранятся в компактном виде (orjson/zstd).
+    Без Redis работает только L1. Значения — JSON-совместимые структуры:
+    из кэша они возвращаются в том виде, в каком их отдаёт orjson.loads.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float,
+        l1_ttl: Optional[float] = None,
+        l1_max_bytes: int = L1_MAX_BYTES,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.l1 = ByteLRUCache(
+            max_bytes=l1_max_bytes,
+            ttl=min(ttl, L1_MAX_TTL_SECONDS) if l1_ttl is None else l1_ttl,
+            on_evict=cache_evictions.labels(namespace=namespace).inc,
+        )
+        self._loads = SingleFlight()
+        _caches.add(self)
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        started = time.perf_counter()
+        data = self.l1.get(key)
+        self._observe("l1", "get", started)
+        if data is not None:
+            cache_requests.labels(self.namespace, "l1", "hit").inc()
+            return codec.decode(data)
+        cache_requests.labels(self.namespace, "l1", "miss").inc()
+
+        redis = get_redis()
+        if redis is None:
+            return default
+        started = time.perf_counter()
+        try:
+            data = await redis.get(self._redis_key(key))
+        except RedisError as e:
+            logger.warning(f"Redis недоступен для кэша {self.namespace}: {e}")
+            cache_requests.labels(self.namespace, "l2", "error").inc()
+            return default
+        finally:
+            self._observe("l2", "get", started)
+
+        if data is None:
+            cache_requests.labels(self.namespace, "l2", "miss").inc()
+            return default
+        cache_requests.labels(self.namespace, "l2", "hit").inc()
+        self.l1.set(key, data)
+        return codec.decode(data)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        await self._store(key, codec.encode(value), ttl)
+
+    async def _store(self, key: str, data: bytes, ttl: Optional[float] = None):
+        self.l1.set(key, data)
+
+        redis = get_redis()
+        if redis is None:
+            return
+        started = time.perf_counter()
+        try:
+            await redis.set(self._redis_key(key), data, ex=int(ttl or self.ttl))
+        except RedisError as e:
+            logger.warning(f"Не удалось записать кэш {self.namespace}: {e}")
+        finally:
+            self._observe("l2", "set", started)
+
+    async def delete(self, key: str):
+        self.l1.pop(key)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(self._redis_key(key))
+        except RedisError as e:
+            logger.warning(f"Не удалось удалить ключ кэша {self.namespace}: {e}")
+
+    async def get_or_set(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Значение из кэша или из loader; одновременные промахи грузят один раз.
+        Результат loader возвращается в том же виде, что и из кэша
+        (UUID и даты — строками), чтобы тип не зависел от попадания.
+        """
+        missing = object()
+        value = await self.get(key, missing)
+        if value is not missing:
+            return value
+
+        async def load():
+            with primary_reads():
+                data = codec.encode(await loader())
+            await self._store(key, data)
+            return codec.decode(data)
+
+        return await self._loads.do(key, load)
+
+    def clear_local(self):
+        self.l1.clear()
+
+    def _observe(self, tier: str, operation: str, started: float):
+        cache_latency.labels(self.namespace, tier, operation).observe(
+            time.perf_counter() - started
+        )
+
+
+@on_bus_reset
+def clear_local_caches():
+    for cache in list(_caches):
+        cache.clear_local()
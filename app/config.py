@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic_settings import SettingsConfigDict
 from tiacore_lib.config import (
@@ -24,6 +24,61 @@ class BaseConfig(SharedBaseConfig):
 
     AUTH_BROKER_URL: str = ""
 
+    REFERENCE_EVENTS_EXCHANGE: str = "reference-events"
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL: float = 1.0
+
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 1.0
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+    REDIS_COMMAND_TIMEOUT: float = 0.25
+    REDIS_BREAKER_FAILURES: int = 5
+    REDIS_BREAKER_PROBE_INTERVAL: float = 1.0
+
+    # Пул asyncpg на процесс: workers * DB_POOL_MAX_SIZE (+1 соединение LISTEN
+    # на процесс) должно помещаться в max_connections Postgres
+    DB_POOL_MIN_SIZE: int = 2
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_ACQUIRE_TIMEOUT: float = 5.0
+    DB_POOL_MAX_QUERIES: int = 50_000
+    DB_CONNECTION_MAX_IDLE_SECONDS: float = 300.0
+    # 0 — за PgBouncer в режиме transaction, где подготовленные выражения не живут
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_COMMAND_TIMEOUT: float = 30.0
+
+    # Реплика для чтений GET; пусто — всё читается из основной базы
+    DB_REPLICA_URL: Optional[str] = None
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_LAG_CHECK_SECONDS: float = 2.0
+    # Сколько после записи компании её чтения идут в основную базу
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # Запросы дольше порога пишутся в лог (параметры скрыты)
+    DB_SLOW_QUERY_SECONDS: float = 0.5
+    # Число запросов и время БД в заголовках ответа и access-логе
+    DB_QUERY_DEBUG: bool = False
+
+    # Логи: уровень, JSON для Loki, доля SUCCESS- и access-записей. stdout
+    # пишется всегда; LOG_FILE — дополнительно файл для promtail (пусто — нет)
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = False
+    LOG_SUCCESS_SAMPLE_RATE: float = 1.0
+    LOG_ACCESS_SAMPLE_RATE: float = 1.0
+    LOG_FILE: str = "logs/app.log"
+
+    # Разрешённые источники CORS; пусто — middleware CORS не подключается
+    CORS_ALLOW_ORIGINS: List[str] = ["*"]
+
+    # Трассировка: exporter otlp | console | file. С хвостовым сэмплированием
+    # в экспорт идут доля TRACING_SAMPLE_RATE, медленные и ошибочные запросы
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "otlp"
+    TRACING_OTLP_ENDPOINT: str = "http://jaeger:4318/v1/traces"
+    TRACING_FILE: str = "logs/traces.jsonl"
+    TRACING_SAMPLE_RATE: float = 0.05
+    TRACING_SLOW_SECONDS: float = 1.0
+    TRACING_TAIL_SAMPLING: bool = True
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -47,6 +102,60 @@ class TestConfig(SharedTestConfig):
     YANDEX_API_KEY: str = ""
     FOLDER_ID: str = ""
     AUTH_BROKER_URL: str = ""
+    REFERENCE_EVENTS_EXCHANGE: str = "reference-events"
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL: float = 1.0
+
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 1.0
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+    REDIS_COMMAND_TIMEOUT: float = 0.25
+    REDIS_BREAKER_FAILURES: int = 5
+    REDIS_BREAKER_PROBE_INTERVAL: float = 1.0
+
+    # Пул asyncpg на процесс: workers * DB_POOL_MAX_SIZE (+1 соединение LISTEN
+    # на процесс) должно помещаться в max_connections Postgres
+    DB_POOL_MIN_SIZE: int = 2
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_ACQUIRE_TIMEOUT: float = 5.0
+    DB_POOL_MAX_QUERIES: int = 50_000
+    DB_CONNECTION_MAX_IDLE_SECONDS: float = 300.0
+    # 0 — за PgBouncer в режиме transaction, где подготовленные выражения не живут
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_COMMAND_TIMEOUT: float = 30.0
+
+    # Реплика для чтений GET; пусто — всё читается из основной базы
+    DB_REPLICA_URL: Optional[str] = None
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_LAG_CHECK_SECONDS: float = 2.0
+    # Сколько после записи компании её чтения идут в основную базу
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # Запросы дольше порога пишутся в лог (параметры скрыты)
+    DB_SLOW_QUERY_SECONDS: float = 0.5
+    # Число запросов и время БД в заголовках ответа и access-логе
+    DB_QUERY_DEBUG: bool = False
+
+    # Логи: уровень, JSON для Loki, доля SUCCESS- и access-записей. stdout
+    # пишется всегда; LOG_FILE — дополнительно файл для promtail (пусто — нет)
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = False
+    LOG_SUCCESS_SAMPLE_RATE: float = 1.0
+    LOG_ACCESS_SAMPLE_RATE: float = 1.0
+    LOG_FILE: str = "logs/app.log"
+
+    # Разрешённые источники CORS; пусто — middleware CORS не подключается
+    CORS_ALLOW_ORIGINS: List[str] = ["*"]
+
+    # Трассировка: exporter otlp | console | file. С хвостовым сэмплированием
+    # в экспорт идут доля TRACING_SAMPLE_RATE, медленные и ошибочные запросы
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "otlp"
+    TRACING_OTLP_ENDPOINT: str = "http://jaeger:4318/v1/traces"
+    TRACING_FILE: str = "logs/traces.jsonl"
+    TRACING_SAMPLE_RATE: float = 0.05
+    TRACING_SLOW_SECONDS: float = 1.0
+    TRACING_TAIL_SAMPLING: bool = True
 
     model_config = SettingsConfigDict(
         env_file=".env.test",
@@ -69,6 +178,7 @@ class DockerConfig(BaseConfig):
 
 class DevConfig(BaseConfig):
     DATABASE_URL: str = "sqlite:///server.db"
+    LOG_LEVEL: str = "DEBUG"
 
     @property
     def db_url(self) -> str:
@@ -85,6 +195,9 @@ class ServerConfig(BaseConfig):
 
 class ProdConfig(BaseConfig):
     DATABASE_URL: str = "sqlite:///server.db"
+    LOG_JSON: bool = True
+    LOG_SUCCESS_SAMPLE_RATE: float = 0.1
+    LOG_ACCESS_SAMPLE_RATE: float = 0.1
 
     @property
     def db_url(self) -> str:
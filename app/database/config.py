@@ -4,6 +4,7 @@ from dotenv import load_dotenv
 from tiacore_lib.config import ConfigName
 
 from app.config import _load_settings
+from app.database.engine import tortoise_config
 
 load_dotenv()
 
@@ -12,13 +13,5 @@ PORT = os.getenv("PORT", 8000)
 CONFIG_NAME = ConfigName(os.getenv("CONFIG_NAME", "Development"))
 settings = _load_settings(config_name=CONFIG_NAME)
 
-TORTOISE_ORM = {
-    "connections": {"default": settings.db_url},
-    "apps": {
-        "models": {
-            # Укажите только модуль
-            "models": ["app.database.models", "aerich.models"],
-            "default_connection": "default",
-        },
-    },
-}
+# Укажите только модуль; при DB_REPLICA_URL — ещё реплика и роутер чтений
+TORTOISE_ORM = tortoise_config(settings, ["app.database.models", "aerich.models"])
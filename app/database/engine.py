@@ -0,0 +1,138 @@
+import asyncio
+import time
+from typing import List, Optional, Union
+
+import asyncpg
+from tortoise.backends.asyncpg.client import AsyncpgDBClient, TransactionWrapper
+from tortoise.backends.base.client import (
+    NestedTransactionContext,
+    TransactionContextPooled,
+)
+from tortoise.backends.base.config_generator import expand_db_url
+
+from app.database.query_timing import TimedQueriesMixin
+from metrics.db_metrics import (
+    db_pool_acquire_seconds,
+    db_pool_acquire_timeouts,
+    db_pool_in_use,
+    db_pool_max_size,
+    db_pool_size,
+)
+
+ENGINE = "app.database.engine"
+
+# Имена подключений Tortoise. При заданной реплике подключений два, и
+# in_transaction() без имени не работает — транзакции открываются на PRIMARY
+PRIMARY = "default"
+REPLICA = "replica"
+
+
+class InstrumentedPool:
+    """
+    Пул asyncpg с таймаутом ожидания соединения и метриками занятости.
+    Tortoise берёт соединения только через acquire/release — и для обычных
+    запросов, и для транзакций, поэтому учитываются оба пути.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, name: str, acquire_timeout: Optional[float]):
+        self._pool = pool
+        self.name = name
+        self.acquire_timeout = acquire_timeout
+        db_pool_max_size.labels(name).set(pool.get_max_size())
+        self.observe()
+
+    async def acquire(self, *, timeout: Optional[float] = None):
+        started = time.perf_counter()
+        try:
+            connection = await self._pool.acquire(
+                timeout=timeout if timeout is not None else self.acquire_timeout
+            )
+        except asyncio.TimeoutError:
+            db_pool_acquire_timeouts.labels(self.name).inc()
+            raise
+        finally:
+            db_pool_acquire_seconds.labels(self.name).observe(
+                time.perf_counter() - started
+            )
+        self.observe()
+        return connection
+
+    async def release(self, connection, *, timeout: Optional[float] = None):
+        await self._pool.release(connection, timeout=timeout)
+        self.observe()
+
+    def observe(self):
+        size = self._pool.get_size()
+        db_pool_size.labels(self.name).set(size)
+        db_pool_in_use.labels(self.name).set(size - self._pool.get_idle_size())
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+
+class InstrumentedTransactionWrapper(TimedQueriesMixin, TransactionWrapper):
+    """Транзакция Tortoise с замером запросов, включая вложенные (savepoint)."""
+
+    def _in_transaction(self) -> NestedTransactionContext:
+        return NestedTransactionContext(InstrumentedTransactionWrapper(self))
+
+
+class InstrumentedAsyncpgClient(TimedQueriesMixin, AsyncpgDBClient):
+    """Клиент asyncpg для Tortoise с пулом InstrumentedPool и замером запросов."""
+
+    def __init__(self, acquire_timeout=None, **kwargs):
+        super().__init__(**kwargs)
+        self.acquire_timeout = float(acquire_timeout) if acquire_timeout else None
+
+    async def create_pool(self, **kwargs) -> InstrumentedPool:
+        pool = await super().create_pool(**kwargs)
+        return InstrumentedPool(pool, self.connection_name, self.acquire_timeout)
+
+    def _in_transaction(self) -> TransactionContextPooled:
+        # Стандартная обёртка транзакции — AsyncpgDBClient без замера
+        return TransactionContextPooled(
+            InstrumentedTransactionWrapper(self), self._pool_init_lock
+        )
+
+
+client_class = InstrumentedAsyncpgClient
+
+
+def connection_config(settings, db_url: Optional[str] = None) -> Union[str, dict]:
+    """
+    Подключение Tortoise из db_url (по умолчанию settings.db_url) и настроек
+    пула. Для Postgres — клиент с метриками; остальные базы (sqlite
+    в разработке) как есть.
+    """
+    db_url = db_url or settings.db_url
+    config = expand_db_url(db_url)
+    if config["engine"] != "tortoise.backends.asyncpg":
+        return db_url
+    config["engine"] = ENGINE
+    config["credentials"].update(
+        minsize=settings.DB_POOL_MIN_SIZE,
+        maxsize=settings.DB_POOL_MAX_SIZE,
+        acquire_timeout=settings.DB_POOL_ACQUIRE_TIMEOUT,
+        max_queries=settings.DB_POOL_MAX_QUERIES,
+        max_inactive_connection_lifetime=settings.DB_CONNECTION_MAX_IDLE_SECONDS,
+        statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+        command_timeout=settings.DB_COMMAND_TIMEOUT,
+    )
+    return config
+
+
+def tortoise_config(settings, models: List[str]) -> dict:
+    """
+    Конфигурация Tortoise: основная база и, если задан DB_REPLICA_URL,
+    реплика с роутером чтений (см. app.database.router).
+    """
+    config = {
+        "connections": {PRIMARY: connection_config(settings)},
+        "apps": {"models": {"models": models, "default_connection": PRIMARY}},
+    }
+    if settings.DB_REPLICA_URL:
+        config["connections"][REPLICA] = connection_config(
+            settings, settings.DB_REPLICA_URL
+        )
+        config["routers"] = ["app.database.router.ReplicaRouter"]
+    return config
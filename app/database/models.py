@@ -2,9 +2,18 @@ import uuid
 
 from tortoise import fields
 from tortoise.fields.relational import ReverseRelation
+from tortoise.indexes import Index
 from tortoise.models import Model
 
 
+class ConditionalIndex(Index):
+    """Частичный индекс с условием WHERE (PartialIndex умеет только равенства)."""
+
+    def __init__(self, *, fields, name: str, where: str):
+        super().__init__(fields=fields, name=name)
+        self.extra = f" WHERE {where}"
+
+
 class LegalEntityType(Model):
     id = fields.CharField(pk=True, max_length=255)
     name = fields.CharField(max_length=255)
@@ -33,6 +42,7 @@ class LegalEntity(Model):
     class Meta:
         table = "legal_entities"
         unique_together = (("inn", "kpp"),)
+        indexes = (("short_name", "id"),)
 
 
 class EntityCompanyRelation(Model):
@@ -49,6 +59,10 @@ class EntityCompanyRelation(Model):
 
     class Meta:
         table = "entity_company_relations"
+        indexes = (
+            ("company_id", "created_at", "id"),
+            ("legal_entity_id", "company_id"),
+        )
 
 
 class Warehouse(Model):
@@ -64,6 +78,7 @@ class Warehouse(Model):
 
     class Meta:
         table = "warehouses"
+        indexes = (("company_id", "name", "id"), ("company_id", "created_at", "id"))
 
 
 class CashRegister(Model):
@@ -79,6 +94,7 @@ class CashRegister(Model):
 
     class Meta:
         table = "cash_registers"
+        indexes = (("company_id", "name", "id"), ("company_id", "created_at", "id"))
 
 
 class City(Model):
@@ -90,3 +106,37 @@ class City(Model):
 
     class Meta:
         table = "cities"
+        indexes = (("name", "id"), ("region", "id"))
+
+
+class ChangeLogEntry(Model):
+    id = fields.BigIntField(pk=True)
+    entity = fields.CharField(max_length=50)
+    entity_id = fields.UUIDField()
+    # NULL — глобальный справочник (города), иначе изменение видно только компании
+    company_id = fields.UUIDField(null=True)
+    operation = fields.CharField(max_length=10)
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "change_log"
+        indexes = (("company_id", "id"),)
+
+
+class OutboxEvent(Model):
+    id = fields.BigIntField(pk=True)
+    routing_key = fields.CharField(max_length=100)
+    payload = fields.JSONField()
+    created_at = fields.DatetimeField(auto_now_add=True)
+    published_at = fields.DatetimeField(null=True)
+
+    class Meta:
+        table = "outbox_events"
+        # Та же, что в миграции 5: очередь публикации не читает весь архив
+        indexes = (
+            ConditionalIndex(
+                fields=("id",),
+                name="idx_outbox_events_unpublished",
+                where='"published_at" IS NULL',
+            ),
+        )
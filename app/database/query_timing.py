@@ -0,0 +1,179 @@
+import hashlib
+import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from loguru import logger
+
+from metrics.db_metrics import db_query_duration, db_query_rows
+from metrics.http_metrics import route_template
+from metrics.tracer import record_span
+
+SLOW_QUERY_SECONDS = 0.5
+
+# Запросы вне HTTP: слушатель шины, outbox, фоновые задачи
+BACKGROUND_ROUTE = "background"
+
+_SPACES = re.compile(r"\s+")
+_PLACEHOLDERS = re.compile(r"\$\d+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\?(?:, ?\?)+\)")
+_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+"?(\w+)"?', re.IGNORECASE)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql: str) -> Tuple[str, str]:
+    """
+    Метка запроса и его нормализованный текст: параметры и литералы
+    заменены на "?", списки IN свёрнуты. Метка — "SELECT таблица хэш":
+    читается в Grafana и не зависит от значений.
+    """
+    normalized = _SPACES.sub(" ", sql).strip()
+    normalized = _PLACEHOLDERS.sub("?", normalized)
+    normalized = _LITERALS.sub("?", normalized)
+    normalized = _LISTS.sub("(...)", normalized)
+    verb = normalized.split(" ", 1)[0].upper()
+    table = _TABLE.search(normalized)
+    digest = hashlib.sha1(normalized.encode()).hexdigest()[:8]
+    return f"{verb} {table.group(1) if table else '-'} {digest}", normalized
+
+
+def redact(values) -> str:
+    """Вместо значений параметров в лог попадают только их типы."""
+    if not values:
+        return "[]"
+    return "[" + ", ".join(type(value).__name__ for value in values) + "]"
+
+
+class RequestQueries:
+    """Запросы к БД в рамках одного HTTP-запроса."""
+
+    __slots__ = ("scope", "count", "seconds")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+
+
+_request_queries: ContextVar[Optional[RequestQueries]] = ContextVar(
+    "request_queries", default=None
+)
+
+
+class QueryTiming:
+    def __init__(self, slow_seconds: float = SLOW_QUERY_SECONDS):
+        self.slow_seconds = slow_seconds
+
+    def observe(self, sql: str, values, elapsed: float, rows: int):
+        label, normalized = fingerprint(sql)
+        current = _request_queries.get()
+        if current is None:
+            route = BACKGROUND_ROUTE
+        else:
+            route = route_template(current.scope)
+            current.count += 1
+            current.seconds += elapsed
+
+        db_query_duration.labels(label, route).observe(elapsed)
+        db_query_rows.labels(label, route).observe(rows)
+        record_span(
+            label,
+            elapsed,
+            {"db.statement": normalized, "db.fingerprint": label, "db.rows": rows},
+        )
+        if elapsed >= self.slow_seconds:
+            logger.warning(
+                f"Медленный запрос {elapsed * 1000:.0f} мс [{label}] {route}: "
+                f"{normalized} params={redact(values)}"
+            )
+
+
+query_timing = QueryTiming()
+
+
+def configure_query_timing(settings):
+    query_timing.slow_seconds = settings.DB_SLOW_QUERY_SECONDS
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI-middleware: считает запросы к БД и их время для каждого HTTP-запроса.
+    В режиме отладки добавляет X-DB-Queries и X-DB-Time-Ms в ответ
+    и пишет их в access-лог.
+    """
+
+    def __init__(self, app, debug: bool = False):
+        self.app = app
+        self.debug = debug
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        current = RequestQueries(scope)
+        token = _request_queries.set(current)
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.debug:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-db-queries", str(current.count).encode()),
+                        (b"x-db-time-ms", f"{current.seconds * 1000:.1f}".encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_queries.reset(token)
+            if self.debug:
+                logger.info(
+                    f'"{scope["method"]} {scope["path"]}" {status} — '
+                    f"БД: {current.count} запросов, {current.seconds * 1000:.1f} мс"
+                )
+
+
+class TimedQueriesMixin:
+    """Замер execute_* клиента Tortoise; подмешивается перед классом клиента."""
+
+    async def execute_query(self, query: str, values: Optional[list] = None):
+        started = time.perf_counter()
+        rows = 0
+        try:
+            result = await super().execute_query(query, values)
+            rows = len(result[1])
+            return result
+        finally:
+            query_timing.observe(query, values, time.perf_counter() - started, rows)
+
+    async def execute_query_dict(self, query: str, values: Optional[list] = None):
+        started = time.perf_counter()
+        rows = 0
+        try:
+            result = await super().execute_query_dict(query, values)
+            rows = len(result)
+            return result
+        finally:
+            query_timing.observe(query, values, time.perf_counter() - started, rows)
+
+    async def execute_insert(self, query: str, values: list):
+        started = time.perf_counter()
+        try:
+            return await super().execute_insert(query, values)
+        finally:
+            query_timing.observe(query, values, time.perf_counter() - started, 1)
+
+    async def execute_many(self, query: str, values: list):
+        started = time.perf_counter()
+        try:
+            return await super().execute_many(query, values)
+        finally:
+            query_timing.observe(query, None, time.perf_counter() - started, 0)
@@ -0,0 +1,212 @@
+import json
+import time
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from tortoise import Tortoise
+
+from app.database.engine import PRIMARY
+from app.database.models import EntityCompanyRelation, LegalEntity
+from app.database.query_timing import query_timing
+from app.utils.change_payloads import LEGAL_ENTITY_FIELDS
+
+# Горячие чтения выполняются напрямую на соединении asyncpg из пула Tortoise:
+# без построения запроса pypika и без создания моделей. Текст каждого запроса
+# постоянный, поэтому asyncpg готовит его один раз на соединение
+# (кэш подготовленных выражений) и дальше только выполняет.
+
+LEGAL_ENTITY_BY_INN_SQL = """
+    SELECT id, short_name FROM legal_entities WHERE inn = $1 LIMIT 1
+"""
+
+LEGAL_ENTITY_BY_INN_KPP_SQL = """
+    SELECT id, short_name FROM legal_entities WHERE inn = $1 AND kpp = $2 LIMIT 1
+"""
+
+COMPANY_RELATIONS_SQL = """
+    SELECT id, legal_entity_id FROM entity_company_relations WHERE company_id = $1
+"""
+
+RELATION_FIELDS = (
+    "id",
+    "company_id",
+    "legal_entity_id",
+    "relation_type",
+    "description",
+    "created_at",
+)
+
+# Юрлицо вместе со связями одним запросом: связи собираются в json_agg.
+# {columns} — поля LEGAL_ENTITY_FIELDS, как в ленте изменений и списке.
+# $3 — все компании; иначе только связи компании $2 (при NULL — никаких)
+LEGAL_ENTITY_WITH_RELATIONS_SQL = """
+    SELECT {columns},
+           COALESCE(
+               json_agg(
+                   json_build_object(
+                       'entity_company_relation_id', r.id,
+                       'company_id', r.company_id,
+                       'legal_entity_id', r.legal_entity_id,
+                       'relation_type', r.relation_type,
+                       'description', r.description,
+                       'created_at', r.created_at
+                   ) ORDER BY r.created_at
+               ) FILTER (WHERE r.id IS NOT NULL),
+               '[]'
+           ) AS relations
+    FROM legal_entities le
+    LEFT JOIN entity_company_relations r
+        ON r.legal_entity_id = le.id
+        AND ($3::boolean OR r.company_id = $2::uuid)
+    WHERE le.id = $1
+    GROUP BY le.id
+"""
+
+
+@lru_cache(maxsize=1)
+def _legal_entity_with_relations_sql() -> str:
+    # Колонки внешних ключей известны только после Tortoise.init, поэтому
+    # текст собирается при первом запросе; дальше он постоянный
+    projection = LegalEntity._meta.fields_db_projection
+    columns = ", ".join(
+        f'le."{projection[field]}" AS "{field}"' for field in LEGAL_ENTITY_FIELDS
+    )
+    return LEGAL_ENTITY_WITH_RELATIONS_SQL.format(columns=columns)
+
+
+def _connection(model):
+    return Tortoise.get_connection(model._meta.default_connection or PRIMARY)
+
+
+def fast_path_enabled(model) -> bool:
+    """Прямые запросы asyncpg доступны только на Postgres."""
+    return _connection(model).capabilities.dialect == "postgres"
+
+
+async def fetch(model, sql: str, *args) -> list:
+    """Строки asyncpg.Record; внутри транзакции — на её соединении."""
+    started = time.perf_counter()
+    rows = []
+    try:
+        async with _connection(model).acquire_connection() as connection:
+            rows = await connection.fetch(sql, *args)
+        return rows
+    finally:
+        query_timing.observe(sql, args, time.perf_counter() - started, len(rows))
+
+
+async def fetchrow(model, sql: str, *args):
+    started = time.perf_counter()
+    row = None
+    try:
+        async with _connection(model).acquire_connection() as connection:
+            row = await connection.fetchrow(sql, *args)
+        return row
+    finally:
+        query_timing.observe(
+            sql, args, time.perf_counter() - started, 0 if row is None else 1
+        )
+
+
+async def find_legal_entity_by_inn_kpp(
+    inn: str, kpp: Optional[str] = None
+) -> Optional[Tuple[UUID, str]]:
+    """(id, short_name) юрлица по ИНН и, если задан, КПП."""
+    if not fast_path_enabled(LegalEntity):
+        return await find_legal_entity_by_inn_kpp_orm(inn, kpp)
+    if kpp:
+        row = await fetchrow(LegalEntity, LEGAL_ENTITY_BY_INN_KPP_SQL, inn, kpp)
+    else:
+        row = await fetchrow(LegalEntity, LEGAL_ENTITY_BY_INN_SQL, inn)
+    return None if row is None else (row[0], row[1])
+
+
+async def find_legal_entity_by_inn_kpp_orm(
+    inn: str, kpp: Optional[str] = None
+) -> Optional[Tuple[UUID, str]]:
+    query = LegalEntity.filter(inn=inn)
+    if kpp:
+        query = query.filter(kpp=kpp)
+    row = await query.first().values_list("id", "short_name")
+    return None if row is None else tuple(row)
+
+
+async def company_relations(company_id) -> List[Tuple[UUID, UUID]]:
+    """Пары (id связи, id юрлица) компании — основа проверок прав."""
+    if not fast_path_enabled(EntityCompanyRelation):
+        return await company_relations_orm(company_id)
+    rows = await fetch(
+        EntityCompanyRelation, COMPANY_RELATIONS_SQL, UUID(str(company_id))
+    )
+    return [(row[0], row[1]) for row in rows]
+
+
+async def company_relations_orm(company_id) -> List[Tuple[UUID, UUID]]:
+    return await EntityCompanyRelation.filter(company_id=company_id).values_list(
+        "id", "legal_entity_id"
+    )
+
+
+async def rows_by_ids(model, columns: Sequence[str], ids: list) -> list:
+    """Строки модели по списку id одним запросом (для BatchLoader)."""
+    select = ", ".join(f'"{column}"' for column in columns)
+    return await fetch(
+        model,
+        f'SELECT {select} FROM "{model._meta.db_table}" WHERE "id" = ANY($1::uuid[])',
+        ids,
+    )
+
+
+async def rows_by_ids_orm(model, fields: Sequence[str], ids: list) -> list:
+    return await model.filter(id__in=ids).values(*fields)
+
+
+async def get_legal_entity_with_relations(
+    legal_entity_id: UUID,
+    company_id: Optional[UUID] = None,
+    all_companies: bool = False,
+) -> Optional[dict]:
+    """
+    Юрлицо и его связи: все при all_companies, иначе только связи компании
+    company_id. Без компании и без all_companies список связей пуст.
+    """
+    if not fast_path_enabled(LegalEntity):
+        return await get_legal_entity_with_relations_orm(
+            legal_entity_id, company_id, all_companies
+        )
+    row = await fetchrow(
+        LegalEntity,
+        _legal_entity_with_relations_sql(),
+        UUID(str(legal_entity_id)),
+        UUID(str(company_id)) if company_id else None,
+        all_companies,
+    )
+    if row is None:
+        return None
+    entity = dict(row)
+    if isinstance(entity["relations"], str):
+        entity["relations"] = json.loads(entity["relations"])
+    return entity
+
+
+async def get_legal_entity_with_relations_orm(
+    legal_entity_id: UUID,
+    company_id: Optional[UUID] = None,
+    all_companies: bool = False,
+) -> Optional[dict]:
+    rows = await LegalEntity.filter(id=legal_entity_id).values(*LEGAL_ENTITY_FIELDS)
+    if not rows:
+        return None
+    relations = []
+    if all_companies or company_id:
+        query = EntityCompanyRelation.filter(legal_entity_id=legal_entity_id)
+        if not all_companies:
+            query = query.filter(company_id=company_id)
+        relations = await query.order_by("created_at").values(*RELATION_FIELDS)
+    entity = rows[0]
+    entity["relations"] = [
+        {"entity_company_relation_id": relation.pop("id"), **relation}
+        for relation in relations
+    ]
+    return entity
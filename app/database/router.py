@@ -0,0 +1,202 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from loguru import logger
+from tortoise import connections
+from tortoise.backends.base.client import TransactionalDBClient
+from tortoise.exceptions import ConfigurationError
+
+from app.cache.invalidation import on_bus_reset, on_remote_changes
+from app.database.engine import PRIMARY, REPLICA
+from app.utils.change_log import Change, on_commit
+from metrics.db_metrics import db_replica_lag, db_replica_reads
+
+READ_YOUR_WRITES_SECONDS = 5.0
+REPLICA_MAX_LAG_SECONDS = 5.0
+REPLICA_LAG_CHECK_SECONDS = 2.0
+
+# Время с последней применённой транзакции растёт и при простое основной
+# базы, поэтому оно считается лагом, только если реплика не всё применила
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+"""
+
+_GLOBAL = "*"
+
+
+class ReadScope:
+    """Состояние чтений запроса: разрешена ли реплика и чья это компания."""
+
+    __slots__ = ("company",)
+
+    def __init__(self):
+        self.company: Optional[str] = None
+
+
+_read_scope: ContextVar[Optional[ReadScope]] = ContextVar(
+    "replica_read_scope", default=None
+)
+
+
+class RecentWrites:
+    """
+    Компании, недавно изменявшие данные. Их чтения READ_YOUR_WRITES_SECONDS
+    идут в основную базу, пока реплика догоняет. Изменения без компании
+    (города, сброс шины) закрепляют за основной базой все чтения.
+    """
+
+    def __init__(self, window: float = READ_YOUR_WRITES_SECONDS):
+        self.window = window
+        self._until: Dict[str, float] = {}
+
+    def pin(self, company_id=None):
+        key = _GLOBAL if company_id is None else str(company_id)
+        now = time.monotonic()
+        self._until[key] = now + self.window
+        if len(self._until) > 10_000:
+            self._until = {k: v for k, v in self._until.items() if v > now}
+
+    def pin_changes(self, changes: List[Change]):
+        for change in changes:
+            for company_id in change.company_ids or (None,):
+                self.pin(company_id)
+
+    def is_pinned(self, company_id) -> bool:
+        now = time.monotonic()
+        if self._until.get(_GLOBAL, 0) > now:
+            return True
+        return company_id is not None and self._until.get(str(company_id), 0) > now
+
+    def clear(self):
+        self._until.clear()
+
+
+class ReplicaState:
+    def __init__(self, max_lag: float = REPLICA_MAX_LAG_SECONDS):
+        self.max_lag = max_lag
+        # Пока отставание не измерено, реплике не доверяем
+        self.healthy = False
+
+
+recent_writes = RecentWrites()
+replica_state = ReplicaState()
+
+on_remote_changes(recent_writes.pin_changes)
+on_bus_reset(recent_writes.pin)
+
+
+@on_commit
+async def pin_committed_writes(changes: List[Change]):
+    # Без шины (sqlite, слушатель не подключён) уведомления не придут
+    recent_writes.pin_changes(changes)
+
+
+def allow_replica_reads():
+    """Включает чтение с реплики для текущего запроса (только GET)."""
+    _read_scope.set(ReadScope())
+
+
+@contextmanager
+def primary_reads():
+    """
+    Чтения внутри блока идут в основную базу. Для всего, что кладётся
+    в общий кэш: снимок с отстающей реплики попал бы туда под новой версией.
+    """
+    token = _read_scope.set(None)
+    try:
+        yield
+    finally:
+        _read_scope.reset(token)
+
+
+def note_read_company(context: dict):
+    """Запоминает компанию пользователя для проверки недавних записей."""
+    scope = _read_scope.get()
+    if scope is not None and isinstance(context, dict):
+        company = context.get("company") or context.get("company_id")
+        scope.company = None if company is None else str(company)
+
+
+def _replica_allowed() -> bool:
+    scope = _read_scope.get()
+    if scope is None or not replica_state.healthy:
+        return False
+    if recent_writes.is_pinned(scope.company):
+        return False
+    # Внутри транзакции читаем на её соединении
+    return not isinstance(connections.get(PRIMARY), TransactionalDBClient)
+
+
+class ReplicaRouter:
+    """Роутер Tortoise: чтения GET-запросов — на реплику, остальное — в основную."""
+
+    def db_for_read(self, model):
+        if _replica_allowed():
+            db_replica_reads.labels(REPLICA).inc()
+            return REPLICA
+        db_replica_reads.labels(PRIMARY).inc()
+        return None
+
+    def db_for_write(self, model):
+        return None
+
+
+class ReplicaReadMiddleware:
+    """ASGI-middleware: GET и HEAD читают с реплики, если она подключена."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            allow_replica_reads()
+        await self.app(scope, receive, send)
+
+
+class ReplicaLagMonitor:
+    """Периодически измеряет отставание реплики и выключает её при большом лаге."""
+
+    def __init__(self, interval: float = REPLICA_LAG_CHECK_SECONDS):
+        self.interval = interval
+
+    async def check(self):
+        try:
+            replica = connections.get(REPLICA)
+            rows = await replica.execute_query_dict(REPLICA_LAG_SQL)
+            lag = float(next(iter(rows[0].values())))
+        except ConfigurationError:
+            replica_state.healthy = False
+            return
+        except Exception as e:
+            if replica_state.healthy:
+                logger.warning(f"Реплика недоступна, читаем из основной базы: {e}")
+            replica_state.healthy = False
+            return
+        db_replica_lag.set(lag)
+        healthy = lag <= replica_state.max_lag
+        if healthy != replica_state.healthy:
+            logger.info(f"Реплика {'включена' if healthy else 'отстаёт'}: {lag:.1f} с")
+        replica_state.healthy = healthy
+
+    async def run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+
+def configure_replica(settings) -> Optional[ReplicaLagMonitor]:
+    """Окно read-your-writes и допустимый лаг; монитор — если реплика задана."""
+    recent_writes.window = settings.READ_YOUR_WRITES_SECONDS
+    replica_state.max_lag = settings.DB_REPLICA_MAX_LAG_SECONDS
+    if not settings.DB_REPLICA_URL:
+        return None
+    return ReplicaLagMonitor(settings.DB_REPLICA_LAG_CHECK_SECONDS)
@@ -0,0 +1,62 @@
+import inspect
+from functools import lru_cache
+
+from fastapi import Request
+from tiacore_lib.handlers.auth_handler import get_current_user
+from tiacore_lib.handlers.dependency_handler import require_permission_in_context
+
+from app.cache.auth_context import auth_context_cache
+from app.database.router import note_read_company
+
+_REQUEST_PARAM = "_auth_cache_request"
+
+
+def cached_auth_dependency(dependency, scope: str):
+    """
+    Оборачивает зависимость авторизации из tiacore_lib кэшем контекстов.
+    Подзависимости оригинала (токен, настройки) FastAPI по-прежнему разрешает сам,
+    а тело оригинала (декодирование JWT, загрузка контекста) выполняется только
+    при промахе кэша.
+    """
+    signature = inspect.signature(dependency)
+
+    async def wrapper(**kwargs):
+        request: Request = kwargs.pop(_REQUEST_PARAM)
+        authorization = request.headers.get("authorization")
+        context = None
+        if authorization:
+            context = auth_context_cache.get(scope, authorization)
+
+        if context is None:
+            context = dependency(**kwargs)
+            if inspect.isawaitable(context):
+                context = await context
+            if authorization and isinstance(context, dict):
+                auth_context_cache.set(scope, authorization, context)
+
+        note_read_company(context)
+        return context
+
+    wrapper.__signature__ = signature.replace(
+        parameters=[
+            *(
+                parameter.replace(kind=inspect.Parameter.KEYWORD_ONLY)
+                for parameter in signature.parameters.values()
+            ),
+            inspect.Parameter(
+                _REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request
+            ),
+        ]
+    )
+    wrapper.__name__ = f"cached_{getattr(dependency, '__name__', 'dependency')}"
+    return wrapper
+
+
+cached_current_user = cached_auth_dependency(get_current_user, "current_user")
+
+
+@lru_cache(maxsize=None)
+def cached_permission_in_context(permission: str):
+    return cached_auth_dependency(
+        require_permission_in_context(permission), f"permission:{permission}"
+    )
@@ -1,24 +1,22 @@
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, Path
-from tiacore_lib.handlers.dependency_handler import require_permission_in_context
 
-from app.database.models import (
-    EntityCompanyRelation,
-)
+from app.cache.membership import membership_index
+from app.dependencies.auth import cached_permission_in_context
 
 
 def with_permission_and_entity_company_check(permission: str):
     async def dependency(
         legal_entity_id: UUID = Path(..., description="ID юридического лица"),
-        context: dict = Depends(require_permission_in_context(permission)),
+        context: dict = Depends(cached_permission_in_context(permission)),
     ):
         if context.get("is_superadmin"):
             return context
 
         # Проверка, связано ли это юр. лицо с компанией пользователя
-        is_related = await EntityCompanyRelation.exists(
-            legal_entity_id=legal_entity_id, company_id=context["company"]
+        is_related = await membership_index.has_legal_entity(
+            context.get("company"), legal_entity_id
         )
 
         if not is_related:
@@ -35,16 +33,16 @@ def with_permission_and_entity_company_check(permission: str):
 def with_permission_and_legal_entity_company_check(permission: str):
     async def dependency(
         relation_id: UUID = Path(..., description="ID связи компании и юрлица"),
-        context: dict = Depends(require_permission_in_context(permission)),
+        context: dict = Depends(cached_permission_in_context(permission)),
     ):
         if context.get("is_superadmin"):
             return context
 
-        relation = await EntityCompanyRelation.get_or_none(
-            id=relation_id
-        ).prefetch_related("company")
+        is_own_relation = await membership_index.has_relation(
+            context.get("company"), relation_id
+        )
 
-        if not relation or str(relation.company_id) != str(context["company"]):
+        if not is_own_relation:
             raise HTTPException(
                 status_code=403,
                 detail="Связь не принадлежит компании пользователя или не найдена",
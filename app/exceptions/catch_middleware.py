@@ -1,23 +1,120 @@
-import traceback
+import time
+from uuid import uuid4
+
+import orjson
 from loguru import logger
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
-
-
-class CatchAllExceptionsMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        try:
-            response = await call_next(request)
-            if response.status_code == 400:
-                body = await request.body()
-                logger.error("🚨 400 Bad Request от FastAPI")
-                logger.error(f"➡️ URL: {request.url}")
-                logger.error(f"➡️ Headers: {dict(request.headers)}")
-                logger.error(
-                    f"➡️ Body: {body.decode('utf-8', errors='ignore')}")
-            return response
-        except Exception as e:
-            tb = traceback.format_exc()
-            logger.critical("🔥 Исключение в middleware!")
-            logger.critical(f"{e}\n{tb}")
-            return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+# Столько байт тела запроса попадает в лог ответа 400
+BAD_REQUEST_BODY_PREVIEW = 2048
+REDACTED_HEADERS = {b"authorization", b"cookie", b"x-api-key"}
+
+
+def _request_id(scope) -> str:
+    for name, value in scope["headers"]:
+        if name == REQUEST_ID_HEADER:
+            # Чужой id принимаем, только если он похож на id
+            if 0 < len(value) <= 64 and value.isascii():
+                return value.decode()
+            break
+    return uuid4().hex
+
+
+def _safe_headers(scope) -> dict:
+    return {
+        name.decode("latin-1"): (
+            "***" if name in REDACTED_HEADERS else value.decode("latin-1")
+        )
+        for name, value in scope["headers"]
+    }
+
+
+class CatchAllExceptionsMiddleware:
+    """
+    ASGI-middleware: id запроса, перехват необработанных исключений и
+    диагностика ответов 400. На обычном запросе — только обёртки receive
+    и send: тело не читается заранее и не копируется; для лога 400
+    сохраняются ссылки на первые куски тела, уже прочитанные приложением.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _request_id(scope)
+        scope.setdefault("state", {})["request_id"] = request_id
+        header = (REQUEST_ID_HEADER, request_id.encode())
+        started = time.perf_counter()
+        status = None
+        chunks = []
+        preview_size = 0
+
+        async def receive_wrapper():
+            nonlocal preview_size
+            message = await receive()
+            if preview_size < BAD_REQUEST_BODY_PREVIEW and message.get("body"):
+                chunks.append(message["body"])
+                preview_size += len(message["body"])
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), header]
+            await send(message)
+
+        with logger.contextualize(request_id=request_id):
+            try:
+                await self.app(scope, receive_wrapper, send_wrapper)
+            except Exception:
+                elapsed = time.perf_counter() - started
+                logger.opt(exception=True).critical(
+                    "🔥 Необработанное исключение: {} {} ({:.0f} мс)",
+                    scope["method"],
+                    scope["path"],
+                    elapsed * 1000,
+                )
+                if status is not None:
+                    raise  # ответ уже начат — вернуть 500 нельзя
+                await self._internal_error(send, header, request_id)
+                return
+
+            if status == 400:
+                self._log_bad_request(scope, b"".join(chunks))
+
+    @staticmethod
+    async def _internal_error(send, header, request_id: str):
+        body = orjson.dumps(
+            {"detail": "Internal Server Error", "request_id": request_id}
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 500,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    header,
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _log_bad_request(scope, body: bytes):
+        preview = body[:BAD_REQUEST_BODY_PREVIEW].decode("utf-8", errors="ignore")
+        query = scope.get("query_string", b"").decode("latin-1")
+        logger.error(
+            "🚨 400 Bad Request: {} {}{} | Headers: {} | Body: {}",
+            scope["method"],
+            scope["path"],
+            f"?{query}" if query else "",
+            _safe_headers(scope),
+            preview,
+        )
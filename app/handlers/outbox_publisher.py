@@ -0,0 +1,137 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+import aio_pika
+from loguru import logger
+from tortoise.transactions import in_transaction
+
+from app.database.engine import PRIMARY
+from app.database.models import OutboxEvent
+
+# Опубликованные события храним сутки — для разбора инцидентов
+PUBLISHED_RETENTION = timedelta(days=1)
+PURGE_INTERVAL_SECONDS = 3600
+# Ключ pg_advisory_xact_lock: публикует один воркер, иначе пачки разных
+# воркеров перемешиваются и события одного объекта приходят не по порядку
+OUTBOX_PUBLISHER_LOCK = 72_656_618
+# Заголовок с id события: по нему потребитель восстанавливает порядок
+OUTBOX_ID_HEADER = "x-outbox-id"
+
+
+class RabbitBroker:
+    def __init__(self, rabbit_url: str, exchange_name: str):
+        self.rabbit_url = rabbit_url
+        self.exchange_name = exchange_name
+        self.connection = None
+        self.exchange = None
+
+    async def connect(self):
+        self.connection = await aio_pika.connect_robust(self.rabbit_url)
+        channel = await self.connection.channel(publisher_confirms=True)
+        self.exchange = await channel.declare_exchange(
+            self.exchange_name, aio_pika.ExchangeType.TOPIC, durable=True
+        )
+
+    async def publish_batch(self, messages: List[Tuple[int, str, dict]]):
+        if self.exchange is None:
+            await self.connect()
+        # Подтверждения брокера ждём пачкой, а не по одному сообщению
+        await asyncio.gather(
+            *(
+                self.exchange.publish(
+                    aio_pika.Message(
+                        body=json.dumps(payload, ensure_ascii=False).encode(),
+                        content_type="application/json",
+                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                        message_id=str(event_id),
+                        headers={OUTBOX_ID_HEADER: event_id},
+                    ),
+                    routing_key=routing_key,
+                )
+                for event_id, routing_key, payload in messages
+            )
+        )
+
+    async def close(self):
+        if self.connection is not None:
+            await self.connection.close()
+
+
+class OutboxPublisher:
+    """
+    Публикует события из outbox_events в брокер пачками в порядке id.
+    Запускается в каждом воркере, но публикует тот, кто взял advisory-блокировку.
+    Доставка at-least-once: message_id и заголовок x-outbox-id равны id
+    события — для дедупликации и упорядочивания у потребителя.
+    """
+
+    def __init__(self, broker, batch_size: int = 100, poll_interval: float = 1.0):
+        self.broker = broker
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._last_purge = 0.0
+
+    async def wake(self, changes=None):
+        self._wakeup.set()
+
+    async def publish_pending(self) -> int:
+        async with in_transaction(PRIMARY) as connection:
+            if not await self._acquire_leadership(connection):
+                return 0
+            events = (
+                await OutboxEvent.filter(published_at__isnull=True)
+                .order_by("id")
+                .limit(self.batch_size)
+                .select_for_update(skip_locked=True)
+                .using_db(connection)
+            )
+            if not events:
+                return 0
+
+            await self.broker.publish_batch(
+                [(event.id, event.routing_key, event.payload) for event in events]
+            )
+            await (
+                OutboxEvent.filter(id__in=[event.id for event in events])
+                .using_db(connection)
+                .update(published_at=datetime.now(timezone.utc))
+            )
+        return len(events)
+
+    async def _acquire_leadership(self, connection) -> bool:
+        """Блокировка до конца транзакции; занята — публикует другой воркер."""
+        if connection.capabilities.dialect != "postgres":
+            return True
+        _, rows = await connection.execute_query(
+            "SELECT pg_try_advisory_xact_lock($1)", [OUTBOX_PUBLISHER_LOCK]
+        )
+        return bool(rows[0][0])
+
+    async def purge_published(self):
+        await OutboxEvent.filter(
+            published_at__lt=datetime.now(timezone.utc) - PUBLISHED_RETENTION
+        ).delete()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            try:
+                published = await self.publish_pending()
+                if loop.time() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                    await self.purge_published()
+                    self._last_purge = loop.time()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Ошибка публикации outbox: {e}")
+                published = 0
+
+            if published < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
@@ -0,0 +1,31 @@
+from typing import Optional
+from uuid import UUID
+
+from loguru import logger
+from opentelemetry.trace import SpanKind
+from pydantic import ValidationError
+from tiacore_lib.rabbit.handlers import handle_user_event
+
+from app.cache.invalidation import broadcast_user_invalidation
+from app.pydantic_models.user_event_models import UserEventSchema
+from metrics.tracer import traced
+
+
+def _event_user_id(event) -> Optional[UUID]:
+    try:
+        return UserEventSchema.model_validate(event).user_id
+    except ValidationError:
+        logger.warning(
+            f"Нераспознанное событие user.*, кэш контекстов сбрасывается целиком: "
+            f"{event!r}"
+        )
+        return None
+
+
+async def handle_user_event_with_cache(event, settings):
+    with traced("rabbit.user_event", kind=SpanKind.CONSUMER):
+        await handle_user_event(event, settings=settings)
+
+        # Права/компании пользователя могли измениться — кэш контекстов
+        # сбрасываем во всех воркерах; без user_id — целиком
+        await broadcast_user_invalidation(_event_user_id(event))
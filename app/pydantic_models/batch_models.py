@@ -0,0 +1,37 @@
+from typing import Any, List, Literal, Optional
+
+from pydantic import Field, field_validator
+from tiacore_lib.pydantic_models.clean_model import CleanableBaseModel
+
+BATCH_MAX_REQUESTS = 20
+
+
+class BatchSubRequestSchema(CleanableBaseModel):
+    id: Optional[str] = Field(None, description="Ключ для сопоставления ответа")
+    method: Literal["GET"] = Field("GET")
+    path: str = Field(..., description="Путь с параметрами, например /api/cities/all")
+
+    @field_validator("path")
+    @classmethod
+    def validate_path(cls, path: str) -> str:
+        if not path.startswith("/api/"):
+            raise ValueError("Путь должен начинаться с /api/")
+        if path.split("?", 1)[0].rstrip("/") == "/api/batch":
+            raise ValueError("Вложенный batch-запрос недопустим")
+        return path
+
+
+class BatchRequestSchema(CleanableBaseModel):
+    requests: List[BatchSubRequestSchema] = Field(
+        ..., min_length=1, max_length=BATCH_MAX_REQUESTS
+    )
+
+
+class BatchSubResponseSchema(CleanableBaseModel):
+    id: Optional[str] = Field(None)
+    status: int = Field(...)
+    body: Any = Field(None)
+
+
+class BatchResponseSchema(CleanableBaseModel):
+    responses: List[BatchSubResponseSchema]
@@ -0,0 +1,34 @@
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import Query
+from pydantic import Field
+from tiacore_lib.pydantic_models.clean_model import CleanableBaseModel
+
+
+class ChangeSchema(CleanableBaseModel):
+    seq: int = Field(...)
+    entity: str = Field(...)
+    entity_id: UUID = Field(...)
+    operation: str = Field(..., description="upsert / delete")
+    data: Optional[dict] = Field(None, description="Актуальное состояние объекта")
+
+
+class ChangeFeedResponseSchema(CleanableBaseModel):
+    changes: List[ChangeSchema]
+    next_token: int
+    has_more: bool
+
+
+def change_filter_params(
+    since: Optional[int] = Query(
+        0, ge=0, description="Токен из next_token предыдущей синхронизации"
+    ),
+    company_id: Optional[UUID] = Query(None),
+    limit: Optional[int] = Query(500, ge=1, le=1000),
+):
+    return {
+        "since": since,
+        "company_id": company_id,
+        "limit": limit,
+    }
@@ -1,10 +1,57 @@
 # pydantic_models/legal_entity_models.py
 
-from typing import List
+from typing import List, Optional, Set
 from uuid import UUID
 
-from pydantic import BaseModel
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, Field
+from tiacore_lib.pydantic_models.clean_model import CleanableBaseModel
+from tiacore_lib.pydantic_models.entity_company_relation_models import (
+    EntityCompanyRelationSchema,
+)
+from tiacore_lib.pydantic_models.legal_entity_models import LegalEntitySchema
 
 
 class LegalEntityByIdsRequestSchema(BaseModel):
     ids: List[UUID]
+
+
+class LegalEntitySummarySchema(CleanableBaseModel):
+    legal_entity_id: UUID = Field(...)
+    short_name: str = Field(...)
+    full_name: Optional[str] = Field(None)
+    inn: str = Field(...)
+    kpp: Optional[str] = Field(None)
+
+
+class EntityCompanyRelationExpandedSchema(EntityCompanyRelationSchema):
+    legal_entity: Optional[LegalEntitySummarySchema] = Field(None)
+
+
+class EntityCompanyRelationExpandedListResponseSchema(CleanableBaseModel):
+    total: int
+    relations: List[EntityCompanyRelationExpandedSchema]
+
+
+class LegalEntityExpandedSchema(LegalEntitySchema):
+    relations: Optional[List[EntityCompanyRelationSchema]] = Field(None)
+
+
+def expand_params(*allowed: str):
+    """Зависимость для параметра expand: список вложенных объектов через запятую."""
+
+    def dependency(
+        expand: Optional[str] = Query(
+            None, description=f"Вложить в ответ: {', '.join(allowed)}"
+        ),
+    ) -> Set[str]:
+        requested = {item.strip() for item in (expand or "").split(",") if item.strip()}
+        unknown = requested - set(allowed)
+        if unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Неизвестные значения expand: {', '.join(sorted(unknown))}",
+            )
+        return requested
+
+    return dependency
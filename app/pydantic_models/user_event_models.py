@@ -0,0 +1,13 @@
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class UserEventSchema(BaseModel):
+    """
+    Сообщение с routing key user.* от сервиса авторизации: JSON-объект
+    с идентификатором изменённого пользователя на верхнем уровне.
+    Прочие поля события нам не нужны и игнорируются.
+    """
+
+    user_id: UUID
@@ -5,12 +5,16 @@ from tiacore_lib.routes.invite_route import invite_router
 from tiacore_lib.routes.register_route import register_router
 from tiacore_lib.routes.user_route import user_router
 
+from .batch_route import batch_router
 from .cash_register_route import cash_register_router
+from .change_route import change_router
 from .city_route import city_router
+from .debug_route import debug_router
 from .entity_company_relation_route import entity_relation_router
 from .entity_type_route import entity_types_router
 from .legal_entity_route import entity_router
 from .monitoring_route import monitoring_router
+from .reference_bundle_route import bundle_router
 from .warehouse_route import warehouse_router
 
 
@@ -19,6 +23,8 @@ def register_routes(app: FastAPI):
     app.include_router(invite_router, prefix="/api", tags=["Invite"])
     app.include_router(register_router, prefix="/api", tags=["Register"])
     app.include_router(user_router, prefix="/api/users", tags=["Users"])
+    # Пакет справочников раньше роутера компаний, чтобы его пути не перекрывались
+    app.include_router(bundle_router, prefix="/api/companies", tags=["ReferenceBundle"])
     app.include_router(company_router, prefix="/api/companies", tags=["Companies"])
     app.include_router(
         cash_register_router, prefix="/api/cash-registers", tags=["CashRegisters"]
@@ -26,6 +32,7 @@ def register_routes(app: FastAPI):
     app.include_router(warehouse_router, prefix="/api/warehouses", tags=["Warehouse"])
     app.include_router(city_router, prefix="/api/cities", tags=["Cities"])
     app.include_router(monitoring_router, tags=["Monitoring"])
+    app.include_router(debug_router, prefix="/debug", tags=["Debug"])
     app.include_router(
         entity_types_router, prefix="/api/legal-entity-types", tags=["LegalEntityTypes"]
     )
@@ -37,3 +44,5 @@ def register_routes(app: FastAPI):
         prefix="/api/entity-company-relations",
         tags=["EntityCompanyRelations"],
     )
+    app.include_router(change_router, prefix="/api/changes", tags=["Changes"])
+    app.include_router(batch_router, prefix="/api/batch", tags=["Batch"])
@@ -0,0 +1,103 @@
+import asyncio
+import json
+from typing import Tuple
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Depends, Request
+from loguru import logger
+
+from app.dependencies.auth import cached_current_user
+from app.pydantic_models.batch_models import (
+    BatchRequestSchema,
+    BatchResponseSchema,
+    BatchSubRequestSchema,
+    BatchSubResponseSchema,
+)
+
+# Сколько подзапросов одного batch выполняется одновременно
+BATCH_CONCURRENCY = 8
+
+# Заголовки, которые подзапрос наследует от batch-запроса
+FORWARDED_HEADERS = (b"authorization", b"accept-language")
+
+batch_router = APIRouter()
+
+
+async def dispatch(request: Request, sub_request: BatchSubRequestSchema) -> Tuple:
+    """Выполняет подзапрос внутри процесса через ASGI-приложение."""
+    url = urlsplit(sub_request.path)
+    scope = {
+        key: request.scope[key]
+        for key in ("asgi", "http_version", "scheme", "server", "client", "root_path")
+        if key in request.scope
+    }
+    scope.update(
+        type="http",
+        method=sub_request.method,
+        path=url.path,
+        raw_path=url.path.encode(),
+        query_string=url.query.encode(),
+        headers=[
+            (name, value)
+            for name, value in request.scope["headers"]
+            if name in FORWARDED_HEADERS
+        ]
+        + [(b"accept", b"application/json")],
+        state=dict(request.scope.get("state", {})),
+    )
+
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Подзапрос не читает тело: ждём до отмены
+        await asyncio.Event().wait()
+
+    status = 500
+    chunks = []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception as e:
+        # Ответ 500 уже отправлен ServerErrorMiddleware, исключение пробрасывается
+        logger.exception(f"Ошибка подзапроса {sub_request.path}: {e}")
+        return 500, {"detail": "Внутренняя ошибка сервера"}
+
+    body = b"".join(chunks)
+    try:
+        payload = json.loads(body) if body else None
+    except ValueError:
+        payload = body.decode(errors="replace")
+    return status, payload
+
+
+@batch_router.post(
+    "",
+    response_model=BatchResponseSchema,
+    summary="Выполнение нескольких GET-запросов к справочникам за один вызов",
+)
+async def execute_batch(
+    data: BatchRequestSchema,
+    request: Request,
+    _: dict = Depends(cached_current_user),
+):
+    # Токен проверен один раз; подзапросы берут контекст из кэша авторизации
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(sub_request: BatchSubRequestSchema) -> BatchSubResponseSchema:
+        async with semaphore:
+            status, body = await dispatch(request, sub_request)
+        return BatchSubResponseSchema(id=sub_request.id, status=status, body=body)
+
+    responses = await asyncio.gather(*(run(item) for item in data.requests))
+    return BatchResponseSchema(responses=responses)
@@ -2,7 +2,6 @@ from uuid import UUID
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Path, status
 from loguru import logger
-from tiacore_lib.handlers.dependency_handler import require_permission_in_context
 from tiacore_lib.handlers.permissions_handler import (
     with_permission_and_company_from_body_check,
 )
@@ -10,6 +9,7 @@ from tiacore_lib.utils.validate_helpers import validate_company_access
 from tortoise.expressions import Q
 
 from app.database.models import CashRegister
+from app.dependencies.auth import cached_permission_in_context
 from app.pydantic_models.cash_register_models import (
     CashRegisterCreateSchema,
     CashRegisterEditSchema,
@@ -18,9 +18,29 @@ from app.pydantic_models.cash_register_models import (
     CashRegisterSchema,
     cash_register_filter_params,
 )
+from app.utils.change_entities import CASH_REGISTER
+from app.utils.change_log import tracked_transaction
+from app.utils.change_payloads import STAFF_FIELDS
+from app.utils.dataloader import BatchLoader
+from app.utils.list_engine import FilterSpec, ListSpec, fetch_list
+from app.utils.singleflight import coalesce_requests
 
 cash_register_router = APIRouter()
 
+cash_register_loader = BatchLoader(CashRegister, STAFF_FIELDS)
+
+cash_register_list = ListSpec(
+    model=CashRegister,
+    fields=STAFF_FIELDS,
+    sorts={"name": "name", "created_at": "created_at"},
+    default_sort="name",
+    filters=(
+        FilterSpec("cash_register_name", "name__icontains"),
+        FilterSpec("description", "description__icontains"),
+    ),
+    cached=True,
+)
+
 
 # Чисто для коммита
 @cash_register_router.post(
@@ -33,16 +53,20 @@ async def add_cash_register(
     data: CashRegisterCreateSchema = Body(...),
     context=Depends(with_permission_and_company_from_body_check("add_cash_register")),
 ):
-    cash_register = await CashRegister.create(
-        created_by=context["user_id"],
-        modified_by=context["user_id"],
-        **data.model_dump(exclude_unset=True),
-    )
+    async with tracked_transaction() as changes:
+        cash_register = await CashRegister.create(
+            created_by=context["user_id"],
+            modified_by=context["user_id"],
+            **data.model_dump(exclude_unset=True),
+        )
+        changes.upsert(CASH_REGISTER, cash_register.id, [cash_register.company_id])
     if not cash_register:
         logger.error("Не удалось создать кассу")
         raise HTTPException(status_code=500, detail="Не удалось создать кассу")
 
-    logger.success(f"касса {cash_register.name} ({cash_register.id}) успешно создана")
+    logger.success(
+        "касса {} ({}) успешно создана", cash_register.name, cash_register.id
+    )
     return {"cash_register_id": str(cash_register.id)}
 
 
@@ -58,7 +82,7 @@ async def edit_cash_register(
     data: CashRegisterEditSchema = Body(...),
     context=Depends(with_permission_and_company_from_body_check("edit_cash_register")),
 ):
-    logger.info(f"Обновление кассы {cash_register_id}")
+    logger.info("Обновление кассы {}", cash_register_id)
 
     cash_register = await CashRegister.filter(id=cash_register_id).first()
     if not cash_register:
@@ -66,10 +90,15 @@ async def edit_cash_register(
         raise HTTPException(status_code=404, detail="касса не найдена")
     validate_company_access(cash_register, context, "кассой")
 
+    previous_company_id = cash_register.company_id
     cash_register.modified_by = context["user_id"]
     await cash_register.update_from_dict(data.model_dump(exclude_unset=True))
 
-    await cash_register.save()
+    async with tracked_transaction() as changes:
+        await cash_register.save()
+        if cash_register.company_id != previous_company_id:
+            changes.delete(CASH_REGISTER, cash_register.id, [previous_company_id])
+        changes.upsert(CASH_REGISTER, cash_register.id, [cash_register.company_id])
 
 
 @cash_register_router.delete(
@@ -81,14 +110,16 @@ async def delete_cash_register(
     cash_register_id: UUID = Path(
         ..., title="ID кассы", description="ID удаляемой кассы"
     ),
-    context=Depends(require_permission_in_context("delete_cash_register")),
+    context=Depends(cached_permission_in_context("delete_cash_register")),
 ):
     cash_register = await CashRegister.filter(id=cash_register_id).first()
     if not cash_register:
         logger.warning(f"касса {cash_register_id} не найдена")
         raise HTTPException(status_code=404, detail="касса не найдена")
     validate_company_access(cash_register, context, "кассой")
-    await cash_register.delete()
+    async with tracked_transaction() as changes:
+        await cash_register.delete()
+        changes.delete(CASH_REGISTER, cash_register.id, [cash_register.company_id])
 
 
 @cash_register_router.get(
@@ -96,42 +127,13 @@ async def delete_cash_register(
     response_model=CashRegisterListResponseSchema,
     summary="Получение списка кассов с фильтрацией",
 )
+@coalesce_requests()
 async def get_cash_registers(
     filters: dict = Depends(cash_register_filter_params),
-    context=Depends(require_permission_in_context("get_all_cash_registers")),
+    context=Depends(cached_permission_in_context("get_all_cash_registers")),
 ):
-    query = Q()
-    if not context["is_superadmin"]:
-        query &= Q(company_id=context["company_id"])
-    if filters.get("cash_register_name"):
-        query &= Q(name__icontains=filters["cash_register_name"])
-    if filters.get("description"):
-        query &= Q(description__icontains=filters["description"])
-
-    order_by = f"{'-' if filters.get('order') == 'desc' else ''}{
-        filters.get('sort_by', 'name')
-    }"
-    page = filters.get("page", 1)
-    page_size = filters.get("page_size", 10)
-
-    total_count = await CashRegister.filter(query).count()
-
-    cash_registers = (
-        await CashRegister.filter(query)
-        .order_by(order_by)
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .values(
-            "id",
-            "name",
-            "description",
-            "created_at",
-            "created_by",
-            "modified_at",
-            "modified_by",
-            "company_id",
-        )
-    )
+    query = None if context["is_superadmin"] else Q(company_id=context["company_id"])
+    total_count, cash_registers = await fetch_list(cash_register_list, filters, query)
 
     return CashRegisterListResponseSchema(
         total=total_count,
@@ -148,23 +150,10 @@ async def get_cash_register(
     cash_register_id: UUID = Path(
         ..., title="ID кассы", description="ID просматриваемой кассы"
     ),
-    context=Depends(require_permission_in_context("view_cash_register")),
+    context=Depends(cached_permission_in_context("view_cash_register")),
 ):
-    logger.info(f"Запрос на просмотр кассы: {cash_register_id}")
-    cash_register = (
-        await CashRegister.filter(id=cash_register_id)
-        .first()
-        .values(
-            "id",
-            "name",
-            "description",
-            "created_at",
-            "created_by",
-            "modified_at",
-            "modified_by",
-            "company_id",
-        )
-    )
+    logger.info("Запрос на просмотр кассы: {}", cash_register_id)
+    cash_register = await cash_register_loader.load(cash_register_id)
 
     if cash_register is None:
         logger.warning(f"касса {cash_register_id} не найдена")
@@ -173,5 +162,6 @@ async def get_cash_register(
 
     cash_register_schema = CashRegisterSchema(**cash_register)
 
-    logger.success(f"касса найдена: {cash_register_schema}")
+    logger.success("касса найдена: {}", cash_register_id)
+    logger.debug("касса {}: {}", cash_register_id, cash_register_schema)
     return cash_register_schema
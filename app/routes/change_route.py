@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends
+from tortoise.expressions import Q
+
+from app.database.models import ChangeLogEntry
+from app.dependencies.auth import cached_current_user
+from app.pydantic_models.change_models import (
+    ChangeFeedResponseSchema,
+    ChangeSchema,
+    change_filter_params,
+)
+from app.utils.change_entities import DELETE, UPSERT
+from app.utils.change_payloads import load_payloads
+
+change_router = APIRouter()
+
+
+@change_router.get(
+    "",
+    response_model=ChangeFeedResponseSchema,
+    summary="Лента изменений справочников с момента последней синхронизации",
+)
+async def get_changes(
+    filters: dict = Depends(change_filter_params),
+    context: dict = Depends(cached_current_user),
+):
+    query = Q(id__gt=filters["since"])
+    if context["is_superadmin"]:
+        company_filter = filters.get("company_id")
+        if company_filter:
+            query &= Q(company_id=company_filter) | Q(company_id__isnull=True)
+    else:
+        query &= Q(company_id=context["company"]) | Q(company_id__isnull=True)
+
+    limit = filters["limit"]
+    entries = (
+        await ChangeLogEntry.filter(query)
+        .order_by("id")
+        .limit(limit + 1)
+        .values("id", "entity", "entity_id", "operation")
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    next_token = entries[-1]["id"] if entries else filters["since"]
+
+    # В пределах страницы важна только последняя операция по каждому объекту
+    latest = {}
+    for entry in entries:
+        key = (entry["entity"], entry["entity_id"])
+        latest.pop(key, None)
+        latest[key] = entry
+
+    upserted = {}
+    for entity, entity_id in latest:
+        if latest[(entity, entity_id)]["operation"] == UPSERT:
+            upserted.setdefault(entity, []).append(entity_id)
+    payloads = {
+        entity: await load_payloads(entity, ids) for entity, ids in upserted.items()
+    }
+
+    changes = []
+    for (entity, entity_id), entry in latest.items():
+        data = payloads.get(entity, {}).get(entity_id)
+        changes.append(
+            ChangeSchema(
+                seq=entry["id"],
+                entity=entity,
+                entity_id=entity_id,
+                # Объект, удалённый после этой записи, тоже отдаём как удаление
+                operation=UPSERT if data is not None else DELETE,
+                data=data,
+            )
+        )
+
+    return ChangeFeedResponseSchema(
+        changes=changes, next_token=next_token, has_more=has_more
+    )
@@ -3,10 +3,9 @@ from uuid import UUID
 from fastapi import APIRouter, Body, Depends, HTTPException, Path, status
 from loguru import logger
 from tiacore_lib.handlers.auth_handler import require_superadmin
-from tiacore_lib.handlers.dependency_handler import require_permission_in_context
-from tortoise.expressions import Q
 
 from app.database.models import City
+from app.dependencies.auth import cached_permission_in_context
 from app.pydantic_models.city_models import (
     CityCreateSchema,
     CityEditSchema,
@@ -15,9 +14,26 @@ from app.pydantic_models.city_models import (
     CitySchema,
     city_filter_params,
 )
+from app.utils.change_entities import CITY
+from app.utils.change_log import tracked_transaction
+from app.utils.list_engine import FilterSpec, ListSpec, fetch_list
 
 city_router = APIRouter()
 
+city_list = ListSpec(
+    model=City,
+    fields=("id", "name", "external_id", "region", "code"),
+    sorts={"name": "name", "region": "region"},
+    default_sort="name",
+    filters=(
+        FilterSpec("city_name", "name__icontains"),
+        FilterSpec("code", "code__icontains"),
+        FilterSpec("region", "region__icontains"),
+        FilterSpec("external_id", "external_id__icontains"),
+    ),
+    cached=True,
+)
+
 
 @city_router.post(
     "/add",
@@ -29,12 +45,14 @@ async def add_city(
     data: CityCreateSchema = Body(...),
     _=Depends(require_superadmin),
 ):
-    city = await City.create(**data.model_dump(exclude_unset=True))
+    async with tracked_transaction() as changes:
+        city = await City.create(**data.model_dump(exclude_unset=True))
+        changes.upsert(CITY, city.id, [None])
     if not city:
         logger.error("Не удалось создать город")
         raise HTTPException(status_code=500, detail="Не удалось создать город")
 
-    logger.success(f"город {city.name} ({city.id}) успешно создан")
+    logger.success("город {} ({}) успешно создан", city.name, city.id)
     return {"city_id": str(city.id)}
 
 
@@ -48,14 +66,16 @@ async def edit_city(
     data: CityEditSchema = Body(...),
     _=Depends(require_superadmin),
 ):
-    logger.info(f"Обновление города {city_id}")
+    logger.info("Обновление города {}", city_id)
 
     city = await City.filter(id=city_id).first()
     if not city:
         logger.warning(f"город {city_id} не найден")
         raise HTTPException(status_code=404, detail="город не найден")
     await city.update_from_dict(data.model_dump(exclude_unset=True))
-    await city.save()
+    async with tracked_transaction() as changes:
+        await city.save()
+        changes.upsert(CITY, city.id, [None])
 
 
 @city_router.delete(
@@ -65,13 +85,15 @@ async def edit_city(
 )
 async def delete_city(
     city_id: UUID = Path(..., title="ID города", description="ID удаляемого города"),
-    _=Depends(require_permission_in_context("delete_city")),
+    _=Depends(cached_permission_in_context("delete_city")),
 ):
     city = await City.filter(id=city_id).first()
     if not city:
         logger.warning(f"город {city_id} не найден")
         raise HTTPException(status_code=404, detail="город не найден")
-    await city.delete()
+    async with tracked_transaction() as changes:
+        await city.delete()
+        changes.delete(CITY, city.id, [None])
 
 
 @city_router.get(
@@ -81,34 +103,9 @@ async def delete_city(
 )
 async def get_citys(
     filters: dict = Depends(city_filter_params),
-    _=Depends(require_permission_in_context("get_all_citys")),
+    _=Depends(cached_permission_in_context("get_all_citys")),
 ):
-    query = Q()
-
-    if filters.get("city_name"):
-        query &= Q(name__icontains=filters["city_name"])
-    if filters.get("code"):
-        query &= Q(description__icontains=filters["code"])
-    if filters.get("region"):
-        query &= Q(region__icontains=filters["region"])
-    if filters.get("external_id"):
-        query &= Q(external_id__icontains=filters["external_id"])
-
-    order_by = f"{'-' if filters.get('order') == 'desc' else ''}{
-        filters.get('sort_by', 'name')
-    }"
-    page = filters.get("page", 1)
-    page_size = filters.get("page_size", 10)
-
-    total_count = await City.filter(query).count()
-
-    citys = (
-        await City.filter(query)
-        .order_by(order_by)
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .values("id", "name", "external_id", "region", "code")
-    )
+    total_count, citys = await fetch_list(city_list, filters)
 
     return CityListResponseSchema(
         total=total_count,
@@ -121,9 +118,9 @@ async def get_city(
     city_id: UUID = Path(
         ..., title="ID города", description="ID просматриваемого города"
     ),
-    _=Depends(require_permission_in_context("view_city")),
+    _=Depends(cached_permission_in_context("view_city")),
 ):
-    logger.info(f"Запрос на просмотр города: {city_id}")
+    logger.info("Запрос на просмотр города: {}", city_id)
     city = (
         await City.filter(id=city_id)
         .first()
@@ -136,5 +133,6 @@ async def get_city(
 
     city_schema = CitySchema(**city)
 
-    logger.success(f"город найден: {city_schema}")
+    logger.success("город найден: {}", city_id)
+    logger.debug("город {}: {}", city_id, city_schema)
     return city_schema
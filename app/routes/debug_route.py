@@ -0,0 +1,40 @@
+import os
+from typing import Literal
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from loguru import logger
+from tiacore_lib.handlers.auth_handler import require_superadmin
+
+from metrics.profiler import MAX_PROFILE_SECONDS, ProfilerBusyError, profile
+
+debug_router = APIRouter()
+
+
+@debug_router.post(
+    "/profile",
+    summary="Профиль CPU воркера, обработавшего запрос (только superadmin)",
+)
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    format: Literal["collapsed", "speedscope"] = Query("collapsed"),
+    _=Depends(require_superadmin),
+):
+    pid = os.getpid()
+    logger.warning("Профилирование воркера {} на {} с", pid, seconds)
+    try:
+        profiler = await profile(seconds)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    headers = {"X-Profile-Pid": str(pid), "X-Profile-Samples": str(profiler.samples)}
+    if format == "speedscope":
+        name = f"profile-{pid}.speedscope.json"
+        body = orjson.dumps(profiler.speedscope(name))
+        media_type = "application/json"
+    else:
+        name = f"profile-{pid}.txt"
+        body = profiler.collapsed()
+        media_type = "text/plain"
+    headers["Content-Disposition"] = f'attachment; filename="{name}"'
+    return Response(body, media_type=media_type, headers=headers)
@@ -1,14 +1,12 @@
+from typing import Set
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from loguru import logger
-from tiacore_lib.handlers.dependency_handler import require_permission_in_context
 from tiacore_lib.pydantic_models.entity_company_relation_models import (
     EntityCompanyRelationCreateSchema,
     EntityCompanyRelationEditSchema,
-    EntityCompanyRelationListResponseSchema,
     EntityCompanyRelationResponseSchema,
-    EntityCompanyRelationSchema,
     entity_company_filter_params,
 )
 from tiacore_lib.utils.validate_helpers import validate_exists
@@ -18,10 +16,78 @@ from app.database.models import (
     EntityCompanyRelation,
     LegalEntity,
 )
+from app.dependencies.auth import cached_permission_in_context
 from app.dependencies.permissions import with_permission_and_legal_entity_company_check
+from app.pydantic_models.entity_models import (
+    EntityCompanyRelationExpandedListResponseSchema,
+    EntityCompanyRelationExpandedSchema,
+    LegalEntitySummarySchema,
+    expand_params,
+)
+from app.utils.change_entities import ENTITY_COMPANY_RELATION, LEGAL_ENTITY
+from app.utils.change_log import tracked_transaction
+from app.utils.list_engine import FilterSpec, ListSpec, fetch_list
 
 entity_relation_router = APIRouter()
 
+EXPAND_LEGAL_ENTITY = "legal_entity"
+
+RELATION_FIELDS = (
+    "id",
+    "company_id",
+    "legal_entity_id",
+    "relation_type",
+    "description",
+    "created_at",
+)
+# Поля юрлица берутся тем же запросом через JOIN
+LEGAL_ENTITY_SUMMARY_FIELDS = (
+    "legal_entity__short_name",
+    "legal_entity__full_name",
+    "legal_entity__inn",
+    "legal_entity__kpp",
+)
+
+relation_list = ListSpec(
+    model=EntityCompanyRelation,
+    fields=RELATION_FIELDS,
+    sorts={"created_at": "created_at"},
+    default_sort="created_at",
+    filters=(
+        FilterSpec("legal_entity_id", "legal_entity_id"),
+        FilterSpec("relation_type", "relation_type__icontains"),
+        FilterSpec("description", "description__icontains"),
+    ),
+)
+
+
+def relation_fields(expand: Set[str]) -> list:
+    fields = list(RELATION_FIELDS)
+    if EXPAND_LEGAL_ENTITY in expand:
+        fields += LEGAL_ENTITY_SUMMARY_FIELDS
+    return fields
+
+
+def relation_from_row(row: dict) -> EntityCompanyRelationExpandedSchema:
+    legal_entity = None
+    if "legal_entity__short_name" in row:
+        legal_entity = LegalEntitySummarySchema(
+            legal_entity_id=row["legal_entity_id"],
+            short_name=row["legal_entity__short_name"],
+            full_name=row["legal_entity__full_name"],
+            inn=row["legal_entity__inn"],
+            kpp=row["legal_entity__kpp"],
+        )
+    return EntityCompanyRelationExpandedSchema(
+        entity_company_relation_id=row["id"],
+        company_id=row["company_id"],
+        legal_entity_id=row["legal_entity_id"],
+        relation_type=row["relation_type"],
+        description=row["description"],
+        created_at=row["created_at"],
+        legal_entity=legal_entity,
+    )
+
 
 @entity_relation_router.post(
     "/add",
@@ -32,7 +98,7 @@ entity_relation_router = APIRouter()
 async def add_entity_company_relation(
     data: EntityCompanyRelationCreateSchema,
     context: dict = Depends(
-        require_permission_in_context("add_legal_entity_company_relation")
+        cached_permission_in_context("add_legal_entity_company_relation")
     ),
 ):
     try:
@@ -44,12 +110,17 @@ async def add_entity_company_relation(
                     status_code=403, detail="Вы не имеете доступа к этой компании"
                 )
 
-        relation = await EntityCompanyRelation.create(
-            company_id=data.company_id,
-            legal_entity_id=data.legal_entity_id,
-            relation_type=data.relation_type,
-            description=data.description,
-        )
+        async with tracked_transaction() as changes:
+            relation = await EntityCompanyRelation.create(
+                company_id=data.company_id,
+                legal_entity_id=data.legal_entity_id,
+                relation_type=data.relation_type,
+                description=data.description,
+            )
+            changes.upsert(ENTITY_COMPANY_RELATION, relation.id, [relation.company_id])
+            changes.upsert(
+                LEGAL_ENTITY, relation.legal_entity_id, [relation.company_id]
+            )
         return EntityCompanyRelationResponseSchema(
             entity_company_relation_id=relation.id
         )
@@ -66,8 +137,10 @@ async def add_entity_company_relation(
 async def update_entity_company_relation(
     relation_id: UUID,
     data: EntityCompanyRelationEditSchema,
-    _=with_permission_and_legal_entity_company_check(
-        "edit_legal_entity_company_relation"
+    _=Depends(
+        with_permission_and_legal_entity_company_check(
+            "edit_legal_entity_company_relation"
+        )
     ),
 ):
     relation = await EntityCompanyRelation.filter(id=relation_id).first()
@@ -79,12 +152,28 @@ async def update_entity_company_relation(
     if "legal_entity_id" in update_data:
         await validate_exists(LegalEntity, data.legal_entity_id, "Entity")
 
+    previous = (relation.legal_entity_id, relation.company_id)
     await relation.update_from_dict(update_data)
-    await relation.save()
+    async with tracked_transaction() as changes:
+        await relation.save()
+        if relation.company_id != previous[1]:
+            changes.delete(ENTITY_COMPANY_RELATION, relation.id, [previous[1]])
+        changes.upsert(ENTITY_COMPANY_RELATION, relation.id, [relation.company_id])
+        changes.upsert(LEGAL_ENTITY, relation.legal_entity_id, [relation.company_id])
+        if (relation.legal_entity_id, relation.company_id) != previous:
+            await _detach_legal_entity(changes, *previous)
 
     return {"entity_company_relation_id": str(relation.id)}
 
 
+async def _detach_legal_entity(changes, legal_entity_id, company_id):
+    # Юрлицо пропадает из ленты компании, если других связей с ним не осталось
+    if not await EntityCompanyRelation.exists(
+        legal_entity_id=legal_entity_id, company_id=company_id
+    ):
+        changes.delete(LEGAL_ENTITY, legal_entity_id, [company_id])
+
+
 @entity_relation_router.delete(
     "/{relation_id}",
     summary="Удалить связь компании и юрлица",
@@ -92,100 +181,73 @@ async def update_entity_company_relation(
 )
 async def delete_entity_company_relation(
     relation_id: UUID,
-    _=with_permission_and_legal_entity_company_check(
-        "delete_legal_entity_company_relation"
+    _=Depends(
+        with_permission_and_legal_entity_company_check(
+            "delete_legal_entity_company_relation"
+        )
     ),
 ):
     relation = await EntityCompanyRelation.filter(id=relation_id).first()
     if not relation:
         raise HTTPException(status_code=404, detail="Связь не найдена")
-    await relation.delete()
+    async with tracked_transaction() as changes:
+        await relation.delete()
+        changes.delete(ENTITY_COMPANY_RELATION, relation.id, [relation.company_id])
+        await _detach_legal_entity(
+            changes, relation.legal_entity_id, relation.company_id
+        )
 
 
 @entity_relation_router.get(
     "/all",
-    response_model=EntityCompanyRelationListResponseSchema,
+    response_model=EntityCompanyRelationExpandedListResponseSchema,
     summary="Получение списка связей компании и юрлица",
 )
 async def get_entity_company_relations(
     filters: dict = Depends(entity_company_filter_params),
+    expand: Set[str] = Depends(expand_params(EXPAND_LEGAL_ENTITY)),
     context: dict = Depends(
-        require_permission_in_context("get_all_legal_entity_company_relations")
+        cached_permission_in_context("get_all_legal_entity_company_relations")
     ),
 ):
-    query = Q()
-    if filters.get("legal_entity_id"):
-        query &= Q(legal_entity_id=filters["legal_entity_id"])
     if context["is_superadmin"]:
-        company_filter = filters.get("company_id")
-        if company_filter:
-            query &= Q(company_id=company_filter)
-    else:
-        query &= Q(company_id=context["company"])
-    if filters.get("relation_type"):
-        query &= Q(relation_type__icontains=filters["relation_type"])
-    if filters.get("description"):
-        query &= Q(description__icontains=filters["description"])
-
-    sort_by = filters.get("sort_by", "created_at")
-    order = filters.get("order", "asc").lower()
-    if order not in ("asc", "desc"):
-        raise HTTPException(
-            status_code=422, detail="order должен быть 'asc' или 'desc'"
+        query = (
+            Q(company_id=filters["company_id"]) if filters.get("company_id") else None
         )
+    else:
+        query = Q(company_id=context["company"])
 
-    sort_field = sort_by if order == "asc" else f"-{sort_by}"
-
-    total_count = await EntityCompanyRelation.filter(query).count()
-    relations = (
-        await EntityCompanyRelation.filter(query)
-        .order_by(sort_field)
-        .prefetch_related("legal_entity")
-        .offset((filters["page"] - 1) * filters["page_size"])
-        .limit(filters["page_size"])
+    total_count, relations = await fetch_list(
+        relation_list, filters, query, fields=relation_fields(expand)
     )
 
-    return EntityCompanyRelationListResponseSchema(
+    return EntityCompanyRelationExpandedListResponseSchema(
         total=total_count,
-        relations=[
-            EntityCompanyRelationSchema(
-                entity_company_relation_id=relation.id,
-                company_id=relation.company_id,
-                legal_entity_id=relation.legal_entity.id,
-                relation_type=relation.relation_type,
-                description=relation.description,
-                created_at=relation.created_at,
-            )
-            for relation in relations
-        ],
+        relations=[relation_from_row(row) for row in relations],
     )
 
 
 @entity_relation_router.get(
     "/{relation_id}",
-    response_model=EntityCompanyRelationSchema,
+    response_model=EntityCompanyRelationExpandedSchema,
     summary="Просмотр связи компании и юрлица",
 )
 async def get_entity_company_relation(
     relation_id: UUID,
-    _=with_permission_and_legal_entity_company_check(
-        "view_legal_entity_company_relation"
+    expand: Set[str] = Depends(expand_params(EXPAND_LEGAL_ENTITY)),
+    _=Depends(
+        with_permission_and_legal_entity_company_check(
+            "view_legal_entity_company_relation"
+        )
     ),
 ):
     relation = (
         await EntityCompanyRelation.filter(id=relation_id)
-        .prefetch_related("legal_entity")
         .first()
+        .values(*relation_fields(expand))
     )
 
     if not relation:
         raise HTTPException(status_code=404, detail="Связь не найдена")
 
-    return EntityCompanyRelationSchema(
-        entity_company_relation_id=relation.id,
-        company_id=relation.company_id,
-        legal_entity_id=relation.legal_entity.id,
-        relation_type=relation.relation_type,
-        description=relation.description,
-        created_at=relation.created_at,
-    )
+    return relation_from_row(relation)
@@ -1,17 +1,29 @@
 from fastapi import APIRouter, Depends
 from loguru import logger
-from tiacore_lib.handlers.auth_handler import get_current_user
 from tiacore_lib.pydantic_models.entity_type_models import (
     FilterParams,
     LegalEntityTypeListResponse,
     LegalEntityTypeSchema,
 )
-from tortoise.expressions import Q
 
+from app.cache.two_tier import TwoTierCache
 from app.database.models import LegalEntityType
+from app.dependencies.auth import cached_current_user
+from app.utils.list_engine import FilterSpec, ListSpec, fetch_list
 
 entity_types_router = APIRouter()
 
+# Типы юрлиц меняются только миграциями, поэтому кэшируем надолго
+entity_types_cache = TwoTierCache("legal_entity_types", ttl=3600)
+
+entity_type_list = ListSpec(
+    model=LegalEntityType,
+    fields=("id", "name"),
+    sorts={"id": "id", "name": "name"},
+    default_sort="name",
+    filters=(FilterSpec("entity_name", "name__icontains"),),
+)
+
 
 @entity_types_router.get(
     "/all",
@@ -20,35 +32,39 @@ entity_types_router = APIRouter()
 )
 async def get_entity_types(
     filters: FilterParams = Depends(),
-    _: str = Depends(get_current_user),
+    _: str = Depends(cached_current_user),
 ):
-    logger.info(f"Запрос на список типов юр. лиц: {filters}")
-
-    query = Q()
-
-    if filters.entity_name:
-        query &= Q(name__icontains=filters.entity_name)
+    logger.debug("Запрос на список типов юр. лиц: {}", filters)
 
-    order = filters.order
-    sort_by = filters.sort_by
-    order_by = f"{'-' if order == 'desc' else ''}{sort_by}"
-
-    page = filters.page
-    page_size = filters.page_size
+    key = ":".join(
+        str(value)
+        for value in (
+            filters.entity_name,
+            filters.sort_by,
+            filters.order,
+            filters.page,
+            filters.page_size,
+        )
+    )
+    data = await entity_types_cache.get_or_set(key, lambda: load_entity_types(filters))
+    return LegalEntityTypeListResponse(**data)
 
-    total_count = await LegalEntityType.filter(query).count()
 
-    entity_types = [
-        LegalEntityTypeSchema(**p)
-        for p in await LegalEntityType.filter(query)
-        .order_by(order_by)
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .values("id", "name")
-    ]
+async def load_entity_types(filters: FilterParams) -> dict:
+    total_count, rows = await fetch_list(
+        entity_type_list,
+        {
+            "entity_name": filters.entity_name,
+            "sort_by": filters.sort_by,
+            "order": filters.order,
+            "page": filters.page,
+            "page_size": filters.page_size,
+        },
+    )
+    entity_types = [LegalEntityTypeSchema(**row) for row in rows]
 
     if not entity_types:
         logger.info("Список разрешений пуст")
     return LegalEntityTypeListResponse(
         total=total_count, legal_entity_types=entity_types
-    )
+    ).model_dump(mode="json", by_alias=True)
@@ -1,9 +1,10 @@
-from typing import Optional
+from dataclasses import replace
+from typing import Optional, Set
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from loguru import logger
-from tiacore_lib.handlers.auth_handler import get_current_user
+from opentelemetry.trace import SpanKind
 from tiacore_lib.pydantic_models.legal_entity_models import (
     LegalEntityCreateSchema,
     LegalEntityEditSchema,
@@ -18,18 +19,63 @@ from tiacore_lib.pydantic_models.legal_entity_models import (
 from tiacore_lib.utils.entity_data_get import fetch_egrul_data
 from tiacore_lib.utils.helpers import format_address
 from tiacore_lib.utils.validate_helpers import validate_exists
-from tortoise.expressions import Q
+from tortoise.expressions import Q, Subquery
 
 from app.database.models import (
     EntityCompanyRelation,
     LegalEntity,
     LegalEntityType,
 )
-from app.pydantic_models.entity_models import LegalEntityByIdsRequestSchema
+from app.database.repository import (
+    find_legal_entity_by_inn_kpp,
+    get_legal_entity_with_relations,
+)
+from app.dependencies.auth import cached_current_user
+from app.pydantic_models.entity_models import (
+    LegalEntityByIdsRequestSchema,
+    LegalEntityExpandedSchema,
+    expand_params,
+)
+from app.utils.change_entities import ENTITY_COMPANY_RELATION, LEGAL_ENTITY
+from app.utils.change_log import legal_entity_company_ids, tracked_transaction
+from app.utils.change_payloads import LEGAL_ENTITY_FIELDS
+from app.utils.dataloader import BatchLoader
 from app.utils.db_helpers import get_entities_by_query
+from app.utils.list_engine import FilterSpec, ListSpec, fetch_list
+from app.utils.singleflight import coalesce_requests
+from metrics.tracer import traced
 
 entity_router = APIRouter()
 
+EXPAND_RELATIONS = "relations"
+
+legal_entity_loader = BatchLoader(LegalEntity, LEGAL_ENTITY_FIELDS)
+
+legal_entity_list = ListSpec(
+    model=LegalEntity,
+    fields=LEGAL_ENTITY_FIELDS,
+    sorts={"name": "short_name", "short_name": "short_name", "inn": "inn"},
+    default_sort="short_name",
+    filters=(FilterSpec("entity_type", "entity_type_id"),),
+)
+# Выборка по списку id исторически фильтрует по entity_type_id, а не entity_type
+legal_entity_by_ids_list = replace(
+    legal_entity_list,
+    filters=(FilterSpec("entity_type_id", "entity_type_id"),),
+)
+
+
+async def create_relation(changes, entity: LegalEntity, data):
+    relation = await EntityCompanyRelation.create(
+        company_id=data.company_id,
+        legal_entity=entity,
+        relation_type=data.relation_type,
+        description=data.description,
+    )
+    changes.upsert(ENTITY_COMPANY_RELATION, relation.id, [relation.company_id])
+    changes.upsert(LEGAL_ENTITY, entity.id, [relation.company_id])
+    return relation
+
 
 @entity_router.post(
     "/add",
@@ -39,7 +85,7 @@ entity_router = APIRouter()
 )
 async def add_legal_entity(
     data: LegalEntityCreateSchema,
-    context=Depends(get_current_user),
+    context=Depends(cached_current_user),
 ):
     entity_type = None
 
@@ -68,25 +114,21 @@ async def add_legal_entity(
                 status_code=400, detail=f"Юрлицо с ОГРН {data.ogrn} уже существует"
             )
 
-    entity = await LegalEntity.create(
-        short_name=data.short_name,
-        full_name=data.full_name,
-        inn=data.inn,
-        kpp=data.kpp,
-        ogrn=data.ogrn,
-        vat_rate=data.vat_rate,
-        opf=data.opf,
-        address=data.address,
-        entity_type=entity_type,
-        signer=data.signer,
-    )
-    if data.relation_type:
-        await EntityCompanyRelation.create(
-            company_id=data.company_id,
-            legal_entity=entity,
-            relation_type=data.relation_type,
-            description=data.description,
+    async with tracked_transaction() as changes:
+        entity = await LegalEntity.create(
+            short_name=data.short_name,
+            full_name=data.full_name,
+            inn=data.inn,
+            kpp=data.kpp,
+            ogrn=data.ogrn,
+            vat_rate=data.vat_rate,
+            opf=data.opf,
+            address=data.address,
+            entity_type=entity_type,
+            signer=data.signer,
         )
+        if data.relation_type:
+            await create_relation(changes, entity, data)
     return LegalEntityResponseSchema(legal_entity_id=entity.id)
 
 
@@ -98,7 +140,7 @@ async def add_legal_entity(
 )
 async def add_legal_entity_by_inn(
     data: LegalEntityINNCreateSchema,
-    context=Depends(get_current_user),
+    context=Depends(cached_current_user),
 ):
     # if not context.get("is_superadmin"):
     #     if data.company_id not in context["companies"]:
@@ -117,7 +159,8 @@ async def add_legal_entity_by_inn(
             status_code=400, detail=f"Юрлицо с ИНН {data.inn} уже существует"
         )
 
-    entity_data = await fetch_egrul_data(data.inn)
+    with traced("egrul.fetch", kind=SpanKind.CLIENT):
+        entity_data = await fetch_egrul_data(data.inn)
     # logger.debug(f"Полученный ответ о юр лице: {entity_data}")
     if entity_data.get("СвЮЛ"):
         org_data = entity_data["СвЮЛ"]
@@ -140,7 +183,7 @@ async def add_legal_entity_by_inn(
 
         addr = org_data["СвАдресЮЛ"].get("АдресРФ") or {}
 
-        entity = await LegalEntity.create(
+        entity_kwargs = dict(
             short_name=org_data["СвНаимЮЛ"]["СвНаимЮЛСокр"]["@attributes"]["НаимСокр"],
             inn=org_data["@attributes"]["ИНН"],
             kpp=data.kpp or org_data["@attributes"]["КПП"],
@@ -165,7 +208,7 @@ async def add_legal_entity_by_inn(
 
         addr = entity_data.get("СвРегОрг", {}).get("@attributes", {}).get("АдрРО") or ""
 
-        entity = await LegalEntity.create(
+        entity_kwargs = dict(
             short_name=full_name,
             inn=org_data["@attributes"].get("ИННФЛ"),
             kpp=data.kpp,
@@ -177,13 +220,10 @@ async def add_legal_entity_by_inn(
             status_code=400, detail="Организация не является ни Юр Лицом, ни ИП"
         )
 
-    if data.relation_type:
-        await EntityCompanyRelation.create(
-            company_id=data.company_id,
-            legal_entity=entity,
-            relation_type=data.relation_type,
-            description=data.description,
-        )
+    async with tracked_transaction() as changes:
+        entity = await LegalEntity.create(**entity_kwargs)
+        if data.relation_type:
+            await create_relation(changes, entity, data)
 
     return LegalEntityResponseSchema(legal_entity_id=entity.id)
 
@@ -196,7 +236,7 @@ async def add_legal_entity_by_inn(
 async def update_legal_entity(
     legal_entity_id: UUID,
     data: LegalEntityEditSchema,
-    _=Depends(get_current_user),
+    _=Depends(cached_current_user),
 ):
     entity = await LegalEntity.filter(id=legal_entity_id).first()
     if not entity:
@@ -208,7 +248,10 @@ async def update_legal_entity(
         await validate_exists(LegalEntityType, data.entity_type_id, "LegalEntityType")
 
     await entity.update_from_dict(update_data)
-    await entity.save()
+    company_ids = await legal_entity_company_ids(entity.id)
+    async with tracked_transaction() as changes:
+        await entity.save()
+        changes.upsert(LEGAL_ENTITY, entity.id, company_ids)
 
     return {"legal_entity_id": str(entity.id)}
 
@@ -220,13 +263,24 @@ async def update_legal_entity(
 )
 async def delete_legal_entity(
     legal_entity_id: UUID,
-    _=Depends(get_current_user),
+    _=Depends(cached_current_user),
 ):
     entity = await LegalEntity.filter(id=legal_entity_id).first()
     if not entity:
         raise HTTPException(status_code=404, detail="Юридическое лицо не найдено")
 
-    await entity.delete()
+    relations = await EntityCompanyRelation.filter(legal_entity_id=entity.id).values(
+        "id", "company_id"
+    )
+    async with tracked_transaction() as changes:
+        await entity.delete()
+        for relation in relations:
+            changes.delete(
+                ENTITY_COMPANY_RELATION, relation["id"], [relation["company_id"]]
+            )
+        changes.delete(
+            LEGAL_ENTITY, entity.id, [relation["company_id"] for relation in relations]
+        )
     return
 
 
@@ -235,67 +289,28 @@ async def delete_legal_entity(
     response_model=LegalEntityListResponseSchema,
     summary="Получение списка юридических лиц",
 )
+@coalesce_requests()
 async def get_legal_entities(
     company_id: Optional[UUID] = Query(None),
     filters: dict = Depends(legal_entity_filter_params),
-    context: dict = Depends(get_current_user),
+    context: dict = Depends(cached_current_user),
 ):
-    query = Q()
-
+    query = None
     if context["is_superadmin"]:
         company_filter = filters.get("company_id")
-        if company_filter:
-            query &= Q(entity_company_relations__company_id=company_filter)
     else:
-        related_entity_ids = await EntityCompanyRelation.filter(
-            company_id=company_id
-        ).values_list("legal_entity_id", flat=True)
-
-        if not related_entity_ids:
-            return LegalEntityListResponseSchema(total=0, entities=[])
-
-        query &= Q(id__in=related_entity_ids)
-
-    if filters.get("entity_type"):
-        query &= Q(entity_type_id=filters["entity_type"])
-
-    sort_by = filters.get("sort_by", "short_name")
-
-    # Маппинг алиасов → реальные поля модели
-    sort_field_map = {
-        "name": "short_name",
-        "short_name": "short_name",
-        # можно расширить при необходимости
-    }
-
-    sort_field = sort_field_map.get(sort_by, sort_by)
-
-    order_prefix = "-" if filters.get("order") == "desc" else ""
-    order_by = f"{order_prefix}{sort_field}"
-    page = filters.get("page", 1)
-    page_size = filters.get("page_size", 10)
-    offset = (page - 1) * page_size
-
-    total_count = await LegalEntity.filter(query).count()
-    entities = (
-        await LegalEntity.filter(query)
-        .order_by(order_by)
-        .offset(offset)
-        .limit(page_size)
-        .values(
-            "id",
-            "full_name",
-            "short_name",
-            "inn",
-            "kpp",
-            "opf",
-            "vat_rate",
-            "address",
-            "entity_type_id",
-            "signer",
-            "ogrn",
+        company_filter = company_id
+    if company_filter or not context["is_superadmin"]:
+        # Подзапрос вместо JOIN: юрлицо с несколькими связями не дублируется
+        query = Q(
+            id__in=Subquery(
+                EntityCompanyRelation.filter(company_id=company_filter).values(
+                    "legal_entity_id"
+                )
+            )
         )
-    )
+
+    total_count, entities = await fetch_list(legal_entity_list, filters, query)
 
     return LegalEntityListResponseSchema(
         total=total_count,
@@ -314,53 +329,13 @@ async def get_legal_entities(
 async def get_legal_entities_by_ids(
     data: LegalEntityByIdsRequestSchema,
     filters: dict = Depends(legal_entity_filter_params),
-    _: dict = Depends(get_current_user),
+    _: dict = Depends(cached_current_user),
 ):
     if not data.ids:
         return LegalEntityListResponseSchema(total=0, entities=[])
 
-    query = Q(id__in=data.ids)
-
-    if filters.get("entity_type_id"):
-        query &= Q(entity_type_id=filters["entity_type_id"])
-
-    sort_by = filters.get("sort_by", "short_name")
-
-    # Маппинг алиасов → реальные поля модели
-    sort_field_map = {
-        "name": "short_name",
-        "short_name": "short_name",
-        # можно расширить при необходимости
-    }
-
-    sort_field = sort_field_map.get(sort_by, sort_by)
-
-    order_prefix = "-" if filters.get("order") == "desc" else ""
-    order_by = f"{order_prefix}{sort_field}"
-
-    page = filters.get("page", 1)
-    page_size = filters.get("page_size", 10)
-    offset = (page - 1) * page_size
-
-    total_count = await LegalEntity.filter(query).count()
-    entities = (
-        await LegalEntity.filter(query)
-        .order_by(order_by)
-        .offset(offset)
-        .limit(page_size)
-        .values(
-            "id",
-            "full_name",
-            "short_name",
-            "inn",
-            "kpp",
-            "opf",
-            "vat_rate",
-            "address",
-            "entity_type_id",
-            "signer",
-            "ogrn",
-        )
+    total_count, entities = await fetch_list(
+        legal_entity_by_ids_list, filters, Q(id__in=data.ids)
     )
 
     return LegalEntityListResponseSchema(
@@ -374,9 +349,10 @@ async def get_legal_entities_by_ids(
     response_model=LegalEntityListResponseSchema,
     summary="Получение списка buyers",
 )
+@coalesce_requests()
 async def get_buyers(
     company_id: Optional[UUID] = Query(None),
-    context: dict = Depends(get_current_user),
+    context: dict = Depends(cached_current_user),
 ):
     try:
         if context["is_superadmin"]:
@@ -410,9 +386,10 @@ async def get_buyers(
     response_model=LegalEntityListResponseSchema,
     summary="Получение списка sellers",
 )
+@coalesce_requests()
 async def get_sellers(
     company_id: Optional[UUID] = Query(None),
-    context: dict = Depends(get_current_user),
+    context: dict = Depends(cached_current_user),
 ):
     try:
         # Ищем все legal_entity_id, связанные с этими компаниями
@@ -445,9 +422,10 @@ async def get_sellers(
     response_model=LegalEntityListResponseSchema,
     summary="Получение списка организаций по компании",
 )
+@coalesce_requests()
 async def get_by_company(
     company_id: UUID = Query(..., description="ID компании"),
-    _: dict = Depends(get_current_user),
+    context: dict = Depends(cached_current_user),
 ):
     try:
         related_entity_ids = await EntityCompanyRelation.filter(
@@ -478,19 +456,16 @@ async def get_by_company(
 )
 async def get_legal_entity_by_inn_kpp(
     filters: dict[str, Optional[str]] = Depends(inn_kpp_filter_params),
-    _: dict = Depends(get_current_user),
+    _: dict = Depends(cached_current_user),
 ):
     try:
-        kpp = filters.get("kpp")
-        if not kpp:
-            entity = await LegalEntity.filter(inn=filters["inn"]).first()
-        else:
-            entity = await LegalEntity.filter(inn=filters["inn"], kpp=kpp).first()
+        entity = await find_legal_entity_by_inn_kpp(filters["inn"], filters.get("kpp"))
         if not entity:
             raise HTTPException(status_code=404, detail="Организация не найдена")
+        legal_entity_id, short_name = entity
         return LegalEntityShortSchema(
-            legal_entity_id=entity.id,
-            legal_entity_name=entity.short_name,
+            legal_entity_id=legal_entity_id,
+            legal_entity_name=short_name,
         )
     except (KeyError, TypeError, ValueError) as e:
         logger.warning(f"Ошибка данных: {e}")
@@ -499,20 +474,29 @@ async def get_legal_entity_by_inn_kpp(
 
 @entity_router.get(
     "/{legal_entity_id}",
-    response_model=LegalEntitySchema,
+    response_model=LegalEntityExpandedSchema,
     summary="Просмотр одного юридического лица",
 )
 async def get_legal_entity(
     legal_entity_id: UUID,
-    _: dict = Depends(get_current_user),
+    expand: Set[str] = Depends(expand_params(EXPAND_RELATIONS)),
+    context: dict = Depends(cached_current_user),
 ):
-    entity = (
-        await LegalEntity.filter(id=legal_entity_id)
-        .prefetch_related("entity_type", "entity_company_relations")
-        .first()
-    )
+    if EXPAND_RELATIONS in expand:
+        # Обычный пользователь видит только связи своей компании,
+        # пользователь без компании — никаких
+        entity = await get_legal_entity_with_relations(
+            legal_entity_id,
+            context.get("company"),
+            all_companies=bool(context.get("is_superadmin")),
+        )
+        if not entity:
+            raise HTTPException(status_code=404, detail="Юридическое лицо не найдено")
+        return LegalEntityExpandedSchema(**entity)
+
+    entity = await legal_entity_loader.load(legal_entity_id)
 
     if not entity:
         raise HTTPException(status_code=404, detail="Юридическое лицо не найдено")
 
-    return LegalEntitySchema(**entity.__dict__)
+    return LegalEntitySchema(**entity)
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Response
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
+from metrics.multiprocess import metrics_registry
+
 monitoring_router = APIRouter()
 
 
 @monitoring_router.get("/metrics")
 def monitoring():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
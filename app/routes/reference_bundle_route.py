@@ -0,0 +1,51 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+
+from app.cache.reference_bundle import reference_bundle_cache
+from app.dependencies.auth import cached_current_user
+
+bundle_router = APIRouter()
+
+
+def has_company_access(context: dict, company_id: UUID) -> bool:
+    if context.get("is_superadmin"):
+        return True
+    allowed = {
+        context.get("company"),
+        context.get("company_id"),
+        *(context.get("companies") or ()),
+    }
+    return str(company_id) in {str(company) for company in allowed if company}
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = {
+        tag.strip().removeprefix("W/").strip('"') for tag in if_none_match.split(",")
+    }
+    return etag in tags or "*" in tags
+
+
+@bundle_router.get(
+    "/{company_id}/reference-bundle",
+    summary="Справочники компании одним документом для первичной загрузки",
+    responses={304: {"description": "Пакет не изменился"}},
+)
+async def get_reference_bundle(
+    company_id: UUID,
+    request: Request,
+    context: dict = Depends(cached_current_user),
+):
+    if not has_company_access(context, company_id):
+        raise HTTPException(
+            status_code=403, detail="Вы не имеете доступа к этой компании"
+        )
+
+    bundle = await reference_bundle_cache.get(company_id)
+    headers = {"ETag": f'"{bundle.etag}"', "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, bundle.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=bundle.body, media_type="application/json", headers=headers)
@@ -2,7 +2,6 @@ from uuid import UUID
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Path, status
 from loguru import logger
-from tiacore_lib.handlers.dependency_handler import require_permission_in_context
 from tiacore_lib.handlers.permissions_handler import (
     with_permission_and_company_from_body_check,
 )
@@ -10,6 +9,7 @@ from tiacore_lib.utils.validate_helpers import validate_company_access
 from tortoise.expressions import Q
 
 from app.database.models import Warehouse
+from app.dependencies.auth import cached_permission_in_context
 from app.pydantic_models.warehouse_models import (
     WarehouseCreateSchema,
     WarehouseEditSchema,
@@ -18,9 +18,29 @@ from app.pydantic_models.warehouse_models import (
     WarehouseSchema,
     warehouse_filter_params,
 )
+from app.utils.change_entities import WAREHOUSE
+from app.utils.change_log import tracked_transaction
+from app.utils.change_payloads import STAFF_FIELDS
+from app.utils.dataloader import BatchLoader
+from app.utils.list_engine import FilterSpec, ListSpec, fetch_list
+from app.utils.singleflight import coalesce_requests
 
 warehouse_router = APIRouter()
 
+warehouse_loader = BatchLoader(Warehouse, STAFF_FIELDS)
+
+warehouse_list = ListSpec(
+    model=Warehouse,
+    fields=STAFF_FIELDS,
+    sorts={"name": "name", "created_at": "created_at"},
+    default_sort="name",
+    filters=(
+        FilterSpec("warehouse_name", "name__icontains"),
+        FilterSpec("description", "description__icontains"),
+    ),
+    cached=True,
+)
+
 
 @warehouse_router.post(
     "/add",
@@ -32,16 +52,18 @@ async def add_warehouse(
     data: WarehouseCreateSchema = Body(...),
     context=Depends(with_permission_and_company_from_body_check("add_warehouse")),
 ):
-    warehouse = await Warehouse.create(
-        created_by=context["user_id"],
-        modified_by=context["user_id"],
-        **data.model_dump(exclude_unset=True),
-    )
+    async with tracked_transaction() as changes:
+        warehouse = await Warehouse.create(
+            created_by=context["user_id"],
+            modified_by=context["user_id"],
+            **data.model_dump(exclude_unset=True),
+        )
+        changes.upsert(WAREHOUSE, warehouse.id, [warehouse.company_id])
     if not warehouse:
         logger.error("Не удалось создать склад")
         raise HTTPException(status_code=500, detail="Не удалось создать склад")
 
-    logger.success(f"склад {warehouse.name} ({warehouse.id}) успешно создан")
+    logger.success("склад {} ({}) успешно создан", warehouse.name, warehouse.id)
     return {"warehouse_id": str(warehouse.id)}
 
 
@@ -57,16 +79,22 @@ async def edit_warehouse(
     data: WarehouseEditSchema = Body(...),
     context=Depends(with_permission_and_company_from_body_check("edit_warehouse")),
 ):
-    logger.info(f"Обновление склада {warehouse_id}")
+    logger.info("Обновление склада {}", warehouse_id)
 
     warehouse = await Warehouse.filter(id=warehouse_id).first()
     if not warehouse:
         logger.warning(f"склад {warehouse_id} не найден")
         raise HTTPException(status_code=404, detail="Склад не найден")
     validate_company_access(warehouse, context, "складом")
+    previous_company_id = warehouse.company_id
     warehouse.modified_by = context["user_id"]
     await warehouse.update_from_dict(data.model_dump(exclude_unset=True))
-    await warehouse.save()
+
+    async with tracked_transaction() as changes:
+        await warehouse.save()
+        if warehouse.company_id != previous_company_id:
+            changes.delete(WAREHOUSE, warehouse.id, [previous_company_id])
+        changes.upsert(WAREHOUSE, warehouse.id, [warehouse.company_id])
 
 
 @warehouse_router.delete(
@@ -78,14 +106,16 @@ async def delete_warehouse(
     warehouse_id: UUID = Path(
         ..., title="ID склада", description="ID удаляемого склада"
     ),
-    context=Depends(require_permission_in_context("delete_warehouse")),
+    context=Depends(cached_permission_in_context("delete_warehouse")),
 ):
     warehouse = await Warehouse.filter(id=warehouse_id).first()
     if not warehouse:
         logger.warning(f"склад {warehouse_id} не найден")
         raise HTTPException(status_code=404, detail="склад не найден")
     validate_company_access(warehouse, context, "складом")
-    await warehouse.delete()
+    async with tracked_transaction() as changes:
+        await warehouse.delete()
+        changes.delete(WAREHOUSE, warehouse.id, [warehouse.company_id])
 
 
 @warehouse_router.get(
@@ -93,42 +123,13 @@ async def delete_warehouse(
     response_model=WarehouseListResponseSchema,
     summary="Получение списка складов с фильтрацией",
 )
+@coalesce_requests()
 async def get_warehouses(
     filters: dict = Depends(warehouse_filter_params),
-    context=Depends(require_permission_in_context("get_all_warehouses")),
+    context=Depends(cached_permission_in_context("get_all_warehouses")),
 ):
-    query = Q()
-    if not context["is_superadmin"]:
-        query &= Q(company_id=context["company_id"])
-    if filters.get("warehouse_name"):
-        query &= Q(name__icontains=filters["warehouse_name"])
-    if filters.get("description"):
-        query &= Q(description__icontains=filters["description"])
-
-    order_by = f"{'-' if filters.get('order') == 'desc' else ''}{
-        filters.get('sort_by', 'name')
-    }"
-    page = filters.get("page", 1)
-    page_size = filters.get("page_size", 10)
-
-    total_count = await Warehouse.filter(query).count()
-
-    warehouses = (
-        await Warehouse.filter(query)
-        .order_by(order_by)
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .values(
-            "id",
-            "name",
-            "description",
-            "created_at",
-            "created_by",
-            "modified_at",
-            "modified_by",
-            "company_id",
-        )
-    )
+    query = None if context["is_superadmin"] else Q(company_id=context["company_id"])
+    total_count, warehouses = await fetch_list(warehouse_list, filters, query)
 
     return WarehouseListResponseSchema(
         total=total_count,
@@ -143,23 +144,10 @@ async def get_warehouse(
     warehouse_id: UUID = Path(
         ..., title="ID склады", description="ID просматриваемой склады"
     ),
-    context=Depends(require_permission_in_context("view_warehouse")),
+    context=Depends(cached_permission_in_context("view_warehouse")),
 ):
-    logger.info(f"Запрос на просмотр склады: {warehouse_id}")
-    warehouse = (
-        await Warehouse.filter(id=warehouse_id)
-        .first()
-        .values(
-            "id",
-            "name",
-            "description",
-            "created_at",
-            "created_by",
-            "modified_at",
-            "modified_by",
-            "company_id",
-        )
-    )
+    logger.info("Запрос на просмотр склада: {}", warehouse_id)
+    warehouse = await warehouse_loader.load(warehouse_id)
     validate_company_access(warehouse, context, "складом")
     if warehouse is None:
         logger.warning(f"склада {warehouse_id} не найдена")
@@ -167,5 +155,6 @@ async def get_warehouse(
 
     warehouse_schema = WarehouseSchema(**warehouse)
 
-    logger.success(f"склада найдена: {warehouse_schema}")
+    logger.success("склад найден: {}", warehouse_id)
+    logger.debug("склад {}: {}", warehouse_id, warehouse_schema)
     return warehouse_schema
@@ -0,0 +1,11 @@
+# Сущности, попадающие в ленту изменений, и операции над ними. Общие для
+# change_log и change_payloads — отдельный модуль, чтобы они не импортировали
+# друг друга
+WAREHOUSE = "warehouse"
+CASH_REGISTER = "cash_register"
+CITY = "city"
+LEGAL_ENTITY = "legal_entity"
+ENTITY_COMPANY_RELATION = "entity_company_relation"
+
+UPSERT = "upsert"
+DELETE = "delete"
@@ -0,0 +1,195 @@
+import json
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable, List, Optional
+from uuid import UUID
+
+from loguru import logger
+from tortoise.transactions import in_transaction
+
+from app.database.engine import PRIMARY
+from app.database.models import ChangeLogEntry, EntityCompanyRelation, OutboxEvent
+from app.utils.change_entities import DELETE, UPSERT
+from app.utils.change_payloads import load_payloads
+
+# Канал Postgres NOTIFY для сброса локальных кэшей в других процессах
+INVALIDATION_CHANNEL = "reference_invalidation"
+# Лимит полезной нагрузки NOTIFY — 8000 байт, оставляем запас
+MAX_NOTIFY_PAYLOAD = 7900
+# Ключ pg_advisory_xact_lock, упорядочивающий записи change_log и outbox
+CHANGE_LOG_LOCK = 72_656_617
+
+
+@dataclass(frozen=True)
+class Change:
+    entity: str
+    entity_id: UUID
+    operation: str
+    company_ids: tuple
+
+
+def encode_changes(changes: List[Change]) -> str:
+    """Изменения для NOTIFY; слишком большая пачка заменяется полным сбросом."""
+    payload = json.dumps(
+        {
+            "changes": [
+                [
+                    change.entity,
+                    str(change.entity_id),
+                    change.operation,
+                    [str(c) if c else None for c in change.company_ids],
+                ]
+                for change in changes
+            ]
+        },
+        separators=(",", ":"),
+    )
+    if len(payload.encode()) > MAX_NOTIFY_PAYLOAD:
+        return json.dumps({"reset": True})
+    return payload
+
+
+def decode_changes(payload: str) -> Optional[List[Change]]:
+    """Обратное к encode_changes; None — сбросить кэши целиком."""
+    data = json.loads(payload)
+    if data.get("reset"):
+        return None
+    return [
+        Change(
+            entity=entity,
+            entity_id=UUID(entity_id),
+            operation=operation,
+            company_ids=tuple(UUID(c) if c else None for c in company_ids),
+        )
+        for entity, entity_id, operation, company_ids in data["changes"]
+    ]
+
+
+def changed_company_ids(changes: List[Change], entities: Iterable[str]) -> set:
+    """Компании, затронутые изменениями указанных сущностей."""
+    entities = set(entities)
+    return {
+        company_id
+        for change in changes
+        if change.entity in entities
+        for company_id in change.company_ids
+        if company_id is not None
+    }
+
+
+AfterCommitHook = Callable[[List[Change]], Awaitable[None]]
+
+_after_commit_hooks: List[AfterCommitHook] = []
+
+
+def on_commit(hook: AfterCommitHook) -> AfterCommitHook:
+    """Регистрирует обработчик, вызываемый после фиксации транзакции с изменениями."""
+    _after_commit_hooks.append(hook)
+    return hook
+
+
+class ChangeSet:
+    def __init__(self, connection):
+        self.connection = connection
+        self.changes: List[Change] = []
+
+    def upsert(self, entity: str, entity_id, company_ids: Iterable[Optional[UUID]]):
+        self._add(entity, entity_id, UPSERT, company_ids)
+
+    def delete(self, entity: str, entity_id, company_ids: Iterable[Optional[UUID]]):
+        self._add(entity, entity_id, DELETE, company_ids)
+
+    def _add(self, entity, entity_id, operation, company_ids):
+        company_ids = tuple(dict.fromkeys(company_ids))
+        if company_ids:
+            self.changes.append(Change(entity, entity_id, operation, company_ids))
+
+    async def flush(self):
+        if not self.changes:
+            return
+
+        # Событие для внешних реплик несёт состояние объекта на момент коммита
+        upserted = {}
+        for change in self.changes:
+            if change.operation == UPSERT:
+                upserted.setdefault(change.entity, set()).add(change.entity_id)
+        payloads = {
+            entity: await load_payloads(entity, list(ids))
+            for entity, ids in upserted.items()
+        }
+
+        # id выдаются при вставке, а видны строки после коммита: без очереди
+        # транзакция с большим id могла бы закоммититься раньше, и клиент
+        # ленты, дочитавший до него, пропустил бы меньший id. Блокировка до
+        # конца транзакции делает порядок id порядком коммитов
+        if self.connection.capabilities.dialect == "postgres":
+            await self.connection.execute_query(
+                "SELECT pg_advisory_xact_lock($1)", [CHANGE_LOG_LOCK]
+            )
+        await ChangeLogEntry.bulk_create(
+            [
+                ChangeLogEntry(
+                    entity=change.entity,
+                    entity_id=change.entity_id,
+                    company_id=company_id,
+                    operation=change.operation,
+                )
+                for change in self.changes
+                for company_id in change.company_ids
+            ],
+            using_db=self.connection,
+        )
+        await OutboxEvent.bulk_create(
+            [
+                OutboxEvent(
+                    routing_key=f"reference.{change.entity}.{change.operation}",
+                    payload={
+                        "entity": change.entity,
+                        "entity_id": str(change.entity_id),
+                        "operation": change.operation,
+                        "company_ids": [
+                            str(company_id) if company_id else None
+                            for company_id in change.company_ids
+                        ],
+                        "data": payloads.get(change.entity, {}).get(change.entity_id),
+                    },
+                )
+                for change in self.changes
+            ],
+            using_db=self.connection,
+        )
+
+        # NOTIFY доставляется слушателям только после коммита транзакции
+        if self.connection.capabilities.dialect == "postgres":
+            await self.connection.execute_query(
+                "SELECT pg_notify($1, $2)",
+                [INVALIDATION_CHANNEL, encode_changes(self.changes)],
+            )
+
+
+@asynccontextmanager
+async def tracked_transaction():
+    """
+    Транзакция для записывающих ручек: изменения, отмеченные в ChangeSet,
+    попадают в change_log и outbox_events в той же транзакции, а после коммита
+    передаются зарегистрированным обработчикам.
+    """
+    async with in_transaction(PRIMARY) as connection:
+        changes = ChangeSet(connection)
+        yield changes
+        await changes.flush()
+
+    for hook in _after_commit_hooks:
+        try:
+            await hook(changes.changes)
+        except Exception as e:
+            logger.exception(f"Ошибка обработчика изменений {hook.__name__}: {e}")
+
+
+async def legal_entity_company_ids(legal_entity_id) -> List[UUID]:
+    """Компании, которым видно юрлицо (через связи компании и юрлица)."""
+    return (
+        await EntityCompanyRelation.filter(legal_entity_id=legal_entity_id)
+        .distinct()
+        .values_list("company_id", flat=True)
+    )
@@ -0,0 +1,96 @@
+from tiacore_lib.pydantic_models.entity_company_relation_models import (
+    EntityCompanyRelationSchema,
+)
+from tiacore_lib.pydantic_models.legal_entity_models import LegalEntitySchema
+
+from app.database.models import (
+    CashRegister,
+    City,
+    EntityCompanyRelation,
+    LegalEntity,
+    Warehouse,
+)
+from app.pydantic_models.cash_register_models import CashRegisterSchema
+from app.pydantic_models.city_models import CitySchema
+from app.pydantic_models.warehouse_models import WarehouseSchema
+from app.utils.change_entities import (
+    CASH_REGISTER,
+    CITY,
+    ENTITY_COMPANY_RELATION,
+    LEGAL_ENTITY,
+    WAREHOUSE,
+)
+
+
+async def _load_rows(model, schema, fields, ids):
+    rows = await model.filter(id__in=ids).values(*fields)
+    return {
+        row["id"]: schema(**row).model_dump(mode="json", by_alias=True) for row in rows
+    }
+
+
+async def _load_relations(ids):
+    rows = await EntityCompanyRelation.filter(id__in=ids).values(
+        "id",
+        "company_id",
+        "legal_entity_id",
+        "relation_type",
+        "description",
+        "created_at",
+    )
+    return {
+        row["id"]: EntityCompanyRelationSchema(
+            entity_company_relation_id=row["id"],
+            company_id=row["company_id"],
+            legal_entity_id=row["legal_entity_id"],
+            relation_type=row["relation_type"],
+            description=row["description"],
+            created_at=row["created_at"],
+        ).model_dump(mode="json", by_alias=True)
+        for row in rows
+    }
+
+
+STAFF_FIELDS = (
+    "id",
+    "name",
+    "description",
+    "created_at",
+    "created_by",
+    "modified_at",
+    "modified_by",
+    "company_id",
+)
+
+LEGAL_ENTITY_FIELDS = (
+    "id",
+    "full_name",
+    "short_name",
+    "inn",
+    "kpp",
+    "opf",
+    "vat_rate",
+    "address",
+    "entity_type_id",
+    "signer",
+    "ogrn",
+)
+
+LOADERS = {
+    WAREHOUSE: lambda ids: _load_rows(Warehouse, WarehouseSchema, STAFF_FIELDS, ids),
+    CASH_REGISTER: lambda ids: _load_rows(
+        CashRegister, CashRegisterSchema, STAFF_FIELDS, ids
+    ),
+    CITY: lambda ids: _load_rows(
+        City, CitySchema, ("id", "name", "external_id", "region", "code"), ids
+    ),
+    LEGAL_ENTITY: lambda ids: _load_rows(
+        LegalEntity, LegalEntitySchema, LEGAL_ENTITY_FIELDS, ids
+    ),
+    ENTITY_COMPANY_RELATION: _load_relations,
+}
+
+
+async def load_payloads(entity: str, ids) -> dict:
+    """Актуальные данные объектов сущности в формате ответов API: {id: dict}."""
+    return await LOADERS[entity](ids)
@@ -0,0 +1,89 @@
+import asyncio
+from typing import Dict, Iterable, Optional, Set
+from uuid import UUID
+
+from app.database.repository import fast_path_enabled, rows_by_ids, rows_by_ids_orm
+
+# Сколько ждать соседние запросы перед отправкой пачки
+BATCH_WINDOW_SECONDS = 0.002
+MAX_BATCH_SIZE = 500
+
+
+class BatchLoader:
+    """
+    Склеивает одновременные запросы деталей одной модели в один
+    SELECT ... WHERE id = ANY($1) (на других базах — id IN через ORM)
+    и раздаёт строки ожидающим обработчикам.
+    Один экземпляр на процесс; строки возвращаются в формате values().
+    """
+
+    def __init__(
+        self,
+        model,
+        fields: Iterable[str],
+        window: float = BATCH_WINDOW_SECONDS,
+        max_batch_size: int = MAX_BATCH_SIZE,
+    ):
+        self.model = model
+        self.fields = tuple(fields)
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[UUID, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Ссылки на запущенные пачки: иначе задачу может собрать GC
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load(self, object_id) -> Optional[dict]:
+        loop = asyncio.get_running_loop()
+        object_id = UUID(str(object_id))
+        future = self._pending.get(object_id)
+        if future is None:
+            future = loop.create_future()
+            self._pending[object_id] = future
+            if len(self._pending) >= self.max_batch_size:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._dispatch)
+        # Отмена одного обработчика не должна отменять запрос для остальных
+        return await asyncio.shield(future)
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.ensure_future(self._load_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _load_batch(self, batch: Dict[UUID, asyncio.Future]):
+        try:
+            rows = await self._fetch(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for object_id, future in batch.items():
+            if not future.done():
+                future.set_result(rows.get(object_id))
+
+    async def _fetch(self, ids) -> Dict[UUID, dict]:
+        if not fast_path_enabled(self.model):
+            rows = await rows_by_ids_orm(self.model, self.fields, ids)
+            return {row["id"]: row for row in rows}
+        meta = self.model._meta
+        columns = [meta.fields_db_projection[field] for field in self.fields]
+        rows = await rows_by_ids(self.model, columns, ids)
+        result = {}
+        for row in rows:
+            values = {
+                field: meta.fields_map[field].to_python_value(
+                    row[meta.fields_db_projection[field]]
+                )
+                for field in self.fields
+            }
+            result[values["id"]] = values
+        return result
@@ -1,15 +1,16 @@
 from tortoise import Tortoise
 from tortoise.transactions import in_transaction
 
+from app.database.engine import PRIMARY
 from app.database.models import LegalEntity
 
 
 async def drop_all_tables():
-    conn = Tortoise.get_connection("default")
+    conn = Tortoise.get_connection(PRIMARY)
     tables = await conn.execute_query_dict("""
         SELECT tablename FROM pg_tables WHERE schemaname = 'public';
     """)
-    async with in_transaction() as tx:
+    async with in_transaction(PRIMARY) as tx:
         for table in tables:
             await tx.execute_query(
                 f'DROP TABLE IF EXISTS "{table["tablename"]}" CASCADE;'
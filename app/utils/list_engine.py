@@ -0,0 +1,93 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Type
+
+from loguru import logger
+from tortoise.expressions import Q
+from tortoise.models import Model
+
+from app.cache.query_cache import query_cache
+
+DEFAULT_PAGE_SIZE = 10
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """Параметр фильтра из запроса и условие Tortoise, в которое он превращается."""
+
+    param: str
+    lookup: str
+
+
+@dataclass(frozen=True)
+class ListSpec:
+    """
+    Описание списка: выбираемые поля, разрешённые фильтры и сортировки.
+    Сортировки — только по полям с индексом; неизвестный sort_by, как и
+    раньше, не ошибка — список сортируется по default_sort. id добавляется
+    последним ключом, чтобы страницы не перекрывались при одинаковых значениях.
+    """
+
+    model: Type[Model]
+    fields: Tuple[str, ...]
+    sorts: Mapping[str, str]
+    default_sort: str
+    filters: Tuple[FilterSpec, ...] = ()
+    # Результаты идут через кэш запросов
+    cached: bool = False
+
+    def where(self, filters: Mapping) -> Q:
+        query = Q()
+        for spec in self.filters:
+            value = filters.get(spec.param)
+            if value:
+                query &= Q(**{spec.lookup: value})
+        return query
+
+    def ordering(self, filters: Mapping) -> List[str]:
+        sort_by = filters.get("sort_by") or self.default_sort
+        field = self.sorts.get(sort_by)
+        if field is None:
+            logger.debug(f"Неизвестный sort_by={sort_by!r}, сортировка по умолчанию")
+            field = self.sorts[self.default_sort]
+        # Всё, кроме desc, — по возрастанию, как до общего движка
+        order = str(filters.get("order") or "asc").lower()
+        prefix = "-" if order == "desc" else ""
+        ordering = [f"{prefix}{field}"]
+        if field != "id":
+            ordering.append(f"{prefix}id")
+        return ordering
+
+
+async def _run(queryset):
+    return await queryset
+
+
+async def fetch_list(
+    spec: ListSpec,
+    filters: Mapping,
+    query: Optional[Q] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> Tuple[int, List[Dict]]:
+    """
+    Общее число строк и страница списка. Оба запроса выполняются
+    одновременно на разных соединениях пула.
+    """
+    where = spec.where(filters)
+    if query is not None:
+        where &= query
+    ordering = spec.ordering(filters)
+    page = filters.get("page") or 1
+    page_size = filters.get("page_size") or DEFAULT_PAGE_SIZE
+
+    count = spec.model.filter(where).count()
+    rows = (
+        spec.model.filter(where)
+        .order_by(*ordering)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .values(*(fields or spec.fields))
+    )
+    run = query_cache.fetch if spec.cached else _run
+    total, items = await asyncio.gather(run(count), run(rows))
+    return total, items
@@ -0,0 +1,107 @@
+import asyncio
+import contextvars
+import inspect
+import json
+from functools import wraps
+from typing import Awaitable, Callable, Dict, Hashable
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from app.database.router import allow_replica_reads, note_read_company
+
+_REQUEST_PARAM = "_singleflight_request"
+
+
+class SingleFlight:
+    """Одновременные вызовы с одинаковым ключом разделяют одно вычисление."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        future = self._calls.get(key)
+        if future is None:
+            # Вычисление живёт в отдельной задаче: отмена первого запроса
+            # не должна ронять остальных ожидающих. Контекст у задачи чистый:
+            # вычисление общее и не должно нести contextvars первого запроса
+            # (id запроса, счётчики запросов к БД, span трассировки)
+            future = asyncio.get_running_loop().create_task(
+                fn(), context=contextvars.Context()
+            )
+            self._calls[key] = future
+            future.add_done_callback(lambda _: self._pop(key, future))
+        return await asyncio.shield(future)
+
+    def _pop(self, key, future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            # Ошибку уже получили ожидающие; помечаем её как прочитанную
+            future.exception()
+
+    def __len__(self):
+        return len(self._calls)
+
+
+request_flights = SingleFlight()
+
+
+def visibility_scope(context: dict) -> str:
+    """Часть ключа, от которой зависит видимость данных для пользователя."""
+    if context.get("is_superadmin"):
+        return "superadmin"
+    return f"{context.get('company')}:{context.get('company_id')}"
+
+
+def request_key(request: Request, scope: str) -> tuple:
+    query = tuple(sorted(request.query_params.multi_items()))
+    return request.method, request.url.path, query, scope
+
+
+def _serialize(result) -> bytes:
+    if isinstance(result, BaseModel):
+        return result.model_dump_json(by_alias=True).encode()
+    return json.dumps(jsonable_encoder(result), ensure_ascii=False).encode()
+
+
+def coalesce_requests(context_arg: str = "context"):
+    """
+    Декоратор GET-ручки: одинаковые одновременные запросы (путь, параметры,
+    область видимости из context_arg) выполняются один раз и получают
+    одни и те же сериализованные байты ответа.
+    """
+
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+
+        @wraps(endpoint)
+        async def wrapper(**kwargs):
+            request: Request = kwargs.pop(_REQUEST_PARAM)
+            key = request_key(request, visibility_scope(kwargs[context_arg]))
+
+            async def compute() -> bytes:
+                # Контекст чистый — чтения с реплики разрешаем заново, как
+                # ReplicaReadMiddleware для GET той же области видимости
+                allow_replica_reads()
+                note_read_company(kwargs[context_arg])
+                return _serialize(await endpoint(**kwargs))
+
+            body = await request_flights.do(key, compute)
+            return Response(content=body, media_type="application/json")
+
+        wrapper.__signature__ = signature.replace(
+            parameters=[
+                *(
+                    parameter.replace(kind=inspect.Parameter.KEYWORD_ONLY)
+                    for parameter in signature.parameters.values()
+                ),
+                inspect.Parameter(
+                    _REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request
+                ),
+            ]
+        )
+        return wrapper
+
+    return decorator
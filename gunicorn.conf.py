@@ -1,10 +1,18 @@
+import os
 from multiprocessing import cpu_count
 
+# Метрики всех воркеров в общем каталоге; задаётся до импорта приложения
+# (preload_app), иначе prometheus_client выберет однопроцессный режим
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+
+from metrics.multiprocess import archive_dead_worker, prepare_multiprocess_dir  # noqa: E402
+
 # Получаем порт из переменной окружения или 5015
 PORT = 8000
 
 bind = f"0.0.0.0:{PORT}"  # Указываем динамический порт
 worker_class = "uvicorn.workers.UvicornWorker"
+# Соединений с Postgres: workers * DB_POOL_MAX_SIZE (+1 LISTEN на процесс)
 workers = max(2, min(4, cpu_count() // 2))
 threads = 4
 
@@ -22,3 +30,12 @@ max_requests_jitter = 50
 
 preload_app = True
 lifespan = "on"
+
+
+def on_starting(server):
+    prepare_multiprocess_dir(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+
+def child_exit(server, worker):
+    # Воркеры перезапускаются каждые max_requests: счётчики уходят в архив
+    archive_dead_worker(worker.pid)
@@ -1,19 +1,24 @@
 from prometheus_client import Counter
 
+from metrics.bounded import BoundedMetric
+
+# chat_id/schedule_id растут вместе с числом клиентов — ряды ограничены
+ANALYSIS_MAX_SERIES = 1000
+
 
 class AnalysisMetrics:
     def __init__(self):
-        self.success_counter = Counter(
+        self.success_counter = BoundedMetric(Counter(
             "analysis_success_total",
             "Успешные запуски анализа",
             ["chat_id", "schedule_id"]
-        )
+        ), ANALYSIS_MAX_SERIES)
 
-        self.failed_counter = Counter(
+        self.failed_counter = BoundedMetric(Counter(
             "analysis_failed_total",
             "Проваленные запуски анализа",
             ["chat_id", "schedule_id"]
-        )
+        ), ANALYSIS_MAX_SERIES)
 
     def inc_success(self, chat_id: str, schedule_id: str):
         self.success_counter.labels(
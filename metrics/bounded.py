@@ -0,0 +1,65 @@
+import threading
+from typing import Set, Tuple
+
+from prometheus_client import Counter, Gauge
+
+# Значение всех меток ряда, в который сводятся значения сверх лимита
+OVERFLOW = "__overflow__"
+DEFAULT_MAX_SERIES = 1000
+
+metric_series = Gauge(
+    "reference_metric_series",
+    "Ряды меток метрик с ограниченной кардинальностью",
+    ["metric"],
+    multiprocess_mode="livemax",
+)
+metric_series_overflow = Counter(
+    "reference_metric_series_overflow_total",
+    "Обращения к метрикам, сведённые в ряд __overflow__ из-за лимита",
+    ["metric"],
+)
+
+
+class BoundedMetric:
+    """
+    Метрика prometheus_client с лимитом числа рядов меток. Новые сочетания
+    сверх max_series пишутся в общий ряд __overflow__: метки вроде user_id
+    не раздувают память процесса и число рядов в Prometheus. Лимит —
+    на процесс; под gunicorn рядов не больше workers * max_series.
+    """
+
+    def __init__(self, metric, max_series: int = DEFAULT_MAX_SERIES):
+        self._metric = metric
+        self.name = metric._name
+        self.max_series = max_series
+        self._series: Set[Tuple[str, ...]] = set()
+        self._overflowed = False
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **labels):
+        if labels:
+            values = tuple(str(labels[name]) for name in self._metric._labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+
+        if values not in self._series:
+            with self._lock:
+                if values not in self._series:
+                    if len(self._series) >= self.max_series:
+                        return self._overflow(len(values))
+                    self._series.add(values)
+                    self._observe()
+        return self._metric.labels(*values)
+
+    def _overflow(self, width: int):
+        metric_series_overflow.labels(self.name).inc()
+        if not self._overflowed:
+            self._overflowed = True
+            self._observe()
+        return self._metric.labels(*((OVERFLOW,) * width))
+
+    def _observe(self):
+        metric_series.labels(self.name).set(len(self._series) + self._overflowed)
+
+    def __getattr__(self, name):
+        return getattr(self._metric, name)
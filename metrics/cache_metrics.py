@@ -0,0 +1,28 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Пространства имён кэшей задаются в коде, поэтому число меток ограничено
+cache_requests = Counter(
+    "reference_cache_requests_total",
+    "Обращения к кэшу по уровням",
+    ["namespace", "tier", "result"],
+)
+cache_evictions = Counter(
+    "reference_cache_evictions_total",
+    "Вытеснения из локального кэша по размеру",
+    ["namespace"],
+)
+cache_latency = Histogram(
+    "reference_cache_operation_seconds",
+    "Длительность операций с кэшем",
+    ["namespace", "tier", "operation"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+redis_circuit_open = Gauge(
+    "reference_redis_circuit_open",
+    "Разомкнут ли предохранитель Redis (1 — обращения к Redis не выполняются)",
+    multiprocess_mode="livemax",
+)
+redis_circuit_rejections = Counter(
+    "reference_redis_circuit_rejections_total",
+    "Обращения к Redis, отклонённые разомкнутым предохранителем",
+)
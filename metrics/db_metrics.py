@@ -0,0 +1,83 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+from metrics.bounded import BoundedMetric
+
+# Метка connection — имя подключения Tortoise ("default"), их единицы.
+# Под gunicorn gauge пулов суммируются по живым воркерам (livesum)
+db_pool_size = Gauge(
+    "reference_db_pool_size",
+    "Открытые соединения пула asyncpg",
+    ["connection"],
+    multiprocess_mode="livesum",
+)
+db_pool_max_size = Gauge(
+    "reference_db_pool_max_size",
+    "Максимальный размер пула asyncpg",
+    ["connection"],
+    multiprocess_mode="livesum",
+)
+db_pool_in_use = Gauge(
+    "reference_db_pool_in_use",
+    "Соединения пула, выданные запросам",
+    ["connection"],
+    multiprocess_mode="livesum",
+)
+db_pool_acquire_seconds = Histogram(
+    "reference_db_pool_acquire_seconds",
+    "Ожидание свободного соединения пула",
+    ["connection"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+db_pool_acquire_timeouts = Counter(
+    "reference_db_pool_acquire_timeouts_total",
+    "Запросы, не дождавшиеся соединения пула",
+    ["connection"],
+)
+
+db_replica_lag = Gauge(
+    "reference_db_replica_lag_seconds",
+    "Отставание реплики от основной базы",
+    multiprocess_mode="livemax",
+)
+db_replica_reads = Counter(
+    "reference_db_replica_reads_total",
+    "Чтения ORM по выбранному подключению (default или replica)",
+    ["connection"],
+)
+
+# fingerprint — "SELECT таблица хэш" нормализованного запроса (значения
+# параметров в метку не попадают); route — шаблон маршрута или "background".
+# Сочетаний фильтров списков много, поэтому число рядов ограничено
+DB_QUERY_MAX_SERIES = 2000
+DB_QUERY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+)
+db_query_duration = BoundedMetric(
+    Histogram(
+        "reference_db_query_duration_seconds",
+        "Время выполнения запроса к БД",
+        ["fingerprint", "route"],
+        buckets=DB_QUERY_BUCKETS,
+    ),
+    DB_QUERY_MAX_SERIES,
+)
+db_query_rows = BoundedMetric(
+    Histogram(
+        "reference_db_query_rows",
+        "Строк, возвращённых запросом к БД",
+        ["fingerprint", "route"],
+        buckets=(0, 1, 5, 10, 50, 100, 500, 1_000, 5_000),
+    ),
+    DB_QUERY_MAX_SERIES,
+)
@@ -0,0 +1,79 @@
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Метки — шаблон маршрута ("/api/warehouses/{warehouse_id}"), метод и класс
+# статуса: число рядов ограничено числом эндпоинтов, а не числом id
+UNMATCHED_ROUTE = "unmatched"
+
+http_requests = Counter(
+    "reference_http_requests_total",
+    "HTTP-запросы по маршрутам",
+    ["route", "method", "status"],
+)
+http_request_duration = Histogram(
+    "reference_http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["route", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10),
+)
+http_response_size = Histogram(
+    "reference_http_response_size_bytes",
+    "Размер тела ответа",
+    ["route", "method"],
+    buckets=(100, 500, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000),
+)
+http_requests_in_flight = Gauge(
+    "reference_http_requests_in_flight",
+    "HTTP-запросы в обработке",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+
+def route_template(scope) -> str:
+    """Шаблон пути найденного маршрута; FastAPI кладёт маршрут в scope."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class HttpMetricsMiddleware:
+    """
+    ASGI-middleware с метриками запросов: длительность, количество, размер
+    ответа и запросы в обработке. Без BaseHTTPMiddleware — тело ответа
+    не буферизуется и не появляется лишняя задача на запрос.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_flight = http_requests_in_flight.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            route = route_template(scope)
+            status_class = f"{status // 100}xx"
+            http_requests.labels(route, method, status_class).inc()
+            http_request_duration.labels(route, method, status_class).observe(elapsed)
+            http_response_size.labels(route, method).observe(size)
@@ -1,24 +1,229 @@
+import glob
+import json
 import logging
+import os
+import random
 import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
 
 from loguru import logger
 from prometheus_client import Counter
 
+from metrics.bounded import BoundedMetric
+
 # 📊 Prometheus метрики
 error_counter = Counter("fastapi_errors_total", "Total number of FastAPI errors")
-error_counter_by_user = Counter(
-    "fastapi_errors_total_by_user",
-    "Total number of errors per user",
-    ["user_id", "login", "role"],
+error_counter_by_user = BoundedMetric(
+    Counter(
+        "fastapi_errors_total_by_user",
+        "Total number of errors per user",
+        ["user_id", "login", "role"],
+    ),
+    max_series=500,
+)
+log_records_dropped = Counter(
+    "reference_log_records_dropped_total",
+    "Записи лога, вытесненные из переполненного буфера приёмника",
+)
+
+LOG_FILE = "logs/app.log"
+LOG_ROTATION_BYTES = 10 * 1024 * 1024
+LOG_RETENTION_SECONDS = 7 * 24 * 3600
+LOG_FLUSH_INTERVAL = 0.5
+LOG_BATCH_SIZE = 500
+LOG_BUFFER_SIZE = 10_000
+
+# Трейсбек loguru добавляет к строковому формату сам
+TEXT_FORMAT = (
+    "{time:YYYY-MM-DDTHH:mm:ss.SSSZ} | {level: <8} | {name}:{function}:{line} - "
+    "{message}"
 )
 
+ACCESS_LOGGERS = {"uvicorn.access", "gunicorn.access"}
+SUCCESS_LEVEL = logger.level("SUCCESS").no
+
+
+class BatchedSink:
+    """
+    Единственный приёмник логов. Записи копятся в буфере и пишутся пачками
+    из фонового потока — вызывающий код не ждёт ввода-вывода. Пачка
+    форматируется один раз и уходит в stdout и/или файл. В режиме JSON
+    сериализация тоже выполняется в этом потоке. При переполнении буфера
+    старые записи вытесняются (reference_log_records_dropped_total).
+
+    Файл ротируется по размеру переименованием; остальные воркеры замечают
+    смену inode и открывают новый файл.
+
+    Поток запускается при первой записи в процессе: с preload_app логгер
+    настраивается в мастере gunicorn, а потоки в воркеры при fork не
+    переходят — каждый воркер запускает свой.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        serialize: bool = False,
+        stdout: bool = False,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        batch_size: int = LOG_BATCH_SIZE,
+        buffer_size: int = LOG_BUFFER_SIZE,
+        rotation_bytes: int = LOG_ROTATION_BYTES,
+        retention_seconds: float = LOG_RETENTION_SECONDS,
+    ):
+        self.path = path
+        self.serialize = serialize
+        # Без файла пишем только в stdout
+        self.stdout = stdout or path is None
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.rotation_bytes = rotation_bytes
+        self.retention_seconds = retention_seconds
+        self._buffer = deque(maxlen=buffer_size)
+        self._wake = threading.Event()
+        self._stopped = False
+        self._file = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def write(self, message):
+        if self._pid != os.getpid():
+            self._start()
+        buffer = self._buffer
+        if len(buffer) == buffer.maxlen:
+            log_records_dropped.inc()
+        buffer.append(message.record if self.serialize else str(message))
+        if len(buffer) >= self.batch_size:
+            self._wake.set()
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Дочерний процесс после fork: унаследованные записи допишет
+                # родитель, файл открываем свой, Event — заново (его внутренняя
+                # блокировка могла быть скопирована занятой)
+                self._buffer.clear()
+                self._file = None
+                self._wake = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, name="log-sink", daemon=True
+            )
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        """Вызывается loguru при logger.remove() и при выходе из процесса."""
+        self._stopped = True
+        self._wake.set()
+        if self._pid == os.getpid():
+            self._thread.join(timeout=5)
+            self._drain()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+
+    def _drain(self):
+        lines = []
+        buffer = self._buffer
+        while buffer:
+            item = buffer.popleft()
+            lines.append(render_json(item) if self.serialize else item)
+        if not lines:
+            return
+        try:
+            self._write("".join(lines))
+        except Exception as e:
+            print(f"[BatchedSink] Ошибка записи лога: {e}", file=sys.stderr)
+
+    def _write(self, chunk: str):
+        if self.stdout:
+            sys.stdout.write(chunk)
+            sys.stdout.flush()
+        if self.path is None:
+            return
+        self._ensure_file()
+        self._file.write(chunk)
+        self._file.flush()
+
+    def _ensure_file(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+        if stat is not None and stat.st_size >= self.rotation_bytes:
+            self._rotate()
+            stat = None
+        if (
+            self._file is None
+            or stat is None
+            or stat.st_ino != os.fstat(self._file.fileno()).st_ino
+        ):
+            if self._file is not None:
+                self._file.close()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def _rotate(self):
+        suffix = f"{time.strftime('%Y%m%d%H%M%S')}.{os.getpid()}"
+        try:
+            os.rename(self.path, f"{self.path}.{suffix}")
+        except FileNotFoundError:
+            pass  # уже переименовал другой воркер
+        cutoff = time.time() - self.retention_seconds
+        for rotated in glob.glob(f"{self.path}.*"):
+            try:
+                if os.path.getmtime(rotated) < cutoff:
+                    os.remove(rotated)
+            except FileNotFoundError:
+                pass
+
+
+def render_json(record) -> str:
+    data = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    if record["extra"]:
+        data["extra"] = record["extra"]
+    if record["exception"] is not None:
+        data["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    return json.dumps(data, ensure_ascii=False, default=str) + "\n"
+
+
+def _json_format(record) -> str:
+    # Текст не нужен: JSON собирает приёмник из record в своём потоке
+    return ""
+
+
+class Sampler:
+    """Фильтр: доля SUCCESS- и access-логов, остальные уровни — все."""
+
+    def __init__(self, success_rate: float = 1.0, access_rate: float = 1.0):
+        self.success_rate = success_rate
+        self.access_rate = access_rate
 
-def exclude_metrics_log(record):
-    # Исключаем только access-логи /metrics
-    message = record.get("message", "")
-    if "GET /metrics" in message and "200" in message:
-        return False
-    return True
+    def __call__(self, record) -> bool:
+        if record["extra"].get("access"):
+            return self.access_rate >= 1 or random.random() < self.access_rate
+        if record["level"].no == SUCCESS_LEVEL:
+            return self.success_rate >= 1 or random.random() < self.success_rate
+        return True
 
 
 # 📈 Прометеевский хук — реагирует на ERROR и выше
@@ -36,6 +241,19 @@ def prometheus_hook(message):
             print(f"[PrometheusHook] Ошибка при инкременте метрик: {e}")
 
 
+def _stdlib_origin(record):
+    # Место вызова берётся из записи logging, без обхода стека
+    origin = record["extra"].pop("_stdlib", None)
+    if origin is not None:
+        record["name"] = origin.name
+        record["function"] = origin.funcName
+        record["line"] = origin.lineno
+
+
+_stdlib_logger = logger.patch(_stdlib_origin)
+_LOGURU_LEVELS = {"CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"}
+
+
 # 🔁 Перехват логов из logging в loguru
 class InterceptHandler(logging.Handler):
     def emit(self, record):
@@ -45,51 +263,50 @@ class InterceptHandler(logging.Handler):
         if "GET /metrics" in message and ("200" in message or "307" in message):
             return
 
-        try:
-            level = logger.level(record.levelname).name
-        except Exception:
+        level = record.levelname
+        if level not in _LOGURU_LEVELS:
             level = record.levelno
 
-        frame, depth = logging.currentframe(), 2
-        while frame and frame.f_code.co_filename == logging.__file__:
-            frame = frame.f_back
-            depth += 1
-
-        logger.opt(depth=depth, exception=record.exc_info).log(level, message)
+        bound = _stdlib_logger.bind(_stdlib=record)
+        if record.name in ACCESS_LOGGERS:
+            bound = bound.bind(access=True)
+        bound.opt(exception=record.exc_info).log(level, message)
 
 
 # 🛠 Настройка логгера
-def setup_logger():
-    logger.remove()
+def setup_logger(settings=None):
+    """
+    Режим задаётся настройками окружения: уровень, JSON, доли SUCCESS-
+    и access-логов, файл для promtail. stdout пишется всегда — его читают
+    docker logs и сборщики контейнеров. Без настроек — как в разработке.
+    """
+    level = getattr(settings, "LOG_LEVEL", "DEBUG")
+    debug = logger.level(level).no <= logging.DEBUG
+    serialize = getattr(settings, "LOG_JSON", False)
+    path = getattr(settings, "LOG_FILE", LOG_FILE) or None
 
-    # 🎯 STDOUT для Loki (можно включить serialize=True)
-    logger.add(
-        sys.stdout,
-        level="DEBUG",
-        format="""{time:YYYY-MM-DDTHH:mm:ss.SSSZ} | {level} 
-        | {name}:{function}:{line} - {message}""",
-        enqueue=True,
-        backtrace=True,
-        diagnose=True,
-        filter=exclude_metrics_log,
-    )
+    logger.remove()
 
-    # 🧾 Файл логов
+    # 🎯 Единственный приёмник: stdout и, если задан, файл для promtail/Loki
     logger.add(
-        "logs/app.log",
-        level="DEBUG",
-        rotation="10 MB",
-        retention="7 days",
-        format="""{time:YYYY-MM-DD HH:mm:ss} | {level:<8}
-          | {name}:{function}:{line} - {message}""",
-        enqueue=True,
+        BatchedSink(path, serialize=serialize, stdout=True),
+        level=level,
+        format=_json_format if serialize else TEXT_FORMAT,
+        backtrace=debug,
+        # Значения переменных в трейсбеке — только в разработке: дорого
+        diagnose=debug,
+        filter=Sampler(
+            success_rate=getattr(settings, "LOG_SUCCESS_SAMPLE_RATE", 1.0),
+            access_rate=getattr(settings, "LOG_ACCESS_SAMPLE_RATE", 1.0),
+        ),
     )
 
     # 📡 Интеграция Prometheus hook
-    logger.add(prometheus_hook, level="ERROR")
+    logger.add(prometheus_hook, level="ERROR", format="{message}")
 
     # 🔗 Перехват логов
-    logging.basicConfig(handlers=[InterceptHandler()], level=logging.INFO, force=True)
+    stdlib_level = max(logging.INFO, logger.level(level).no)
+    logging.basicConfig(handlers=[InterceptHandler()], level=stdlib_level, force=True)
 
     for name in (
         "uvicorn",
@@ -101,4 +318,6 @@ def setup_logger():
         "gunicorn.error",
     ):
         logging.getLogger(name).handlers = [InterceptHandler()]
-        logging.getLogger(name).setLevel(logging.INFO)
+        logging.getLogger(name).setLevel(stdlib_level)
+        # Иначе запись уходит ещё и в обработчики родителя и root — дубли
+        logging.getLogger(name).propagate = False
@@ -0,0 +1,63 @@
+import glob
+import os
+from typing import Optional
+
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+from prometheus_client.mmap_dict import MmapedDict
+
+# Под gunicorn каждый воркер пишет значения метрик в свои mmap-файлы
+# в этом каталоге, а /metrics собирает их со всех воркеров
+MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# Суффикс файлов, куда переносятся счётчики завершившихся воркеров
+ARCHIVE = "archive"
+ARCHIVED_TYPES = ("counter", "histogram", "summary")
+
+
+def multiprocess_dir() -> Optional[str]:
+    return os.environ.get(MULTIPROC_ENV)
+
+
+def metrics_registry():
+    """Реестр для /metrics: сумма по всем воркерам или метрики процесса."""
+    if not multiprocess_dir():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def prepare_multiprocess_dir(path: str):
+    """Очищает каталог при старте мастера: файлы прошлого запуска не нужны."""
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+
+
+def archive_dead_worker(pid: int, path: Optional[str] = None):
+    """
+    Переносит счётчики и гистограммы завершившегося воркера в архивные
+    файлы и удаляет его файлы. Итоги по сервису остаются монотонными
+    при перезапуске воркеров (max_requests), а число файлов — ограниченным.
+    """
+    path = path or multiprocess_dir()
+    if not path:
+        return
+
+    for typ in ARCHIVED_TYPES:
+        dead = os.path.join(path, f"{typ}_{pid}.db")
+        if not os.path.exists(dead):
+            continue
+        archive = MmapedDict(os.path.join(path, f"{typ}_{ARCHIVE}.db"))
+        try:
+            for key, value, timestamp, _ in MmapedDict.read_all_values_from_file(dead):
+                current, _ = archive.read_value(key)
+                archive.write_value(key, current + value, timestamp)
+        finally:
+            archive.close()
+        os.remove(dead)
+
+    # Значения gauge умершего процесса больше ничего не значат
+    multiprocess.mark_process_dead(pid, path)
+    for gauge in glob.glob(os.path.join(path, f"gauge_*_{pid}.db")):
+        os.remove(gauge)
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sys
+import threading
+from collections import Counter
+from functools import lru_cache
+
+SAMPLE_INTERVAL_SECONDS = 0.005
+MAX_PROFILE_SECONDS = 60
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# Один профиль на воркер: второй параллельный запрос получает отказ
+_running = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """В этом воркере профиль уже снимается."""
+
+
+@lru_cache(maxsize=4096)
+def _frame_name(code) -> str:
+    path = code.co_filename
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and path.startswith(prefix + os.sep):
+            path = path[len(prefix) + 1 :]
+            break
+    return f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Статистический профилировщик: отдельный поток с заданным интервалом
+    снимает стеки всех потоков процесса через sys._current_frames().
+    Код приложения не инструментируется; вне профилирования поток не
+    существует и ничего не стоит. В асинхронном коде виден стек того, что
+    сейчас занимает цикл событий — как раз то, что держит CPU.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Формат flamegraph.pl / speedscope: "корень;...;лист число"."""
+        return "".join(
+            f"{';'.join(stack)} {count}\n"
+            for stack, count in sorted(self.stacks.items())
+        )
+
+    def speedscope(self, name: str) -> dict:
+        frames = {}
+        samples = []
+        weights = []
+        for stack, count in self.stacks.items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(count * self.interval)
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "reference-fastapi",
+            "shared": {"frames": [{"name": frame} for frame in frames]},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+
+async def profile(
+    seconds: float, interval: float = SAMPLE_INTERVAL_SECONDS
+) -> SamplingProfiler:
+    """Снимает профиль текущего воркера за seconds секунд."""
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusyError("Профилирование уже выполняется в этом воркере")
+    try:
+        profiler = SamplingProfiler(interval)
+        profiler.start()
+        try:
+            await asyncio.sleep(min(seconds, MAX_PROFILE_SECONDS))
+        finally:
+            profiler.stop()
+        return profiler
+    finally:
+        _running.release()
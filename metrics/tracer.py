@@ -1,30 +1,187 @@
 import platform
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
 
 from opentelemetry import trace
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+)
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_ON,
+    ParentBased,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import SpanKind, Status, StatusCode
 
+SERVICE_NAME = "reference-fastapi"
+MAX_PENDING_TRACES = 1000
+_TRACE_ID_MASK = (1 << 64) - 1
+
+# Задаётся init_tracer; без него span не создаются и хелперы ничего не стоят
+_tracer: Optional[trace.Tracer] = None
+
+
+class TailSamplingProcessor(SpanProcessor):
+    """
+    Хвостовое сэмплирование в процессе: span копятся по trace_id до конца
+    локального корня, затем трасса экспортируется целиком, если попала
+    в долю head_rate, была медленнее slow_seconds или содержит ошибку.
+    Незавершённых трасс хранится не больше MAX_PENDING_TRACES.
+    """
+
+    def __init__(
+        self,
+        processor: SpanProcessor,
+        head_rate: float,
+        slow_seconds: float,
+        max_pending: int = MAX_PENDING_TRACES,
+    ):
+        self._processor = processor
+        self._bound = round(max(0.0, min(1.0, head_rate)) * (_TRACE_ID_MASK + 1))
+        self._slow_ns = int(slow_seconds * 1e9)
+        self._max_pending = max_pending
+        self._pending: "OrderedDict[int, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None):
+        pass
+
+    def on_end(self, span: ReadableSpan):
+        trace_id = span.context.trace_id
+        if span.parent is not None and not span.parent.is_remote:
+            with self._lock:
+                spans = self._pending.get(trace_id)
+                if spans is None:
+                    spans = self._pending[trace_id] = []
+                    if len(self._pending) > self._max_pending:
+                        self._pending.popitem(last=False)
+                spans.append(span)
+            return
+
+        with self._lock:
+            spans = self._pending.pop(trace_id, [])
+        spans.append(span)
+        if self._keep(span, spans):
+            for finished in spans:
+                self._processor.on_end(finished)
+
+    def _keep(self, root: ReadableSpan, spans: list) -> bool:
+        # Та же доля, что у TraceIdRatioBased: решение стабильно для trace_id
+        if root.context.trace_id & _TRACE_ID_MASK < self._bound:
+            return True
+        if root.end_time - root.start_time >= self._slow_ns:
+            return True
+        return any(s.status.status_code is StatusCode.ERROR for s in spans)
+
+    def shutdown(self):
+        self._processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._processor.force_flush(timeout_millis)
+
+
+class _JsonLinesFile:
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, data: str):
+        self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+
+def create_exporter(settings) -> SpanExporter:
+    """otlp — Jaeger/коллектор; console и file — для локальной проверки."""
+    kind = settings.TRACING_EXPORTER
+    if kind == "otlp":
+        return OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+    if kind == "console":
+        return ConsoleSpanExporter()
+    if kind == "file":
+        return ConsoleSpanExporter(
+            out=_JsonLinesFile(settings.TRACING_FILE),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    raise ValueError(f"❌ Unknown TRACING_EXPORTER: {kind}")
+
+
+def init_tracer(app, settings, environment: str = "dev"):
+    """
+    Трассировка по настройкам окружения. С хвостовым сэмплированием
+    записываются все запросы, а экспортируются доля TRACING_SAMPLE_RATE,
+    медленные и ошибочные; без него — только доля (head sampling).
+    """
+    global _tracer
+    if not settings.TRACING_ENABLED:
+        return
 
-def init_tracer(app):
     resource = Resource(
         attributes={
-            "service.name": "reference-fastapi",
+            "service.name": SERVICE_NAME,
             "host.name": platform.node(),
-            "deployment.environment": "dev",
+            "deployment.environment": environment,
         }
     )
+    exporter = BatchSpanProcessor(create_exporter(settings))
+    if settings.TRACING_TAIL_SAMPLING:
+        sampler = ALWAYS_ON
+        processor = TailSamplingProcessor(
+            exporter,
+            head_rate=settings.TRACING_SAMPLE_RATE,
+            slow_seconds=settings.TRACING_SLOW_SECONDS,
+        )
+    else:
+        sampler = ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATE))
+        processor = exporter
 
-    tracer_provider = TracerProvider(resource=resource)
+    tracer_provider = TracerProvider(resource=resource, sampler=sampler)
+    tracer_provider.add_span_processor(processor)
     trace.set_tracer_provider(tracer_provider)
+    _tracer = tracer_provider.get_tracer(__name__)
 
-    span_processor = BatchSpanProcessor(
-        OTLPSpanExporter(
-            endpoint="http://jaeger:4318/v1/traces"  # 👈 это всё
-        )
+    FastAPIInstrumentor.instrument_app(
+        app,
+        tracer_provider=tracer_provider,
+        excluded_urls="metrics",
+        # span на каждый кусок тела ответа — заметная доля накладных расходов
+        exclude_spans=["receive", "send"],
     )
-    tracer_provider.add_span_processor(span_processor)
 
-    FastAPIInstrumentor.instrument_app(app)
+
+@contextmanager
+def traced(name: str, kind: SpanKind = SpanKind.INTERNAL, **attributes):
+    """Span вокруг блока; без трассировки — пустой контекст."""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, kind=kind, attributes=attributes) as span:
+        yield span
+
+
+def record_span(name: str, elapsed: float, attributes: dict, error=None):
+    """
+    Завершённый дочерний span по уже измеренной длительности (запросы к БД,
+    команды Redis). Создаётся, только если текущая трасса записывается.
+    """
+    if _tracer is None or not trace.get_current_span().is_recording():
+        return
+    end = time.time_ns()
+    span = _tracer.start_span(
+        name,
+        kind=SpanKind.CLIENT,
+        attributes=attributes,
+        start_time=end - int(elapsed * 1e9),
+    )
+    if error is not None:
+        span.set_status(Status(StatusCode.ERROR, str(error)))
+    span.end(end_time=end)
@@ -0,0 +1,19 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "change_log" (
+    "id" BIGSERIAL NOT NULL PRIMARY KEY,
+    "entity" VARCHAR(50) NOT NULL,
+    "entity_id" UUID NOT NULL,
+    "company_id" UUID,
+    "operation" VARCHAR(10) NOT NULL,
+    "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+        CREATE INDEX IF NOT EXISTS "idx_change_log_company_d0b9f1" ON "change_log" ("company_id", "id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "change_log";"""
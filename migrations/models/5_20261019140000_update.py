@@ -0,0 +1,19 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "outbox_events" (
+    "id" BIGSERIAL NOT NULL PRIMARY KEY,
+    "routing_key" VARCHAR(100) NOT NULL,
+    "payload" JSONB NOT NULL,
+    "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "published_at" TIMESTAMPTZ
+);
+        CREATE INDEX IF NOT EXISTS "idx_outbox_events_unpublished" ON "outbox_events" ("id")
+            WHERE "published_at" IS NULL;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "outbox_events";"""
@@ -0,0 +1,27 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_legal_entit_short_n_33cf78" ON "legal_entities" ("short_name", "id");
+        CREATE INDEX IF NOT EXISTS "idx_entity_comp_company_a59f6f" ON "entity_company_relations" ("company_id", "created_at", "id");
+        CREATE INDEX IF NOT EXISTS "idx_entity_comp_legal_e_cf5d28" ON "entity_company_relations" ("legal_entity_id", "company_id");
+        CREATE INDEX IF NOT EXISTS "idx_warehouses_company_9a837c" ON "warehouses" ("company_id", "name", "id");
+        CREATE INDEX IF NOT EXISTS "idx_warehouses_company_45301a" ON "warehouses" ("company_id", "created_at", "id");
+        CREATE INDEX IF NOT EXISTS "idx_cash_regist_company_b08ccd" ON "cash_registers" ("company_id", "name", "id");
+        CREATE INDEX IF NOT EXISTS "idx_cash_regist_company_4e6e87" ON "cash_registers" ("company_id", "created_at", "id");
+        CREATE INDEX IF NOT EXISTS "idx_cities_name_09132a" ON "cities" ("name", "id");
+        CREATE INDEX IF NOT EXISTS "idx_cities_region_9c68fa" ON "cities" ("region", "id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_legal_entit_short_n_33cf78";
+        DROP INDEX IF EXISTS "idx_entity_comp_company_a59f6f";
+        DROP INDEX IF EXISTS "idx_entity_comp_legal_e_cf5d28";
+        DROP INDEX IF EXISTS "idx_warehouses_company_9a837c";
+        DROP INDEX IF EXISTS "idx_warehouses_company_45301a";
+        DROP INDEX IF EXISTS "idx_cash_regist_company_b08ccd";
+        DROP INDEX IF EXISTS "idx_cash_regist_company_4e6e87";
+        DROP INDEX IF EXISTS "idx_cities_name_09132a";
+        DROP INDEX IF EXISTS "idx_cities_region_9c68fa";"""
@@ -4,7 +4,6 @@ from dotenv import load_dotenv
 from tiacore_lib.config import ConfigName
 
 from app import create_app
-from metrics.logger import setup_logger
 
 load_dotenv()
 
@@ -14,8 +13,6 @@ PORT = 8000
 
 CONFIG_NAME = ConfigName(os.getenv("CONFIG_NAME", "Development"))
 
-setup_logger()
-
 
 app = create_app(config_name=CONFIG_NAME)
 
@@ -0,0 +1,82 @@
+"""
+Сравнение прямых запросов asyncpg с теми же чтениями через Tortoise.
+
+Запуск на заполненной базе (берёт настройки как приложение):
+    CONFIG_NAME=Development python -m scripts.benchmark_fast_path --iterations 2000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from tortoise import Tortoise
+
+from app.database.config import TORTOISE_ORM
+from app.database.models import EntityCompanyRelation, LegalEntity
+from app.database.repository import (
+    company_relations,
+    company_relations_orm,
+    fast_path_enabled,
+    find_legal_entity_by_inn_kpp,
+    find_legal_entity_by_inn_kpp_orm,
+)
+
+
+async def measure(name: str, call, iterations: int):
+    await call()  # прогрев: пул соединений и подготовка выражения
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    timings.sort()
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(
+        f"{name:<32} median {statistics.median(timings):8.1f} мкс   p99 {p99:8.1f} мкс"
+    )
+
+
+async def main(iterations: int):
+    await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        if not fast_path_enabled(LegalEntity):
+            print("Быстрый путь работает только на Postgres")
+            return
+
+        entity = await LegalEntity.first().values("inn", "kpp")
+        relation = await EntityCompanyRelation.first().values("company_id")
+        if not entity or not relation:
+            print("Нужны хотя бы одно юрлицо и одна связь с компанией")
+            return
+
+        inn, kpp = entity["inn"], entity["kpp"]
+        company_id = relation["company_id"]
+        await measure(
+            "inn-kpp: ORM",
+            lambda: find_legal_entity_by_inn_kpp_orm(inn, kpp),
+            iterations,
+        )
+        await measure(
+            "inn-kpp: asyncpg",
+            lambda: find_legal_entity_by_inn_kpp(inn, kpp),
+            iterations,
+        )
+        await measure(
+            "связи компании: ORM",
+            lambda: company_relations_orm(company_id),
+            iterations,
+        )
+        await measure(
+            "связи компании: asyncpg",
+            lambda: company_relations(company_id),
+            iterations,
+        )
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=1000)
+    asyncio.run(main(parser.parse_args().iterations))
@@ -9,7 +9,13 @@ from tiacore_lib.handlers.cache_handler import save_user_to_cache
 from tortoise import Tortoise
 
 from app import create_app
+from app.cache.auth_context import auth_context_cache
+from app.cache.membership import membership_index
+from app.cache.query_cache import query_cache
+from app.cache.reference_bundle import reference_bundle_cache
+from app.cache.two_tier import clear_local_caches as clear_two_tier_caches
 from app.config import ConfigName, _load_settings
+from app.database.engine import tortoise_config
 from app.utils.db_helpers import drop_all_tables
 
 
@@ -30,17 +36,7 @@ async def test_app():
 @pytest.fixture(scope="function", autouse=True)
 @pytest.mark.asyncio
 async def setup_and_clean_db(test_settings):
-    await Tortoise.init(
-        config={
-            "connections": {"default": test_settings.db_url},
-            "apps": {
-                "models": {
-                    "models": ["app.database.models"],
-                    "default_connection": "default",
-                },
-            },
-        }
-    )
+    await Tortoise.init(config=tortoise_config(test_settings, ["app.database.models"]))
 
     await Tortoise.generate_schemas()
 
@@ -49,7 +45,27 @@ async def setup_and_clean_db(test_settings):
     await Tortoise.close_connections()
 
 
-pytest_plugins = ["tests.fixtures.legal_entity", "tests.fixtures.main_fixture"]
+@pytest.fixture(scope="function", autouse=True)
+def clear_local_caches():
+    auth_context_cache.clear()
+    membership_index.clear()
+    reference_bundle_cache.clear()
+    clear_two_tier_caches()
+    query_cache.reset()
+    yield
+    auth_context_cache.clear()
+    membership_index.clear()
+    reference_bundle_cache.clear()
+    clear_two_tier_caches()
+    query_cache.reset()
+
+
+pytest_plugins = [
+    "tests.fixtures.legal_entity",
+    "tests.fixtures.main_fixture",
+    "tests.fixtures.broker",
+    "tests.fixtures.redis",
+]
 
 
 @pytest.fixture(scope="function")
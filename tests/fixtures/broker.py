@@ -0,0 +1,22 @@
+import pytest
+
+
+class InMemoryBroker:
+    """Локальная замена RabbitBroker: складывает сообщения в список."""
+
+    def __init__(self):
+        self.messages = []
+        self.fail = False
+
+    async def publish_batch(self, messages):
+        if self.fail:
+            raise ConnectionError("broker unavailable")
+        self.messages.extend(messages)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture(scope="function")
+def in_memory_broker():
+    return InMemoryBroker()
@@ -0,0 +1,36 @@
+import pytest
+
+from app.cache.redis_client import set_redis
+
+
+class FakeRedis:
+    """Минимальная замена redis.asyncio.Redis для тестов кэшей."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    async def incr(self, key):
+        value = int(self.data.get(key, 0)) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+
+@pytest.fixture(scope="function")
+def fake_redis():
+    redis = FakeRedis()
+    set_redis(redis)
+    yield redis
+    set_redis(None)
@@ -0,0 +1,141 @@
+import time
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+from loguru import logger
+from starlette.requests import Request
+
+from app.cache.auth_context import auth_context_cache
+from app.dependencies.auth import cached_auth_dependency
+from app.handlers.user_events import handle_user_event_with_cache
+
+
+def make_request(token: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+        }
+    )
+
+
+def make_token(expires_in: int = 600) -> str:
+    return jwt.encode({"sub": "user", "exp": int(time.time()) + expires_in}, "key")
+
+
+class CountingDependency:
+    def __init__(self, context=None, error=None):
+        self.calls = 0
+        self.context = context or {"user_id": str(uuid4()), "is_superadmin": False}
+        self.error = error
+
+    async def __call__(self, token: str = "token"):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.context
+
+
+@pytest.mark.asyncio
+async def test_context_resolved_once_per_token():
+    """Повторные запросы с тем же токеном берут контекст из кэша."""
+    dependency = CountingDependency()
+    cached = cached_auth_dependency(dependency, "context_resolved_once_per_token")
+    token = make_token()
+
+    first = await cached(token="token", _auth_cache_request=make_request(token))
+    second = await cached(token="token", _auth_cache_request=make_request(token))
+
+    assert first == second == dependency.context
+    assert dependency.calls == 1
+
+    await cached(token="token", _auth_cache_request=make_request(make_token(300)))
+    assert dependency.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_auth_is_not_cached():
+    """Ошибки авторизации не кэшируются."""
+    dependency = CountingDependency(error=HTTPException(status_code=401))
+    cached = cached_auth_dependency(dependency, "failed_auth_is_not_cached")
+    token = make_token()
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await cached(token="token", _auth_cache_request=make_request(token))
+    assert dependency.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_not_cached():
+    """Контекст просроченного токена в кэш не попадает."""
+    dependency = CountingDependency()
+    cached = cached_auth_dependency(dependency, "expired_token_is_not_cached")
+    token = make_token(expires_in=-10)
+
+    await cached(token="token", _auth_cache_request=make_request(token))
+    await cached(token="token", _auth_cache_request=make_request(token))
+    assert dependency.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_user_event_invalidates_cached_context(monkeypatch):
+    """Событие user.* сбрасывает закэшированные контексты пользователя."""
+
+    async def fake_handle_user_event(event, settings):
+        return None
+
+    monkeypatch.setattr(
+        "app.handlers.user_events.handle_user_event", fake_handle_user_event
+    )
+    dependency = CountingDependency()
+    cached = cached_auth_dependency(dependency, "user_event_invalidates_cached_context")
+    token = make_token()
+
+    await cached(token="token", _auth_cache_request=make_request(token))
+    await handle_user_event_with_cache(
+        {"user_id": dependency.context["user_id"]}, settings=None
+    )
+    await cached(token="token", _auth_cache_request=make_request(token))
+
+    assert dependency.calls == 2
+    assert (
+        auth_context_cache.get(
+            "user_event_invalidates_cached_context", f"Bearer {token}"
+        )
+        is not None
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "event",
+    [{"payload": {"user_id": str(uuid4())}}, {"user_id": "не uuid"}, "user.updated"],
+)
+async def test_unrecognised_user_event_clears_cache_with_warning(monkeypatch, event):
+    """Событие не по схеме: предупреждение в лог и сброс всего кэша."""
+
+    async def fake_handle_user_event(event, settings):
+        return None
+
+    monkeypatch.setattr(
+        "app.handlers.user_events.handle_user_event", fake_handle_user_event
+    )
+    messages = []
+    handler = logger.add(lambda message: messages.append(str(message)), level="WARNING")
+    dependency = CountingDependency()
+    cached = cached_auth_dependency(dependency, "unrecognised_user_event")
+    token = make_token()
+
+    await cached(token="token", _auth_cache_request=make_request(token))
+    try:
+        await handle_user_event_with_cache(event, settings=None)
+    finally:
+        logger.remove(handler)
+
+    assert auth_context_cache.get("unrecognised_user_event", f"Bearer {token}") is None
+    assert any("Нераспознанное событие user.*" in message for message in messages)
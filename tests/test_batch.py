@@ -0,0 +1,60 @@
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+
+from app.database.models import City, Warehouse
+
+
+@pytest.mark.asyncio
+async def test_batch_returns_results_in_request_order(
+    test_app: AsyncClient,
+    jwt_token_admin: dict,
+    seed_warehouse: Warehouse,
+    seed_city: City,
+):
+    """Подзапросы выполняются за один вызов, ответы идут в порядке запросов."""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+    data = {
+        "requests": [
+            {"id": "warehouses", "path": "/api/warehouses/all"},
+            {"id": "warehouse", "path": f"/api/warehouses/{seed_warehouse.id}"},
+            {"id": "cities", "path": "/api/cities/all?page_size=5"},
+            {"id": "missing", "path": f"/api/warehouses/{uuid4()}"},
+        ]
+    }
+
+    response = await test_app.post("/api/batch", headers=headers, json=data)
+    assert response.status_code == 200, (
+        f"Ошибка: {response.status_code}, {response.text}"
+    )
+
+    responses = response.json()["responses"]
+    assert [item["id"] for item in responses] == [
+        "warehouses",
+        "warehouse",
+        "cities",
+        "missing",
+    ]
+    assert responses[0]["status"] == 200
+    assert responses[0]["body"]["total"] == 1
+    assert responses[1]["body"]["warehouse_name"] == seed_warehouse.name
+    assert responses[2]["status"] == 200
+    assert responses[3]["status"] == 404
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_nested_and_oversized_batches(
+    test_app: AsyncClient, jwt_token_admin: dict
+):
+    """Вложенный batch и слишком большой список запросов отклоняются."""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+
+    response = await test_app.post(
+        "/api/batch", headers=headers, json={"requests": [{"path": "/api/batch"}]}
+    )
+    assert response.status_code == 422
+
+    data = {"requests": [{"path": "/api/cities/all"}] * 21}
+    response = await test_app.post("/api/batch", headers=headers, json=data)
+    assert response.status_code == 422
@@ -0,0 +1,42 @@
+from prometheus_client import REGISTRY, Counter
+
+from metrics.bounded import OVERFLOW, BoundedMetric
+
+
+def sample(name: str, **labels):
+    return REGISTRY.get_sample_value(name, labels)
+
+
+def test_series_over_limit_go_to_overflow():
+    counter = BoundedMetric(
+        Counter("test_bounded_requests", "Тестовый счётчик", ["user_id", "role"]),
+        max_series=2,
+    )
+
+    counter.labels(user_id="u1", role="admin").inc()
+    counter.labels("u2", "user").inc()
+    counter.labels(user_id="u1", role="admin").inc()
+    counter.labels(user_id="u3", role="user").inc()
+    counter.labels(user_id="u4", role="user").inc()
+
+    assert sample("test_bounded_requests_total", user_id="u1", role="admin") == 2
+    assert sample("test_bounded_requests_total", user_id="u3", role="user") is None
+    assert sample("test_bounded_requests_total", user_id=OVERFLOW, role=OVERFLOW) == 2
+    assert sample("reference_metric_series", metric="test_bounded_requests") == 3
+    assert (
+        sample("reference_metric_series_overflow_total", metric="test_bounded_requests")
+        == 2
+    )
+
+
+def test_known_series_keep_working_after_overflow():
+    counter = BoundedMetric(
+        Counter("test_bounded_known", "Тестовый счётчик", ["chat_id"]), max_series=1
+    )
+
+    counter.labels(chat_id="1").inc()
+    counter.labels(chat_id="2").inc()
+    counter.labels(chat_id="1").inc()
+
+    assert sample("test_bounded_known_total", chat_id="1") == 2
+    assert sample("test_bounded_known_total", chat_id=OVERFLOW) == 1
@@ -0,0 +1,71 @@
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from httpx import AsyncClient
+from loguru import logger
+
+from app.exceptions.catch_middleware import CatchAllExceptionsMiddleware
+
+
+@pytest.fixture
+def log_messages():
+    messages = []
+    handler = logger.add(lambda message: messages.append(str(message)), level="ERROR")
+    yield messages
+    logger.remove(handler)
+
+
+@pytest.fixture
+async def client():
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok(request: Request):
+        return {"request_id": request.state.request_id}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("сломалось")
+
+    @app.post("/bad")
+    async def bad(request: Request):
+        await request.body()
+        raise HTTPException(status_code=400, detail="плохой запрос")
+
+    app.add_middleware(CatchAllExceptionsMiddleware)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_generated_or_propagated(client: AsyncClient):
+    response = await client.get("/ok")
+    request_id = response.headers["x-request-id"]
+    assert response.json() == {"request_id": request_id}
+
+    response = await client.get("/ok", headers={"X-Request-ID": "abc-123"})
+    assert response.headers["x-request-id"] == "abc-123"
+
+
+@pytest.mark.asyncio
+async def test_unhandled_exception_becomes_500(client: AsyncClient, log_messages):
+    response = await client.get("/boom")
+
+    assert response.status_code == 500
+    assert response.json()["request_id"] == response.headers["x-request-id"]
+    assert any("RuntimeError: сломалось" in message for message in log_messages)
+
+
+@pytest.mark.asyncio
+async def test_bad_request_is_logged_with_redacted_headers(
+    client: AsyncClient, log_messages
+):
+    response = await client.post(
+        "/bad",
+        content=b'{"name": "x"}',
+        headers={"Authorization": "Bearer secret"},
+    )
+
+    assert response.status_code == 400
+    [message] = [m for m in log_messages if "400 Bad Request" in m]
+    assert '{"name": "x"}' in message
+    assert "secret" not in message
@@ -0,0 +1,146 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+from tortoise.transactions import in_transaction
+
+from app.database.engine import PRIMARY
+from app.database.models import City, Warehouse
+from app.utils.change_entities import WAREHOUSE
+from app.utils.change_log import ChangeSet
+
+
+@pytest.mark.asyncio
+async def test_changes_contain_created_warehouse(
+    test_app: AsyncClient, jwt_token_admin: dict
+):
+    """Созданный склад попадает в ленту изменений вместе с данными."""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+    data = {"warehouse_name": "Change Warehouse", "company_id": str(uuid4())}
+
+    response = await test_app.post("/api/warehouses/add", headers=headers, json=data)
+    assert response.status_code == 201
+    warehouse_id = response.json()["warehouse_id"]
+
+    response = await test_app.get("/api/changes", headers=headers)
+    assert response.status_code == 200, (
+        f"Ошибка: {response.status_code}, {response.text}"
+    )
+
+    response_data = response.json()
+    changes = [
+        change
+        for change in response_data["changes"]
+        if change["entity"] == "warehouse" and change["entity_id"] == warehouse_id
+    ]
+    assert len(changes) == 1
+    assert changes[0]["operation"] == "upsert"
+    assert changes[0]["data"]["warehouse_name"] == "Change Warehouse"
+    assert response_data["next_token"] >= changes[0]["seq"]
+
+
+@pytest.mark.asyncio
+async def test_changes_since_token_returns_only_delta(
+    test_app: AsyncClient, jwt_token_admin: dict
+):
+    """После токена отдаются только новые изменения, удаление — как tombstone."""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+    data = {"warehouse_name": "Delta Warehouse", "company_id": str(uuid4())}
+
+    response = await test_app.post("/api/warehouses/add", headers=headers, json=data)
+    warehouse_id = response.json()["warehouse_id"]
+
+    response = await test_app.get("/api/changes", headers=headers)
+    token = response.json()["next_token"]
+
+    response = await test_app.delete(f"/api/warehouses/{warehouse_id}", headers=headers)
+    assert response.status_code == 204
+    assert await Warehouse.filter(id=warehouse_id).first() is None
+
+    response = await test_app.get(f"/api/changes?since={token}", headers=headers)
+    assert response.status_code == 200
+
+    changes = response.json()["changes"]
+    assert len(changes) == 1
+    assert changes[0]["entity_id"] == warehouse_id
+    assert changes[0]["operation"] == "delete"
+    assert changes[0]["data"] is None
+
+
+@pytest.mark.asyncio
+async def test_changes_paginate_with_has_more(
+    test_app: AsyncClient, jwt_token_admin: dict
+):
+    """Лента отдаётся порциями по limit, has_more сигнализирует о продолжении."""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+    for i in range(3):
+        data = {
+            "city_name": f"City {i}",
+            "region": "Region",
+            "code": str(i),
+            "external_id": str(i),
+        }
+        response = await test_app.post("/api/cities/add", headers=headers, json=data)
+        assert response.status_code == 201
+
+    response = await test_app.get("/api/changes?limit=2", headers=headers)
+    first_page = response.json()
+    assert len(first_page["changes"]) == 2
+    assert first_page["has_more"] is True
+
+    response = await test_app.get(
+        f"/api/changes?limit=2&since={first_page['next_token']}", headers=headers
+    )
+    second_page = response.json()
+    assert len(second_page["changes"]) == 1
+    assert second_page["has_more"] is False
+
+    city_ids = {
+        str(city_id) for city_id in await City.all().values_list("id", flat=True)
+    }
+    received = {
+        change["entity_id"] for change in first_page["changes"] + second_page["changes"]
+    }
+    assert received == city_ids
+
+
+@pytest.mark.asyncio
+async def test_changes_are_ordered_by_commit(
+    test_app: AsyncClient, jwt_token_admin: dict
+):
+    """
+    Транзакция, вставившая запись позже, не может закоммитить её раньше
+    первой: иначе клиент увидел бы больший id и пропустил меньший.
+    """
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+    first_id, second_id = uuid4(), uuid4()
+    first_flushed, release_first = asyncio.Event(), asyncio.Event()
+
+    async def write(entity_id, flushed=None, release=None):
+        async with in_transaction(PRIMARY) as connection:
+            changes = ChangeSet(connection)
+            changes.delete(WAREHOUSE, entity_id, [uuid4()])
+            await changes.flush()
+            if flushed is not None:
+                flushed.set()
+                await release.wait()
+
+    first = asyncio.create_task(write(first_id, first_flushed, release_first))
+    await first_flushed.wait()
+    second = asyncio.create_task(write(second_id))
+    await asyncio.sleep(0.2)
+
+    # Первая ещё не закоммичена — вторая ждёт её и тоже не видна
+    response = await test_app.get("/api/changes", headers=headers)
+    assert response.json()["changes"] == []
+    assert not second.done()
+
+    release_first.set()
+    await asyncio.gather(first, second)
+
+    response = await test_app.get("/api/changes", headers=headers)
+    assert [change["entity_id"] for change in response.json()["changes"]] == [
+        str(first_id),
+        str(second_id),
+    ]
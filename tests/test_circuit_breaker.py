@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError
+
+from app.cache.circuit_breaker import (
+    CircuitOpenError,
+    GuardedRedis,
+    RedisCircuitBreaker,
+    ResilientRedisBackend,
+)
+from app.cache.redis_client import set_redis
+from app.cache.two_tier import TwoTierCache
+
+
+class FlakyRedis:
+    """Redis, который можно «уронить» и «поднять» в тесте."""
+
+    def __init__(self):
+        self.healthy = True
+        self.hang = False
+        self.calls = 0
+        self.data = {}
+
+    async def _check(self):
+        self.calls += 1
+        if self.hang:
+            await asyncio.sleep(10)
+        if not self.healthy:
+            raise RedisConnectionError("connection refused")
+
+    async def get(self, key):
+        await self._check()
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        await self._check()
+        self.data[key] = value
+        return True
+
+    async def ping(self):
+        await self._check()
+        return True
+
+    async def aclose(self):
+        pass
+
+
+def guarded(client: FlakyRedis) -> GuardedRedis:
+    breaker = RedisCircuitBreaker(
+        client, failure_threshold=2, probe_interval=0.01, probe_timeout=0.05
+    )
+    return GuardedRedis(client, timeout=0.05, breaker=breaker)
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_fails_fast():
+    """После серии ошибок команды не доходят до Redis."""
+    client = FlakyRedis()
+    redis = guarded(client)
+    client.healthy = False
+
+    for _ in range(2):
+        with pytest.raises(RedisError):
+            await redis.get("key")
+    assert redis.breaker.is_open
+
+    calls = client.calls
+    with pytest.raises(CircuitOpenError):
+        await redis.get("key")
+    assert client.calls == calls
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_breaker_bounds_slow_commands_and_recovers():
+    """Зависшая команда ограничена таймаутом, фоновая проверка замыкает цепь."""
+    client = FlakyRedis()
+    redis = guarded(client)
+    client.hang = True
+
+    for _ in range(2):
+        with pytest.raises(RedisError):
+            await asyncio.wait_for(redis.get("key"), 1)
+    assert redis.breaker.is_open
+
+    client.hang = False
+    for _ in range(50):
+        if not redis.breaker.is_open:
+            break
+        await asyncio.sleep(0.01)
+
+    assert not redis.breaker.is_open
+    assert await redis.set("key", b"value")
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_caches_degrade_when_circuit_open():
+    """При разомкнутом предохранителе кэши работают без Redis."""
+    client = FlakyRedis()
+    redis = guarded(client)
+    client.healthy = False
+    set_redis(redis)
+    try:
+        cache = TwoTierCache("test_breaker", ttl=60)
+        loads = []
+
+        async def loader():
+            loads.append(1)
+            return {"value": 1}
+
+        assert await cache.get_or_set("key", loader) == {"value": 1}
+        assert await cache.get_or_set("key", loader) == {"value": 1}
+        assert len(loads) == 1
+
+        backend = ResilientRedisBackend(redis)
+        assert await backend.get_with_ttl("key") == (0, None)
+        await backend.set("key", b"value")
+    finally:
+        set_redis(None)
+        await redis.aclose()
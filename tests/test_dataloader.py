@@ -0,0 +1,80 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.database.models import Warehouse
+from app.routes.warehouse_route import warehouse_loader
+from app.utils import dataloader
+from app.utils.dataloader import BatchLoader
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_share_one_query(monkeypatch):
+    """Одновременные запросы деталей уходят в базу одним запросом."""
+    warehouses = [
+        await Warehouse.create(
+            name=f"Warehouse {i}",
+            created_by=uuid4(),
+            modified_by=uuid4(),
+            company_id=uuid4(),
+        )
+        for i in range(3)
+    ]
+    missing_id = uuid4()
+
+    fetched_batches = []
+    fetch = warehouse_loader._fetch
+
+    async def counting_fetch(ids):
+        fetched_batches.append(set(ids))
+        return await fetch(ids)
+
+    monkeypatch.setattr(warehouse_loader, "_fetch", counting_fetch)
+
+    ids = [warehouse.id for warehouse in warehouses] + [warehouses[0].id, missing_id]
+    rows = await asyncio.gather(*(warehouse_loader.load(i) for i in ids))
+
+    assert len(fetched_batches) == 1
+    assert fetched_batches[0] == {warehouse.id for warehouse in warehouses} | {
+        missing_id
+    }
+    assert [row["name"] for row in rows[:4]] == [
+        "Warehouse 0",
+        "Warehouse 1",
+        "Warehouse 2",
+        "Warehouse 0",
+    ]
+    assert rows[4] is None
+
+
+@pytest.mark.asyncio
+async def test_batch_error_reaches_every_waiter(monkeypatch):
+    """Ошибка запроса пачки передаётся всем ожидающим обработчикам."""
+    loader = BatchLoader(Warehouse, ("id", "name"))
+
+    async def failing_fetch(ids):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(loader, "_fetch", failing_fetch)
+
+    results = await asyncio.gather(
+        loader.load(uuid4()), loader.load(uuid4()), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_orm_fallback_matches_fast_path(monkeypatch):
+    """Без Postgres (sqlite в разработке) пачка читается через ORM."""
+    warehouse = await Warehouse.create(
+        name="Warehouse", created_by=uuid4(), modified_by=uuid4(), company_id=uuid4()
+    )
+    fields = ("id", "name", "company_id", "created_at")
+    fast = await BatchLoader(Warehouse, fields).load(warehouse.id)
+
+    monkeypatch.setattr(dataloader, "fast_path_enabled", lambda model: False)
+    loader = BatchLoader(Warehouse, fields)
+    rows = await asyncio.gather(loader.load(warehouse.id), loader.load(uuid4()))
+
+    assert rows == [fast, None]
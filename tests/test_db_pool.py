@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from app.database.engine import (
+    PRIMARY,
+    InstrumentedAsyncpgClient,
+    connection_config,
+)
+from app.database.models import City
+
+
+def sample(name: str, **labels):
+    return REGISTRY.get_sample_value(name, {"connection": "default", **labels})
+
+
+def test_connection_config_applies_pool_settings(test_settings):
+    config = connection_config(test_settings)
+
+    credentials = config["credentials"]
+    assert config["engine"] == "app.database.engine"
+    assert credentials["maxsize"] == test_settings.DB_POOL_MAX_SIZE
+    assert credentials["acquire_timeout"] == test_settings.DB_POOL_ACQUIRE_TIMEOUT
+    assert credentials["statement_cache_size"] == (
+        test_settings.DB_STATEMENT_CACHE_SIZE
+    )
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_track_in_use_connections():
+    """Занятые соединения видны в метриках, в том числе внутри транзакции."""
+    client = Tortoise.get_connection("default")
+    assert isinstance(client, InstrumentedAsyncpgClient)
+
+    before = sample("reference_db_pool_acquire_seconds_count") or 0
+    await City.all().count()
+    assert sample("reference_db_pool_acquire_seconds_count") > before
+
+    async with in_transaction(PRIMARY):
+        assert sample("reference_db_pool_in_use") >= 1
+    assert sample("reference_db_pool_max_size") == client.pool_maxsize
+
+
+@pytest.mark.asyncio
+async def test_pool_acquire_times_out_when_exhausted():
+    client = Tortoise.get_connection("default")
+    pool = client._pool
+    held = [await pool.acquire() for _ in range(pool.get_max_size())]
+    timeouts = sample("reference_db_pool_acquire_timeouts_total") or 0
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.acquire(timeout=0.01)
+    finally:
+        for connection in held:
+            await pool.release(connection)
+
+    assert sample("reference_db_pool_acquire_timeouts_total") == timeouts + 1
@@ -80,6 +80,43 @@ async def test_update_entity_company_relation(
     assert relation.description == "Описание связи"
 
 
+@pytest.mark.asyncio
+async def test_moving_relation_removes_entity_from_previous_company_feed(
+    test_app: AsyncClient,
+    jwt_token_admin: dict,
+    seed_entity_relation: EntityCompanyRelation,
+):
+    """Связь перенесена в другую компанию — прежняя получает удаление юрлица."""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+    previous_company_id = seed_entity_relation.company_id
+    new_company_id = uuid4()
+
+    response = await test_app.patch(
+        f"/api/entity-company-relations/{seed_entity_relation.id}",
+        headers=headers,
+        json={"company_id": str(new_company_id)},
+    )
+    assert response.status_code == 200
+
+    legal_entity_id = str(seed_entity_relation.legal_entity_id)
+    for company_id, operation in (
+        (previous_company_id, "delete"),
+        (new_company_id, "upsert"),
+    ):
+        response = await test_app.get(
+            "/api/changes", headers=headers, params={"company_id": str(company_id)}
+        )
+        operations = {
+            change["entity"]: change["operation"]
+            for change in response.json()["changes"]
+            if change["entity_id"] in (legal_entity_id, str(seed_entity_relation.id))
+        }
+        assert operations == {
+            "legal_entity": operation,
+            "entity_company_relation": operation,
+        }
+
+
 @pytest.mark.asyncio
 async def test_delete_entity_company_relation(
     test_app: AsyncClient,
@@ -113,3 +150,42 @@ async def test_get_all_entity_company_relations(
     relations = response_data.get("relations")
     assert isinstance(relations, list)
     assert response_data.get("total") >= 1
+
+
+@pytest.mark.asyncio
+async def test_get_relations_expand_legal_entity(
+    test_app: AsyncClient,
+    jwt_token_admin: dict,
+    seed_entity_relation: EntityCompanyRelation,
+    seed_legal_entity: LegalEntity,
+):
+    """expand=legal_entity вкладывает краткие данные юрлица в каждую связь"""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+
+    response = await test_app.get(
+        "/api/entity-company-relations/all?expand=legal_entity", headers=headers
+    )
+    assert response.status_code == 200, (
+        f"Ошибка: {response.status_code}, {response.text}"
+    )
+    relation = response.json()["relations"][0]
+    assert relation["legal_entity"]["legal_entity_id"] == str(seed_legal_entity.id)
+    assert relation["legal_entity"]["short_name"] == seed_legal_entity.short_name
+
+    response = await test_app.get(
+        f"/api/entity-company-relations/{seed_entity_relation.id}", headers=headers
+    )
+    assert response.json()["legal_entity"] is None
+
+
+@pytest.mark.asyncio
+async def test_get_relations_unknown_expand(
+    test_app: AsyncClient, jwt_token_admin: dict
+):
+    """Неизвестное значение expand — ошибка 422"""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+
+    response = await test_app.get(
+        "/api/entity-company-relations/all?expand=company", headers=headers
+    )
+    assert response.status_code == 422
@@ -0,0 +1,51 @@
+import pytest
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+
+from app.database.models import City
+
+ROUTE = "/api/cities/{city_id}"
+
+
+def sample(name: str, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.asyncio
+async def test_requests_are_labelled_by_route_template(
+    test_app: AsyncClient, jwt_token_admin: dict, seed_city: City
+):
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+    labels = {"route": ROUTE, "method": "GET", "status": "2xx"}
+    requests_before = sample("reference_http_requests_total", **labels)
+    size_before = sample(
+        "reference_http_response_size_bytes_sum", route=ROUTE, method="GET"
+    )
+
+    response = await test_app.get(f"/api/cities/{seed_city.id}", headers=headers)
+
+    assert response.status_code == 200
+    assert sample("reference_http_requests_total", **labels) == requests_before + 1
+    assert sample("reference_http_request_duration_seconds_count", **labels) >= 1
+    assert sample(
+        "reference_http_response_size_bytes_sum", route=ROUTE, method="GET"
+    ) == size_before + len(response.content)
+    assert sample("reference_http_requests_in_flight", method="GET") == 0
+    # Сырой путь с id в метки не попадает
+    assert not sample(
+        "reference_http_requests_total",
+        route=f"/api/cities/{seed_city.id}",
+        method="GET",
+        status="2xx",
+    )
+
+
+@pytest.mark.asyncio
+async def test_unknown_paths_share_one_label(test_app: AsyncClient):
+    labels = {"route": "unmatched", "method": "GET", "status": "4xx"}
+    before = sample("reference_http_requests_total", **labels)
+
+    await test_app.get("/no-such-path/1")
+    await test_app.get("/no-such-path/2")
+
+    assert sample("reference_http_requests_total", **labels) == before + 2
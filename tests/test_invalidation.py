@@ -0,0 +1,119 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.cache import invalidation
+from app.cache.auth_context import AuthContextCache
+from app.cache.invalidation import USER_INVALIDATION_CHANNEL, InvalidationListener
+from app.database.models import Warehouse
+from app.handlers.user_events import handle_user_event_with_cache
+from app.utils.change_entities import WAREHOUSE
+from app.utils.change_log import (
+    Change,
+    decode_changes,
+    encode_changes,
+    tracked_transaction,
+)
+
+
+@pytest.fixture
+async def listener(test_settings):
+    listener = InvalidationListener.from_db_url(test_settings.db_url)
+    task = asyncio.create_task(listener.run())
+    await asyncio.wait_for(listener.connected.wait(), 5)
+    yield listener
+    task.cancel()
+    await listener.close()
+
+
+@pytest.fixture
+def received(monkeypatch):
+    queue = asyncio.Queue()
+    monkeypatch.setattr(invalidation, "_change_hooks", [queue.put_nowait])
+    return queue
+
+
+def test_encode_decode_changes():
+    """Изменения переживают кодирование, слишком большая пачка — полный сброс."""
+    changes = [Change(WAREHOUSE, uuid4(), "upsert", (uuid4(), None))]
+    assert decode_changes(encode_changes(changes)) == changes
+
+    many = [Change(WAREHOUSE, uuid4(), "upsert", (uuid4(),)) for _ in range(200)]
+    assert decode_changes(encode_changes(many)) is None
+
+
+@pytest.mark.asyncio
+async def test_listener_receives_committed_changes(listener, received):
+    """Слушатель получает изменения после коммита, откат ничего не рассылает."""
+    company_id = uuid4()
+
+    with pytest.raises(RuntimeError):
+        async with tracked_transaction() as changes:
+            warehouse = await Warehouse.create(
+                name="Rolled back",
+                company_id=company_id,
+                created_by=uuid4(),
+                modified_by=uuid4(),
+            )
+            changes.upsert(WAREHOUSE, warehouse.id, [company_id])
+            raise RuntimeError("rollback")
+
+    async with tracked_transaction() as changes:
+        warehouse = await Warehouse.create(
+            name="Committed",
+            company_id=company_id,
+            created_by=uuid4(),
+            modified_by=uuid4(),
+        )
+        changes.upsert(WAREHOUSE, warehouse.id, [company_id])
+
+    notified = await asyncio.wait_for(received.get(), 5)
+    assert notified == [Change(WAREHOUSE, warehouse.id, "upsert", (company_id,))]
+    assert received.empty()
+
+
+@pytest.mark.asyncio
+async def test_user_event_reaches_every_worker_cache(listener, monkeypatch):
+    """Событие user.* получает один воркер, а контексты сбрасываются во всех."""
+
+    async def fake_handle_user_event(event, settings):
+        return None
+
+    monkeypatch.setattr(
+        "app.handlers.user_events.handle_user_event", fake_handle_user_event
+    )
+    consumer, other = AuthContextCache(), AuthContextCache()
+    # other — кэш воркера, до которого событие доходит только через NOTIFY
+    monkeypatch.setattr(invalidation, "_user_hooks", [consumer.invalidate])
+    user_id, bystander_id = str(uuid4()), str(uuid4())
+    for cache in (consumer, other):
+        cache.set("current_user", "Bearer user", {"user_id": user_id})
+        cache.set("current_user", "Bearer bystander", {"user_id": bystander_id})
+
+    async def other_worker_receives(event) -> None:
+        received = asyncio.Event()
+
+        def on_notify(*notification):
+            with monkeypatch.context() as patch:
+                patch.setattr(invalidation, "_user_hooks", [other.invalidate])
+                listener._notify_user(*notification)
+            received.set()
+
+        await listener._connection.add_listener(USER_INVALIDATION_CHANNEL, on_notify)
+        try:
+            await handle_user_event_with_cache(event, settings=None)
+            await asyncio.wait_for(received.wait(), 5)
+        finally:
+            await listener._connection.remove_listener(
+                USER_INVALIDATION_CHANNEL, on_notify
+            )
+
+    await other_worker_receives({"user_id": user_id})
+    for cache in (consumer, other):
+        assert cache.get("current_user", "Bearer user") is None
+        assert cache.get("current_user", "Bearer bystander") is not None
+
+    await other_worker_receives({"unexpected": "shape"})
+    for cache in (consumer, other):
+        assert cache.get("current_user", "Bearer bystander") is None
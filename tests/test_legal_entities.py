@@ -3,7 +3,10 @@ from uuid import uuid4
 import pytest
 from httpx import AsyncClient
 
+from app import create_app
+from app.config import ConfigName
 from app.database.models import LegalEntity, LegalEntityType
+from app.dependencies.auth import cached_current_user
 
 
 @pytest.mark.asyncio
@@ -90,6 +93,26 @@ async def test_view_legal_entity(
     assert data["short_name"] == seed_legal_entity.short_name
 
 
+@pytest.mark.asyncio
+async def test_view_legal_entity_expand_relations(
+    test_app: AsyncClient,
+    jwt_token_admin: dict,
+    seed_entity_relation,
+):
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+
+    response = await test_app.get(
+        f"/api/legal-entities/{seed_entity_relation.legal_entity_id}?expand=relations",
+        headers=headers,
+    )
+
+    assert response.status_code == 200, response.text
+    relations = response.json()["relations"]
+    assert len(relations) == 1
+    assert relations[0]["entity_company_relation_id"] == str(seed_entity_relation.id)
+    assert relations[0]["company_id"] == str(seed_entity_relation.company_id)
+
+
 @pytest.mark.asyncio
 async def test_delete_legal_entity(
     test_app: AsyncClient,
@@ -196,3 +219,23 @@ async def test_get_legal_entity_by_inn_kpp(
     assert response.status_code == 200
     data = response.json()
     assert data["legal_entity_id"] == str(seed_legal_entity.id)
+
+
+@pytest.mark.asyncio
+async def test_view_relations_for_user_without_company(seed_entity_relation):
+    """Не суперадмин без компании не видит чужих связей."""
+    app = create_app(config_name=ConfigName.TEST)
+    app.dependency_overrides[cached_current_user] = lambda: {
+        "user_id": str(uuid4()),
+        "is_superadmin": False,
+        "company": None,
+    }
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get(
+            f"/api/legal-entities/{seed_entity_relation.legal_entity_id}"
+            "?expand=relations"
+        )
+
+    assert response.status_code == 200, response.text
+    assert response.json()["relations"] == []
@@ -0,0 +1,90 @@
+import pytest
+from httpx import AsyncClient
+from tortoise.expressions import Q
+
+from app.database.models import City, LegalEntity, LegalEntityType
+from app.routes.legal_entity_route import legal_entity_by_ids_list, legal_entity_list
+from app.utils.list_engine import FilterSpec, ListSpec, fetch_list
+
+CITY_LIST = ListSpec(
+    model=City,
+    fields=("id", "name"),
+    sorts={"name": "name"},
+    default_sort="name",
+    filters=(FilterSpec("city_name", "name__icontains"),),
+)
+
+
+async def create_cities(*names):
+    for name in names:
+        await City.create(name=name, region="Регион", code="1", external_id=name)
+
+
+@pytest.mark.asyncio
+async def test_fetch_list_counts_and_pages():
+    """Общее число не зависит от страницы, порядок стабилен."""
+    await create_cities("Омск", "Тверь", "Курск")
+
+    total, page = await fetch_list(
+        CITY_LIST, {"page": 2, "page_size": 2, "order": "desc"}
+    )
+
+    assert total == 3
+    assert [row["name"] for row in page] == ["Курск"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_list_applies_filters():
+    await create_cities("Омск", "Томск", "Тверь")
+
+    total, page = await fetch_list(CITY_LIST, {"city_name": "мск"})
+
+    assert total == 2
+    assert [row["name"] for row in page] == ["Омск", "Томск"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_list_ignores_unknown_sort():
+    """Неизвестные sort_by и order не ошибка: сортировка по умолчанию."""
+    await create_cities("Тверь", "Омск")
+
+    _, page = await fetch_list(CITY_LIST, {"sort_by": "external_id"})
+    assert [row["name"] for row in page] == ["Омск", "Тверь"]
+
+    _, page = await fetch_list(CITY_LIST, {"order": "sideways"})
+    assert [row["name"] for row in page] == ["Омск", "Тверь"]
+
+
+@pytest.mark.asyncio
+async def test_city_list_ignores_unknown_sort(
+    test_app: AsyncClient, jwt_token_admin: dict
+):
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+
+    response = await test_app.get(
+        "/api/cities/all", headers=headers, params={"sort_by": "code"}
+    )
+
+    assert response.status_code == 200, response.text
+
+
+@pytest.mark.asyncio
+async def test_legal_entity_lists_filter_on_their_own_type_param(
+    seed_legal_entity: LegalEntity,
+):
+    """/all фильтрует по entity_type, /by-ids — по entity_type_id."""
+    other_type = await LegalEntityType.create(id="ip", name="ИП")
+    other = await LegalEntity.create(
+        short_name="ИП Иванов",
+        inn="500100732259",
+        ogrn="304500116000157",
+        entity_type=other_type,
+    )
+    filters = {"entity_type": "ooo", "entity_type_id": "ip"}
+    ids = Q(id__in=[seed_legal_entity.id, other.id])
+
+    _, listed = await fetch_list(legal_entity_list, filters, ids)
+    _, by_ids = await fetch_list(legal_entity_by_ids_list, filters, ids)
+
+    assert [row["id"] for row in listed] == [seed_legal_entity.id]
+    assert [row["id"] for row in by_ids] == [other.id]
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+import time
+import warnings
+
+from loguru import logger
+
+from metrics.logger import BatchedSink, InterceptHandler, Sampler, _json_format
+
+
+def read_lines(path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_json_sink_writes_batched_records(tmp_path):
+    path = tmp_path / "app.log"
+    handler = logger.add(
+        BatchedSink(str(path), serialize=True), format=_json_format, level="INFO"
+    )
+    try:
+        logger.info("склад найден: {}", 42)
+        logger.debug("отладка не пишется: {}", object())
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("ошибка")
+    finally:
+        logger.remove(handler)  # останавливает поток и дописывает буфер
+
+    records = [json.loads(line) for line in read_lines(path)]
+    assert [record["message"] for record in records] == ["склад найден: 42", "ошибка"]
+    assert records[0]["function"] == "test_json_sink_writes_batched_records"
+    assert "ZeroDivisionError" in records[1]["exception"]
+
+
+def test_sampler_drops_success_and_access_only(tmp_path):
+    path = tmp_path / "app.log"
+    handler = logger.add(
+        BatchedSink(str(path)),
+        format="{level} {name}:{function} {message}",
+        level="INFO",
+        filter=Sampler(success_rate=0, access_rate=0),
+    )
+    access = logging.getLogger("test.access")
+    access.handlers = [InterceptHandler()]
+    access.propagate = False
+    try:
+        logger.success("создан")
+        logger.warning("предупреждение")
+        logging.getLogger("uvicorn.access").info('"GET /api/cities" 200')
+        # Запись из logging сохраняет имя логгера и функцию без обхода стека
+        access.warning("обычная запись stdlib")
+    finally:
+        logger.remove(handler)
+
+    function = "test_sampler_drops_success_and_access_only"
+    assert read_lines(path) == [
+        f"WARNING {__name__}:{function} предупреждение",
+        f"WARNING test.access:{function} обычная запись stdlib",
+    ]
+
+
+def test_file_is_rotated_by_size(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("x" * 100)
+    sink = BatchedSink(str(path), rotation_bytes=50)
+    handler = logger.add(sink, format="{message}")
+    try:
+        logger.info("после ротации")
+    finally:
+        logger.remove(handler)
+
+    assert read_lines(path) == ["после ротации"]
+    rotated = [name for name in os.listdir(tmp_path) if name != "app.log"]
+    assert len(rotated) == 1
+
+
+def test_forked_worker_writes_its_own_records(tmp_path):
+    # Как с preload_app: приёмник создан в мастере, записи пишет воркер
+    path = tmp_path / "app.log"
+    handler = logger.add(
+        BatchedSink(str(path), flush_interval=0.01), format="{message}"
+    )
+    try:
+        logger.info("мастер")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            pid = os.fork()
+        if pid == 0:
+            # Воркер не останавливает приёмник: запись должен сделать его поток
+            logger.info("воркер")
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                if path.exists() and "воркер" in read_lines(path):
+                    os._exit(0)
+                time.sleep(0.01)
+            os._exit(1)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+    finally:
+        logger.remove(handler)
+
+    assert sorted(read_lines(path)) == ["воркер", "мастер"]
+
+
+def test_file_sink_also_writes_stdout(tmp_path, capsys):
+    path = tmp_path / "app.log"
+    handler = logger.add(BatchedSink(str(path), stdout=True), format="{message}")
+    try:
+        logger.info("и туда, и туда")
+    finally:
+        logger.remove(handler)
+
+    assert read_lines(path) == ["и туда, и туда"]
+    assert capsys.readouterr().out == "и туда, и туда\n"
@@ -0,0 +1,79 @@
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+
+from app.cache import membership
+from app.cache.membership import MembershipIndex, membership_index
+from app.database.models import EntityCompanyRelation, LegalEntity
+
+
+@pytest.mark.asyncio
+async def test_membership_matches_relations(
+    seed_entity_relation: EntityCompanyRelation,
+):
+    """Индекс содержит юрлица и связи компании и не видит чужие."""
+    company_id = seed_entity_relation.company_id
+
+    assert await membership_index.has_legal_entity(
+        company_id, seed_entity_relation.legal_entity_id
+    )
+    assert await membership_index.has_relation(company_id, seed_entity_relation.id)
+    assert not await membership_index.has_relation(uuid4(), seed_entity_relation.id)
+    assert not await membership_index.has_legal_entity(
+        None, seed_entity_relation.legal_entity_id
+    )
+
+
+@pytest.mark.asyncio
+async def test_new_relation_invalidates_membership(
+    test_app: AsyncClient, jwt_token_admin: dict, seed_legal_entity: LegalEntity
+):
+    """Создание и удаление связи через API сразу отражаются в индексе."""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+    company_id = str(uuid4())
+
+    assert not await membership_index.has_legal_entity(company_id, seed_legal_entity.id)
+
+    data = {
+        "company_id": company_id,
+        "legal_entity_id": str(seed_legal_entity.id),
+        "relation_type": "buyer",
+    }
+    response = await test_app.post(
+        "/api/entity-company-relations/add", headers=headers, json=data
+    )
+    assert response.status_code == 201
+    relation_id = response.json()["entity_company_relation_id"]
+
+    assert await membership_index.has_legal_entity(company_id, seed_legal_entity.id)
+    assert await membership_index.has_relation(company_id, relation_id)
+
+    response = await test_app.delete(
+        f"/api/entity-company-relations/{relation_id}", headers=headers
+    )
+    assert response.status_code == 204
+    assert not await membership_index.has_relation(company_id, relation_id)
+
+
+@pytest.mark.asyncio
+async def test_version_bump_reaches_other_workers(
+    fake_redis, monkeypatch, seed_entity_relation: EntityCompanyRelation
+):
+    """Другой процесс перечитывает индекс после увеличения версии в Redis."""
+    monkeypatch.setattr(membership, "MEMBERSHIP_VERSION_CHECK_SECONDS", 0)
+    company_id = seed_entity_relation.company_id
+    other_worker = MembershipIndex()
+
+    assert await other_worker.has_relation(company_id, seed_entity_relation.id)
+
+    new_relation = await EntityCompanyRelation.create(
+        company_id=company_id,
+        legal_entity_id=seed_entity_relation.legal_entity_id,
+        relation_type="seller",
+    )
+    # Без увеличения версии другой процесс отдаёт снимок из Redis
+    assert not await other_worker.has_relation(company_id, new_relation.id)
+
+    await membership_index.invalidate(company_id)
+    assert await other_worker.has_relation(company_id, new_relation.id)
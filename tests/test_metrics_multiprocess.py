@@ -0,0 +1,68 @@
+import os
+
+from prometheus_client import CollectorRegistry, multiprocess
+from prometheus_client.mmap_dict import MmapedDict, mmap_key
+
+from metrics.multiprocess import archive_dead_worker, prepare_multiprocess_dir
+
+REQUESTS = mmap_key(
+    "reference_http_requests",
+    "reference_http_requests_total",
+    ["route"],
+    ["/api/cities"],
+    "HTTP-запросы",
+)
+IN_FLIGHT = mmap_key(
+    "reference_http_requests_in_flight",
+    "reference_http_requests_in_flight",
+    [],
+    [],
+    "В обработке",
+)
+
+
+def write(path, filename: str, key: str, value: float):
+    values = MmapedDict(os.path.join(path, filename))
+    values.write_value(key, value, 0)
+    values.close()
+
+
+def collected(path) -> dict:
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=str(path))
+    return {
+        sample.name: sample.value
+        for metric in registry.collect()
+        for sample in metric.samples
+    }
+
+
+def test_dead_worker_counters_are_archived(tmp_path):
+    prepare_multiprocess_dir(str(tmp_path))
+    write(tmp_path, "counter_101.db", REQUESTS, 3)
+    write(tmp_path, "counter_102.db", REQUESTS, 4)
+    write(tmp_path, "gauge_livesum_101.db", IN_FLIGHT, 2)
+    write(tmp_path, "gauge_livesum_102.db", IN_FLIGHT, 1)
+
+    archive_dead_worker(101, str(tmp_path))
+    write(tmp_path, "counter_103.db", REQUESTS, 1)
+    archive_dead_worker(103, str(tmp_path))
+
+    values = collected(tmp_path)
+    # Счётчик не уменьшился после перезапуска воркеров
+    assert values["reference_http_requests_total"] == 8
+    # Занятость — только живых воркеров
+    assert values["reference_http_requests_in_flight"] == 1
+    assert sorted(os.listdir(tmp_path)) == [
+        "counter_102.db",
+        "counter_archive.db",
+        "gauge_livesum_102.db",
+    ]
+
+
+def test_prepare_removes_previous_run(tmp_path):
+    write(tmp_path, "counter_101.db", REQUESTS, 3)
+
+    prepare_multiprocess_dir(str(tmp_path))
+
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,123 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from app.database.engine import PRIMARY
+from app.database.models import OutboxEvent
+from app.handlers.outbox_publisher import OUTBOX_PUBLISHER_LOCK, OutboxPublisher
+
+
+@pytest.mark.asyncio
+async def test_write_creates_outbox_event(test_app: AsyncClient, jwt_token_admin: dict):
+    """Создание склада пишет событие в outbox в той же транзакции."""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+    data = {"warehouse_name": "Outbox Warehouse", "company_id": str(uuid4())}
+
+    response = await test_app.post("/api/warehouses/add", headers=headers, json=data)
+    assert response.status_code == 201
+    warehouse_id = response.json()["warehouse_id"]
+
+    event = await OutboxEvent.filter(routing_key="reference.warehouse.upsert").first()
+    assert event is not None, "Событие не записано в outbox"
+    assert event.published_at is None
+    assert event.payload["entity_id"] == warehouse_id
+    assert event.payload["company_ids"] == [data["company_id"]]
+    assert event.payload["data"]["warehouse_name"] == "Outbox Warehouse"
+
+
+@pytest.mark.asyncio
+async def test_publisher_sends_pending_events(
+    test_app: AsyncClient, jwt_token_admin: dict, in_memory_broker, seed_warehouse
+):
+    """Публикатор отправляет накопленные события и помечает их опубликованными."""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+
+    response = await test_app.delete(
+        f"/api/warehouses/{seed_warehouse.id}", headers=headers
+    )
+    assert response.status_code == 204
+
+    publisher = OutboxPublisher(in_memory_broker, batch_size=10)
+    assert await publisher.publish_pending() == 1
+
+    [(event_id, routing_key, payload)] = in_memory_broker.messages
+    assert routing_key == "reference.warehouse.delete"
+    assert payload["entity_id"] == str(seed_warehouse.id)
+    assert payload["data"] is None
+
+    event = await OutboxEvent.get(id=event_id)
+    assert event.published_at is not None
+    assert await publisher.publish_pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_publisher_keeps_events_when_broker_fails(
+    test_app: AsyncClient, jwt_token_admin: dict, in_memory_broker
+):
+    """При недоступном брокере события остаются в outbox до следующей попытки."""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+    data = {"city_name": "Outbox City", "region": "R", "code": "1", "external_id": "1"}
+
+    response = await test_app.post("/api/cities/add", headers=headers, json=data)
+    assert response.status_code == 201
+
+    in_memory_broker.fail = True
+    publisher = OutboxPublisher(in_memory_broker, batch_size=10)
+    with pytest.raises(ConnectionError):
+        await publisher.publish_pending()
+    assert await OutboxEvent.filter(published_at__isnull=True).count() == 1
+
+    in_memory_broker.fail = False
+    assert await publisher.publish_pending() == 1
+    assert await OutboxEvent.filter(published_at__isnull=True).count() == 0
+
+
+@pytest.mark.asyncio
+async def test_only_lock_holder_publishes_in_id_order(in_memory_broker):
+    """Пока блокировку держит другой воркер, публикатор ничего не отправляет."""
+    events = [
+        await OutboxEvent.create(routing_key="reference.city.upsert", payload={"n": n})
+        for n in range(3)
+    ]
+    publisher = OutboxPublisher(in_memory_broker, batch_size=10)
+    locked, release = asyncio.Event(), asyncio.Event()
+
+    async def other_worker():
+        # Отдельная задача — отдельное соединение, как у другого воркера
+        async with in_transaction(PRIMARY) as connection:
+            await connection.execute_query(
+                "SELECT pg_advisory_xact_lock($1)", [OUTBOX_PUBLISHER_LOCK]
+            )
+            locked.set()
+            await release.wait()
+
+    holder = asyncio.create_task(other_worker())
+    await asyncio.wait_for(locked.wait(), 5)
+    try:
+        assert await publisher.publish_pending() == 0
+    finally:
+        release.set()
+        await holder
+    assert in_memory_broker.messages == []
+
+    assert await publisher.publish_pending() == 3
+    assert [message[0] for message in in_memory_broker.messages] == [
+        event.id for event in events
+    ]
+
+
+@pytest.mark.asyncio
+async def test_unpublished_index_is_part_of_the_schema():
+    """Частичный индекс очереди создаётся и без миграций (generate_schemas)."""
+    connection = Tortoise.get_connection(PRIMARY)
+    _, rows = await connection.execute_query(
+        "SELECT indexdef FROM pg_indexes WHERE indexname = $1",
+        ["idx_outbox_events_unpublished"],
+    )
+
+    [(indexdef,)] = rows
+    assert "WHERE (published_at IS NULL)" in indexdef
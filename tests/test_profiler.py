@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from metrics.profiler import ProfilerBusyError, profile
+
+
+def busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.mark.asyncio
+async def test_profile_captures_busy_function():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+    worker.start()
+    try:
+        profiler = await profile(0.2, interval=0.001)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profiler.samples > 0
+    busy = [
+        line for line in profiler.collapsed().splitlines() if line.startswith("busy;")
+    ]
+    assert busy and all("busy_loop (" in line for line in busy)
+
+    document = profiler.speedscope("test")
+    frames = [frame["name"] for frame in document["shared"]["frames"]]
+    assert any(name.startswith("busy_loop (") for name in frames)
+    [sampled] = document["profiles"]
+    assert len(sampled["samples"]) == len(sampled["weights"])
+
+
+@pytest.mark.asyncio
+async def test_only_one_profile_per_worker():
+    results = await asyncio.gather(profile(0.1), profile(0.1), return_exceptions=True)
+
+    assert sum(isinstance(r, ProfilerBusyError) for r in results) == 1
+    # После завершения можно снимать снова
+    await profile(0.01)
+
+
+@pytest.mark.asyncio
+async def test_profile_endpoint_returns_speedscope(
+    test_app: AsyncClient, jwt_token_admin: dict
+):
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+    started = time.perf_counter()
+
+    response = await test_app.post(
+        "/debug/profile",
+        params={"seconds": 0.1, "format": "speedscope"},
+        headers=headers,
+    )
+
+    assert response.status_code == 200, response.text
+    assert time.perf_counter() - started >= 0.1
+    assert "speedscope.json" in response.headers["content-disposition"]
+    assert response.json()["profiles"][0]["type"] == "sampled"
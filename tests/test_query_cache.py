@@ -0,0 +1,110 @@
+import pytest
+from httpx import AsyncClient
+
+from app.cache.query_cache import (
+    QueryCache,
+    _changed_tables,
+    query_cache,
+    query_tables,
+)
+from app.database.models import City, EntityCompanyRelation, LegalEntity
+from app.utils.change_entities import CITY, UPSERT
+from app.utils.change_log import Change
+
+
+@pytest.fixture
+def executions(monkeypatch):
+    """Считает реальные обращения общего кэша запросов к базе."""
+    calls = []
+    execute = query_cache._execute
+
+    async def counting(queryset):
+        calls.append(queryset)
+        return await execute(queryset)
+
+    monkeypatch.setattr(query_cache, "_execute", counting)
+    return calls
+
+
+def test_query_tables_include_joins():
+    """В версии ключа участвуют таблицы из JOIN и явно указанные модели."""
+    queryset = LegalEntity.filter(
+        entity_company_relations__relation_type="buyer"
+    ).values("id")
+
+    assert query_tables(queryset, depends_on=[City]) == sorted(
+        [
+            LegalEntity._meta.db_table,
+            EntityCompanyRelation._meta.db_table,
+            City._meta.db_table,
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_query_cache_rejects_model_queries():
+    """Кэшируются только значения, а не экземпляры моделей."""
+    with pytest.raises(TypeError):
+        await QueryCache().fetch(City.all())
+
+
+@pytest.mark.asyncio
+async def test_query_cache_reuses_result_until_write(
+    fake_redis, seed_city: City, executions
+):
+    """Повторный запрос берётся из кэша, запись в таблицу делает его устаревшим."""
+
+    def names():
+        return City.filter(id=seed_city.id).values("id", "name")
+
+    first = await query_cache.fetch(names())
+    second = await query_cache.fetch(names())
+    assert first == second == [{"id": str(seed_city.id), "name": seed_city.name}]
+    assert len(executions) == 1
+
+    seed_city.name = "Переименованный"
+    await seed_city.save()
+
+    assert (await query_cache.fetch(names()))[0]["name"] == "Переименованный"
+    assert len(executions) == 2
+
+
+@pytest.mark.asyncio
+async def test_query_cache_skips_remote_write_grace(
+    fake_redis, seed_city: City, executions
+):
+    """После уведомления о чужой записи кэш не используется до новой версии."""
+    await query_cache.fetch(City.all().count())
+    query_cache.remote_write(
+        _changed_tables([Change(CITY, seed_city.id, UPSERT, (None,))])
+    )
+    assert await query_cache.fetch(City.all().count()) == 1
+    await query_cache.fetch(City.all().count())
+
+    assert len(executions) == 1
+
+
+@pytest.mark.asyncio
+async def test_city_list_sees_new_city(
+    test_app: AsyncClient, jwt_token_admin: dict, seed_city: City
+):
+    """Список городов не отдаёт устаревший кэш после добавления города."""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+
+    response = await test_app.get("/api/cities/all", headers=headers)
+    total = response.json()["total"]
+
+    response = await test_app.post(
+        "/api/cities/add",
+        headers=headers,
+        json={
+            "city_name": "Новый город",
+            "region": "Регион",
+            "code": "1",
+            "external_id": "new-city",
+        },
+    )
+    assert response.status_code == 201, response.text
+
+    response = await test_app.get("/api/cities/all", headers=headers)
+    assert response.json()["total"] == total + 1
@@ -0,0 +1,93 @@
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from loguru import logger
+from prometheus_client import REGISTRY
+from tortoise.transactions import in_transaction
+
+from app.database.engine import PRIMARY
+from app.database.models import City
+from app.database.query_timing import (
+    BACKGROUND_ROUTE,
+    QueryStatsMiddleware,
+    fingerprint,
+    query_timing,
+)
+
+
+def query_count(route: str) -> float:
+    total = 0
+    for metric in REGISTRY.collect():
+        if metric.name != "reference_db_query_duration_seconds":
+            continue
+        for sample in metric.samples:
+            if sample.name.endswith("_count") and sample.labels["route"] == route:
+                total += sample.value
+    return total
+
+
+@pytest.fixture
+def log_messages():
+    messages = []
+    handler = logger.add(lambda message: messages.append(str(message)))
+    yield messages
+    logger.remove(handler)
+
+
+def test_fingerprint_ignores_values():
+    label, normalized = fingerprint(
+        'SELECT "id" FROM "cities" WHERE "code" IN ($1, $2, $3) LIMIT 10'
+    )
+    other, _ = fingerprint(
+        'SELECT "id"  FROM "cities"\n WHERE "code" IN ($1,$2) LIMIT 20'
+    )
+
+    assert label == other
+    assert label.startswith("SELECT cities ")
+    assert normalized == 'SELECT "id" FROM "cities" WHERE "code" IN (...) LIMIT ?'
+
+
+@pytest.mark.asyncio
+async def test_queries_are_timed_including_transactions(seed_city: City):
+    before = query_count(BACKGROUND_ROUTE)
+
+    await City.filter(id=seed_city.id).first()
+    async with in_transaction(PRIMARY):
+        await City.filter(id=seed_city.id).update(name="Renamed")
+
+    assert query_count(BACKGROUND_ROUTE) >= before + 2
+
+
+@pytest.mark.asyncio
+async def test_slow_query_log_redacts_parameters(
+    seed_city: City, log_messages, monkeypatch
+):
+    monkeypatch.setattr(query_timing, "slow_seconds", 0)
+
+    await City.filter(code="666666").first()
+
+    slow = [message for message in log_messages if "Медленный запрос" in message]
+    assert slow
+    assert "666666" not in slow[0]
+    assert "params=[str" in slow[0]
+
+
+@pytest.mark.asyncio
+async def test_debug_mode_reports_request_queries(seed_city: City, log_messages):
+    app = FastAPI()
+
+    @app.get("/cities/{city_id}")
+    async def view(city_id: str):
+        await City.filter(id=city_id).first()
+        return {"count": await City.all().count()}
+
+    app.add_middleware(QueryStatsMiddleware, debug=True)
+    before = query_count("/cities/{city_id}")
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get(f"/cities/{seed_city.id}")
+
+    assert response.headers["x-db-queries"] == "2"
+    assert float(response.headers["x-db-time-ms"]) > 0
+    assert query_count("/cities/{city_id}") == before + 2
+    assert any("БД: 2 запросов" in message for message in log_messages)
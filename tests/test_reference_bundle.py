@@ -0,0 +1,70 @@
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+
+from app.database.models import EntityCompanyRelation, Warehouse
+
+
+@pytest.mark.asyncio
+async def test_bundle_contains_company_references(
+    test_app: AsyncClient,
+    jwt_token_admin: dict,
+    seed_entity_relation: EntityCompanyRelation,
+):
+    """Пакет содержит склады, кассы и контрагентов компании."""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+    company_id = seed_entity_relation.company_id
+    await Warehouse.create(
+        name="Bundle Warehouse",
+        company_id=company_id,
+        created_by=uuid4(),
+        modified_by=uuid4(),
+    )
+
+    response = await test_app.get(
+        f"/api/companies/{company_id}/reference-bundle", headers=headers
+    )
+    assert response.status_code == 200, (
+        f"Ошибка: {response.status_code}, {response.text}"
+    )
+
+    bundle = response.json()
+    assert response.headers["etag"] == f'"{bundle["hash"]}"'
+    assert [w["warehouse_name"] for w in bundle["warehouses"]] == ["Bundle Warehouse"]
+    assert bundle["cash_registers"] == []
+    assert [b["legal_entity_id"] for b in bundle["buyers"]] == [
+        str(seed_entity_relation.legal_entity_id)
+    ]
+    assert bundle["sellers"] == []
+
+
+@pytest.mark.asyncio
+async def test_bundle_not_modified_until_company_changes(
+    test_app: AsyncClient, jwt_token_admin: dict
+):
+    """С совпадающим хэшем приходит 304, после изменения — новый пакет."""
+    headers = {"Authorization": f"Bearer {jwt_token_admin['access_token']}"}
+    company_id = str(uuid4())
+    url = f"/api/companies/{company_id}/reference-bundle"
+
+    response = await test_app.get(url, headers=headers)
+    etag = response.headers["etag"]
+
+    response = await test_app.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    # Изменение другой компании пакет не сбрасывает
+    data = {"warehouse_name": "Other Warehouse", "company_id": str(uuid4())}
+    await test_app.post("/api/warehouses/add", headers=headers, json=data)
+    response = await test_app.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    data = {"warehouse_name": "New Warehouse", "company_id": company_id}
+    response = await test_app.post("/api/warehouses/add", headers=headers, json=data)
+    assert response.status_code == 201
+
+    response = await test_app.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()["warehouses"]) == 1
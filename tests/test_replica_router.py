@@ -0,0 +1,159 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from prometheus_client import REGISTRY
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from app.database import router
+from app.database.engine import PRIMARY, REPLICA, tortoise_config
+from app.database.models import Warehouse
+from app.database.router import (
+    ReplicaLagMonitor,
+    ReplicaRouter,
+    allow_replica_reads,
+    note_read_company,
+    pin_committed_writes,
+    primary_reads,
+    recent_writes,
+    replica_state,
+)
+from app.utils.change_entities import UPSERT, WAREHOUSE
+from app.utils.change_log import Change, tracked_transaction
+
+# Полная проверка с настоящей репликой: второй экземпляр Postgres в режиме
+# standby и DB_REPLICA_URL на него — GET-запросы пойдут туда, пока лаг
+# меньше DB_REPLICA_MAX_LAG_SECONDS (см. reference_db_replica_lag_seconds).
+
+
+@pytest.fixture
+def healthy_replica():
+    recent_writes.clear()
+    replica_state.healthy = True
+    yield
+    replica_state.healthy = False
+    recent_writes.clear()
+
+
+async def route_get(company=None, before=None):
+    """Выбор подключения так, как его видит чтение внутри GET-запроса."""
+
+    async def request():
+        allow_replica_reads()
+        note_read_company({"company": company})
+        if before is not None:
+            return await before()
+        return ReplicaRouter().db_for_read(None)
+
+    # Отдельная задача — своя копия контекста, как у каждого запроса
+    return await asyncio.create_task(request())
+
+
+@pytest.mark.asyncio
+async def test_get_reads_go_to_replica_only_when_healthy(healthy_replica):
+    assert await route_get() == REPLICA
+    # Вне GET-запроса (записи, фоновые задачи) — основная база
+    assert ReplicaRouter().db_for_read(None) is None
+
+    replica_state.healthy = False
+    assert await route_get() is None
+
+
+@pytest.mark.asyncio
+async def test_recent_write_pins_company_to_primary(healthy_replica):
+    company, other = uuid4(), uuid4()
+    await pin_committed_writes([Change("warehouse", uuid4(), UPSERT, (company,))])
+
+    assert await route_get(company) is None
+    assert await route_get(other) == REPLICA
+
+    recent_writes.window = 0
+    try:
+        recent_writes.pin_changes([Change("warehouse", uuid4(), UPSERT, (company,))])
+        assert await route_get(company) == REPLICA
+    finally:
+        recent_writes.window = router.READ_YOUR_WRITES_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_change_without_company_pins_everyone(healthy_replica):
+    recent_writes.pin_changes([Change("city", uuid4(), UPSERT, ())])
+
+    assert await route_get(uuid4()) is None
+
+
+@pytest.mark.asyncio
+async def test_transaction_and_cache_fills_read_primary(healthy_replica):
+    async def in_tx():
+        async with in_transaction(PRIMARY):
+            return ReplicaRouter().db_for_read(None)
+
+    async def in_cache_fill():
+        with primary_reads():
+            inside = ReplicaRouter().db_for_read(None)
+        return inside, ReplicaRouter().db_for_read(None)
+
+    assert await route_get(before=in_tx) is None
+    assert await route_get(before=in_cache_fill) == (None, REPLICA)
+
+
+@pytest.mark.asyncio
+async def test_lag_monitor_updates_health(monkeypatch):
+    monitor = ReplicaLagMonitor()
+
+    # Реплика не подключена — читаем только из основной базы
+    replica_state.healthy = True
+    await monitor.check()
+    assert replica_state.healthy is False
+
+    # Основная база не в режиме восстановления — лаг 0
+    monkeypatch.setattr(router, "REPLICA", PRIMARY)
+    await monitor.check()
+    assert replica_state.healthy is True
+    assert REGISTRY.get_sample_value("reference_db_replica_lag_seconds") == 0
+
+    monkeypatch.setattr(replica_state, "max_lag", -1)
+    await monitor.check()
+    assert replica_state.healthy is False
+
+
+def replica_reads(connection: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "reference_db_replica_reads_total", {"connection": connection}
+        )
+        or 0
+    )
+
+
+@pytest.mark.asyncio
+async def test_writes_and_reads_with_replica_connection(test_settings, healthy_replica):
+    """
+    Два подключения, как в проде с DB_REPLICA_URL: запись в транзакции идёт
+    в основную базу, чтение GET другой компании — через реплику. Роль
+    реплики здесь играет второе подключение к той же тестовой базе.
+    """
+    settings = test_settings.model_copy(update={"DB_REPLICA_URL": test_settings.db_url})
+    config = tortoise_config(settings, ["app.database.models"])
+    assert set(config["connections"]) == {PRIMARY, REPLICA}
+    await Tortoise.close_connections()
+    await Tortoise.init(config=config)
+
+    company, user = uuid4(), uuid4()
+    async with tracked_transaction() as changes:
+        warehouse = await Warehouse.create(
+            name="Склад реплики", company_id=company, created_by=user, modified_by=user
+        )
+        changes.upsert(WAREHOUSE, warehouse.id, [company])
+
+    async def read_warehouse():
+        return (await Warehouse.get(id=warehouse.id)).name
+
+    before = replica_reads(REPLICA)
+    assert await route_get(uuid4(), before=read_warehouse) == "Склад реплики"
+    assert replica_reads(REPLICA) == before + 1
+
+    # Компания, только что записавшая данные, читает из основной базы
+    assert await route_get(company, before=read_warehouse) == "Склад реплики"
+    assert replica_reads(REPLICA) == before + 1
@@ -0,0 +1,89 @@
+from uuid import uuid4
+
+import pytest
+
+from app.database.models import EntityCompanyRelation, LegalEntity
+from app.database.repository import (
+    company_relations,
+    company_relations_orm,
+    find_legal_entity_by_inn_kpp,
+    find_legal_entity_by_inn_kpp_orm,
+    get_legal_entity_with_relations,
+    get_legal_entity_with_relations_orm,
+)
+
+
+@pytest.mark.asyncio
+async def test_inn_kpp_fast_path_matches_orm(seed_legal_entity: LegalEntity):
+    """Прямой запрос возвращает то же, что и ORM."""
+    entity = seed_legal_entity
+
+    for kpp in (entity.kpp, None):
+        expected = await find_legal_entity_by_inn_kpp_orm(entity.inn, kpp)
+        assert await find_legal_entity_by_inn_kpp(entity.inn, kpp) == expected
+        assert expected == (entity.id, entity.short_name)
+
+    assert await find_legal_entity_by_inn_kpp("000000000000") is None
+
+
+@pytest.mark.asyncio
+async def test_company_relations_fast_path_matches_orm(
+    seed_legal_entity: LegalEntity,
+):
+    company_id = uuid4()
+    relation = await EntityCompanyRelation.create(
+        company_id=company_id, legal_entity=seed_legal_entity, relation_type="buyer"
+    )
+
+    rows = await company_relations(company_id)
+
+    assert rows == [(relation.id, seed_legal_entity.id)]
+    assert sorted(rows) == sorted(await company_relations_orm(company_id))
+    assert await company_relations(uuid4()) == []
+
+
+@pytest.mark.asyncio
+async def test_legal_entity_with_relations_fast_path_matches_orm(
+    seed_legal_entity: LegalEntity,
+):
+    company_id = uuid4()
+    relation = await EntityCompanyRelation.create(
+        company_id=company_id, legal_entity=seed_legal_entity, relation_type="buyer"
+    )
+    await EntityCompanyRelation.create(
+        company_id=uuid4(), legal_entity=seed_legal_entity, relation_type="seller"
+    )
+
+    for company, all_companies, expected in (
+        (company_id, False, 1),
+        (None, True, 2),
+        (company_id, True, 2),
+    ):
+        fast = await get_legal_entity_with_relations(
+            seed_legal_entity.id, company, all_companies
+        )
+        orm = await get_legal_entity_with_relations_orm(
+            seed_legal_entity.id, company, all_companies
+        )
+        fast_relations, orm_relations = fast.pop("relations"), orm.pop("relations")
+        assert fast == orm
+        assert len(orm_relations) == expected
+        assert [r["entity_company_relation_id"] for r in fast_relations] == [
+            str(r["entity_company_relation_id"]) for r in orm_relations
+        ]
+        if not all_companies:
+            assert orm_relations[0]["entity_company_relation_id"] == relation.id
+
+    assert await get_legal_entity_with_relations(uuid4()) is None
+    assert await get_legal_entity_with_relations_orm(uuid4()) is None
+
+
+@pytest.mark.asyncio
+async def test_legal_entity_without_company_gets_no_relations(
+    seed_legal_entity: LegalEntity,
+):
+    """Без компании и без all_companies связи не отдаются вовсе."""
+    for load in (get_legal_entity_with_relations, get_legal_entity_with_relations_orm):
+        entity = await load(seed_legal_entity.id, None)
+        assert entity["id"] == seed_legal_entity.id
+        assert entity["relations"] == []
@@ -0,0 +1,89 @@
+import asyncio
+import contextvars
+
+import pytest
+
+from app.utils.singleflight import SingleFlight, visibility_scope
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_computation():
+    """Одинаковые одновременные вызовы выполняются один раз."""
+    flights = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return b"payload"
+
+    results = await asyncio.gather(*(flights.do("key", compute) for _ in range(10)))
+
+    assert calls == 1
+    assert results == [b"payload"] * 10
+    assert len(flights) == 0
+
+    await flights.do("key", compute)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_error_reaches_every_caller_and_key_is_released():
+    """Ошибка вычисления получают все ожидающие, ключ освобождается."""
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        flights.do("key", fail), flights.do("key", fail), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_others():
+    """Отмена одного запроса не прерывает вычисление для остальных."""
+    flights = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return b"ok"
+
+    first = asyncio.create_task(flights.do("key", compute))
+    second = asyncio.create_task(flights.do("key", compute))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == b"ok"
+
+
+def test_visibility_scope_separates_companies():
+    assert visibility_scope({"is_superadmin": True, "company": "a"}) == "superadmin"
+    assert visibility_scope({"is_superadmin": False, "company": "a"}) != (
+        visibility_scope({"is_superadmin": False, "company": "b"})
+    )
+
+
+@pytest.mark.asyncio
+async def test_computation_does_not_inherit_first_caller_context():
+    """Общее вычисление не видит contextvars первого запроса."""
+    flights = SingleFlight()
+    request_id = contextvars.ContextVar("request_id", default=None)
+    seen = []
+
+    async def compute():
+        seen.append(request_id.get())
+        await asyncio.sleep(0.01)
+        return b"ok"
+
+    async def call(value):
+        request_id.set(value)
+        return await flights.do("key", compute)
+
+    assert await asyncio.gather(call("first"), call("second")) == [b"ok", b"ok"]
+    assert seen == [None]
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import Status, StatusCode
+
+import metrics.tracer as tracer_module
+from metrics.tracer import TailSamplingProcessor, record_span
+
+
+@pytest.fixture
+def exporter():
+    return InMemorySpanExporter()
+
+
+def make_tracer(exporter, head_rate=0.0, slow_seconds=1.0):
+    provider = TracerProvider()
+    provider.add_span_processor(
+        TailSamplingProcessor(
+            SimpleSpanProcessor(exporter),
+            head_rate=head_rate,
+            slow_seconds=slow_seconds,
+        )
+    )
+    return provider.get_tracer(__name__)
+
+
+def exported_names(exporter) -> list:
+    return sorted(span.name for span in exporter.get_finished_spans())
+
+
+def test_fast_successful_trace_is_dropped(exporter):
+    tracer = make_tracer(exporter)
+
+    with tracer.start_as_current_span("GET /api/cities"):
+        with tracer.start_as_current_span("SELECT city"):
+            pass
+
+    assert exporter.get_finished_spans() == ()
+
+
+def test_failed_trace_is_exported_whole(exporter):
+    tracer = make_tracer(exporter)
+
+    with tracer.start_as_current_span("POST /api/legal-entities"):
+        with tracer.start_as_current_span("egrul.fetch") as span:
+            span.set_status(Status(StatusCode.ERROR, "таймаут"))
+        with tracer.start_as_current_span("INSERT legal_entity"):
+            pass
+
+    assert exported_names(exporter) == [
+        "INSERT legal_entity",
+        "POST /api/legal-entities",
+        "egrul.fetch",
+    ]
+
+
+def test_slow_and_head_sampled_traces_are_exported(exporter):
+    tracer = make_tracer(exporter, slow_seconds=0.01)
+    with tracer.start_as_current_span("медленный"):
+        time.sleep(0.02)
+
+    sampled = make_tracer(exporter, head_rate=1.0)
+    with sampled.start_as_current_span("доля"):
+        pass
+
+    assert exported_names(exporter) == ["доля", "медленный"]
+
+
+def test_record_span_is_child_of_current_span(exporter, monkeypatch):
+    tracer = make_tracer(exporter, head_rate=1.0)
+    monkeypatch.setattr(tracer_module, "_tracer", tracer)
+
+    record_span("redis get", 0.01, {"db.system": "redis"})  # вне трассы — нет span
+    with tracer.start_as_current_span("GET /api/warehouses") as root:
+        record_span("redis get", 0.01, {"db.system": "redis"}, RuntimeError("нет"))
+
+    child, parent = exporter.get_finished_spans()
+    assert parent.context.span_id == root.get_span_context().span_id
+    assert child.parent.span_id == parent.context.span_id
+    assert child.status.status_code is StatusCode.ERROR
+    assert child.end_time - child.start_time == 10_000_000
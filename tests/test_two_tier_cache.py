@@ -0,0 +1,73 @@
+from uuid import uuid4
+
+import orjson
+import pytest
+
+from app.cache import codec
+from app.cache.local import ByteLRUCache
+from app.cache.two_tier import TwoTierCache
+
+
+def test_codec_roundtrip_compact():
+    """Значение переживает кодирование, крупные значения сжимаются при наличии zstd."""
+    value = {
+        "id": str(uuid4()),
+        "items": [{"name": "Склад", "n": i} for i in range(200)],
+    }
+
+    data = codec.encode(value)
+
+    assert codec.decode(data) == value
+    if codec.zstandard is not None:
+        assert data[:1] == b"z"
+        assert len(data) < len(orjson.dumps(value))
+
+
+def test_byte_lru_evicts_by_size():
+    """Локальный кэш ограничен суммарным размером значений."""
+    evicted = []
+    cache = ByteLRUCache(max_bytes=10, on_evict=lambda: evicted.append(1))
+
+    cache.set("a", b"12345")
+    cache.set("b", b"12345")
+    assert cache.get("a") == b"12345"
+    cache.set("c", b"12345")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"12345"
+    assert cache.size == 10
+    assert len(evicted) == 1
+
+    cache.set("huge", b"x" * 11)
+    assert cache.get("huge") is None
+
+
+@pytest.mark.asyncio
+async def test_two_tier_shares_values_through_redis(fake_redis):
+    """Значение, записанное одним процессом, читается другим через L2."""
+    writer = TwoTierCache("test_shared", ttl=60)
+    reader = TwoTierCache("test_shared", ttl=60)
+
+    await writer.set("key", {"name": "value"})
+    assert await reader.get("key") == {"name": "value"}
+    assert reader.l1.get("key") is not None
+
+    await writer.delete("key")
+    reader.clear_local()
+    assert await reader.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_get_or_set_loads_once():
+    """Промах загружает значение, повторное обращение берёт его из L1."""
+    cache = TwoTierCache("test_get_or_set", ttl=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return {"total": 1}
+
+    assert await cache.get_or_set("key", loader) == {"total": 1}
+    assert await cache.get_or_set("key", loader) == {"total": 1}
+    assert calls == 1